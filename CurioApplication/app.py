@@ -1,10 +1,15 @@
+import os
+import sys
+
+# Make the shared common/ package at the repository root importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 import message_router
 from user_db import CurioUserDB
 import uuid
 import requests
-import os
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
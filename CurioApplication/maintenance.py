@@ -0,0 +1,94 @@
+import os
+import sys
+
+# Make the shared common/ package at the repository root importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import time
+import requests
+from dotenv import load_dotenv
+from common.maintenance import compact_sqlite, report_entry, total_bytes_reclaimed, logger
+from user_db import CurioUserDB
+
+# Load environment variables from .env file
+load_dotenv()
+
+AGENT_MAINTENANCE_ENDPOINT = os.getenv('AGENT_MAINTENANCE_ENDPOINT', '/curio_chat/run_maintenance')
+AGENT_MAINTENANCE_STATUS_ENDPOINT = os.getenv('AGENT_MAINTENANCE_STATUS_ENDPOINT', '/curio_chat/maintenance_status')
+AGENT_MAINTENANCE_TIMEOUT_SECONDS = int(os.getenv('AGENT_MAINTENANCE_TIMEOUT_SECONDS', '3600'))
+# Timeout of each HTTP request to the agent
+REQUEST_TIMEOUT_SECONDS = 30
+POLL_INTERVAL_SECONDS = 10
+
+
+def run_agent_maintenance(agent_base_url: str, dry_run: bool = False) -> list:
+    """Start the agent's maintenance run and wait for its report.
+
+    The agent runs the jobs in the background; its status endpoint is polled
+    until the run finishes or AGENT_MAINTENANCE_TIMEOUT_SECONDS pass.
+
+    Returns:
+        list: The agent's report entries
+    """
+    headers = {"X-Maintenance-Token": os.getenv('MAINTENANCE_TOKEN', '')}
+    response = requests.post(agent_base_url + AGENT_MAINTENANCE_ENDPOINT, json={"dry_run": dry_run},
+                             headers=headers, timeout=REQUEST_TIMEOUT_SECONDS)
+    if response.status_code == 409:
+        raise RuntimeError("A maintenance run is already in progress on the agent")
+    response.raise_for_status()
+    deadline = time.monotonic() + AGENT_MAINTENANCE_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL_SECONDS)
+        response = requests.get(agent_base_url + AGENT_MAINTENANCE_STATUS_ENDPOINT, headers=headers,
+                                timeout=REQUEST_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        status = response.json()
+        if status["state"] == "finished":
+            return status["report"]
+        if status["state"] == "failed":
+            raise RuntimeError(f"Agent maintenance failed: {status.get('error')}")
+    raise TimeoutError(f"Agent maintenance did not finish within {AGENT_MAINTENANCE_TIMEOUT_SECONDS}s")
+
+
+def run_maintenance(dry_run: bool = False, include_agent: bool = True) -> list:
+    """Roll up old request counts, compact the users database and run the agent's maintenance.
+
+    Args:
+        dry_run: Report what would change without changing anything
+        include_agent: Also ask the agent service to run its own jobs
+
+    Returns:
+        list: One report entry per job
+    """
+    user_db = CurioUserDB()
+    report = []
+    try:
+        daily_rows, monthly_rows = user_db.rollup_request_tracking(dry_run=dry_run)
+        report.append(report_entry("request_tracking", "rollup", rows=daily_rows, monthly_rows=monthly_rows, dry_run=dry_run))
+    except Exception as e:
+        logger.error(f"Request tracking rollup failed: {str(e)}", exc_info=True)
+        report.append(report_entry("request_tracking", "rollup", error=str(e)))
+    try:
+        report.append(compact_sqlite(user_db.DB_PATH, dry_run=dry_run))
+    except Exception as e:
+        logger.error(f"Compacting {user_db.DB_PATH} failed: {str(e)}", exc_info=True)
+        report.append(report_entry(os.path.basename(user_db.DB_PATH), "compact", error=str(e)))
+    if include_agent:
+        try:
+            report.extend(run_agent_maintenance(user_db.DEFAULT_AGENT_BASE_URL, dry_run))
+        except Exception as e:
+            logger.error(f"Agent maintenance failed: {str(e)}", exc_info=True)
+            report.append(report_entry("agent", "maintenance", error=str(e)))
+    logger.info(f"Maintenance report: {total_bytes_reclaimed(report)} bytes {'reclaimable' if dry_run else 'reclaimed'}")
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the retention and compaction jobs of Curio's databases.")
+    parser.add_argument('--dry-run', action='store_true', help="Report what would be rolled up, archived and reclaimed without changing anything")
+    parser.add_argument('--skip-agent', action='store_true', help="Do not call the agent service's maintenance endpoint")
+    args = parser.parse_args()
+    for entry in run_maintenance(dry_run=args.dry_run, include_agent=not args.skip_agent):
+        print(json.dumps(entry))
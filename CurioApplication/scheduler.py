@@ -1,8 +1,15 @@
+import os
+import sys
+
+# Make the shared common/ package at the repository root importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 import time
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 import pytz
 import message_router
+import maintenance
 
 if __name__ == '__main__':
     scheduler = BackgroundScheduler(timezone=pytz.timezone('Asia/Kolkata'))
@@ -18,6 +25,12 @@ if __name__ == '__main__':
         id='evening_news_update',
         replace_existing=True
     )
+    scheduler.add_job(
+        maintenance.run_maintenance,
+        CronTrigger(hour=3, minute=30),
+        id='nightly_maintenance',
+        replace_existing=True
+    )
     scheduler.start()
     print('Scheduler started. Press Ctrl+C to exit.')
     try:
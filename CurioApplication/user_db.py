@@ -1,7 +1,7 @@
-import sqlite3
 import os
 from dotenv import load_dotenv
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
+from common.sqlite_storage import connect, transaction
 
 # Load environment variables from .env file
 load_dotenv()
@@ -14,6 +14,8 @@ class CurioUserDB:
     DEFAULT_AGENT_ENDPOINT = os.getenv('AGENT_ENDPOINT', '/curio_chat/send_user_message')
     DEFAULT_TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', '7477796128:AAE7BjPgmC2z3jDnfNmDjDENks8jh7Zowvw')
     DAILY_REQUEST_LIMIT = int(os.getenv('DAILY_REQUEST_LIMIT', '30'))
+    # Daily request counts older than this are rolled up into monthly totals
+    REQUEST_TRACKING_RETENTION_DAYS = int(os.getenv('REQUEST_TRACKING_RETENTION_DAYS', '62'))
     
     # Constants that don't change
     TELEGRAM_API_BASE_URL = "https://api.telegram.org"
@@ -29,7 +31,7 @@ class CurioUserDB:
             self._create_request_tracking_table()
 
     def _create_db(self):
-        conn = sqlite3.connect(self.DB_PATH)
+        conn = connect(self.DB_PATH)
         c = conn.cursor()
         c.execute('''
             CREATE TABLE IF NOT EXISTS users (
@@ -41,12 +43,11 @@ class CurioUserDB:
         ''')
         self._create_request_tracking_table(conn)
         conn.commit()
-        conn.close()
 
     def _create_request_tracking_table(self, conn=None):
         """Create the request tracking table if it doesn't exist."""
         if conn is None:
-            conn = sqlite3.connect(self.DB_PATH)
+            conn = connect(self.DB_PATH)
         
         c = conn.cursor()
         c.execute('''
@@ -57,10 +58,15 @@ class CurioUserDB:
                 PRIMARY KEY (telegram_id, request_date)
             )
         ''')
-        
-        if conn is None:
-            conn.commit()
-            conn.close()
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS request_tracking_monthly (
+                telegram_id INTEGER,
+                month TEXT,
+                request_count INTEGER DEFAULT 0,
+                active_days INTEGER DEFAULT 0,
+                PRIMARY KEY (telegram_id, month)
+            )
+        ''')
 
     def check_and_increment_request_count(self, telegram_id: int) -> tuple[bool, int]:
         """
@@ -71,38 +77,35 @@ class CurioUserDB:
         """
         today = date.today().isoformat()
         
-        conn = sqlite3.connect(self.DB_PATH)
-        c = conn.cursor()
+        # IMMEDIATE takes the write lock before the read, so concurrent requests cannot both see the old count
+        with transaction(self.DB_PATH, immediate=True) as conn:
+            c = conn.cursor()
         
-        # Get current count for today
-        c.execute('''
-            SELECT request_count FROM request_tracking 
-            WHERE telegram_id = ? AND request_date = ?
-        ''', (telegram_id, today))
-        
-        row = c.fetchone()
-        current_count = row[0] if row else 0
-        
-        # Check if limit exceeded
-        if current_count >= self.DAILY_REQUEST_LIMIT:
-            conn.close()
-            return True, current_count
-        
-        # Increment count
-        if row:
+            # Get current count for today
             c.execute('''
-                UPDATE request_tracking 
-                SET request_count = request_count + 1 
+                SELECT request_count FROM request_tracking 
                 WHERE telegram_id = ? AND request_date = ?
             ''', (telegram_id, today))
-        else:
-            c.execute('''
-                INSERT INTO request_tracking (telegram_id, request_date, request_count)
-                VALUES (?, ?, 1)
-            ''', (telegram_id, today))
         
-        conn.commit()
-        conn.close()
+            row = c.fetchone()
+            current_count = row[0] if row else 0
+        
+            # Check if limit exceeded
+            if current_count >= self.DAILY_REQUEST_LIMIT:
+                return True, current_count
+        
+            # Increment count
+            if row:
+                c.execute('''
+                    UPDATE request_tracking 
+                    SET request_count = request_count + 1 
+                    WHERE telegram_id = ? AND request_date = ?
+                ''', (telegram_id, today))
+            else:
+                c.execute('''
+                    INSERT INTO request_tracking (telegram_id, request_date, request_count)
+                    VALUES (?, ?, 1)
+                ''', (telegram_id, today))
         
         return False, current_count + 1
 
@@ -110,7 +113,7 @@ class CurioUserDB:
         """Get the current request count for a user today."""
         today = date.today().isoformat()
         
-        conn = sqlite3.connect(self.DB_PATH)
+        conn = connect(self.DB_PATH)
         c = conn.cursor()
         c.execute('''
             SELECT request_count FROM request_tracking 
@@ -118,36 +121,32 @@ class CurioUserDB:
         ''', (telegram_id, today))
         
         row = c.fetchone()
-        conn.close()
         
         return row[0] if row else 0
 
     def is_user_active(self, telegram_id: int) -> bool:
-        conn = sqlite3.connect(self.DB_PATH)
+        conn = connect(self.DB_PATH)
         c = conn.cursor()
         c.execute('SELECT active FROM users WHERE telegram_id = ?', (telegram_id,))
         row = c.fetchone()
-        conn.close()
         if row:
             return bool(row[0])
         return False
 
     def get_agent_id_from_telegram_id(self, telegram_id: int) -> str:
-        conn = sqlite3.connect(self.DB_PATH)
+        conn = connect(self.DB_PATH)
         c = conn.cursor()
         c.execute('SELECT agent_id FROM users WHERE telegram_id = ?', (telegram_id,))
         row = c.fetchone()
-        conn.close()
         if row:
             return row[0]
         raise ValueError(f"No agent_id found for telegram_id {telegram_id}")
 
     def get_telegram_id_from_agent_id(self, agent_id: str) -> int:
-        conn = sqlite3.connect(self.DB_PATH)
+        conn = connect(self.DB_PATH)
         c = conn.cursor()
         c.execute('SELECT telegram_id FROM users WHERE agent_id = ?', (agent_id,))
         row = c.fetchone()
-        conn.close()
         if row:
             return row[0]
         raise ValueError(f"No telegram_id found for agent_id {agent_id}")
@@ -161,59 +160,90 @@ class CurioUserDB:
         return f"{self.TELEGRAM_API_BASE_URL}/bot{self.DEFAULT_TELEGRAM_BOT_TOKEN}/sendMessage"
 
     def add_user(self, user_id: str, telegram_id: int, agent_id: str):
-        conn = sqlite3.connect(self.DB_PATH)
-        c = conn.cursor()
-        c.execute('INSERT OR IGNORE INTO users (user_id, telegram_id, agent_id) VALUES (?, ?, ?)', (user_id, telegram_id, agent_id))
-        conn.commit()
-        conn.close()
+        with connect(self.DB_PATH) as conn:
+            c = conn.cursor()
+            c.execute('INSERT OR IGNORE INTO users (user_id, telegram_id, agent_id) VALUES (?, ?, ?)', (user_id, telegram_id, agent_id))
 
     def user_exists(self, telegram_id: int) -> bool:
-        conn = sqlite3.connect(self.DB_PATH)
+        conn = connect(self.DB_PATH)
         c = conn.cursor()
         c.execute('SELECT 1 FROM users WHERE telegram_id = ?', (telegram_id,))
         exists = c.fetchone() is not None
-        conn.close()
         return exists
 
     def deactivate_user(self, telegram_id: int):
-        conn = sqlite3.connect(self.DB_PATH)
-        c = conn.cursor()
-        c.execute('UPDATE users SET active = 0 WHERE telegram_id = ?', (telegram_id,))
-        conn.commit()
-        conn.close()
+        with connect(self.DB_PATH) as conn:
+            c = conn.cursor()
+            c.execute('UPDATE users SET active = 0 WHERE telegram_id = ?', (telegram_id,))
 
     def get_all_users(self):
-        conn = sqlite3.connect(self.DB_PATH)
+        conn = connect(self.DB_PATH)
         c = conn.cursor()
         c.execute('SELECT user_id, telegram_id, agent_id, active FROM users')
         users = [
             {"user_id": row[0], "telegram_id": row[1], "agent_id": row[2], "active": bool(row[3])}
             for row in c.fetchall()
         ]
-        conn.close()
         return users
 
     def reset_user_request_count(self, telegram_id: int) -> None:
         """Reset the user's request count for today to 0."""
         today = date.today().isoformat()
-        conn = sqlite3.connect(self.DB_PATH)
-        c = conn.cursor()
-        # Check if a row exists for today
-        c.execute('''
-            SELECT request_count FROM request_tracking 
-            WHERE telegram_id = ? AND request_date = ?
-        ''', (telegram_id, today))
-        row = c.fetchone()
-        if row:
+        with transaction(self.DB_PATH, immediate=True) as conn:
+            c = conn.cursor()
+            # Check if a row exists for today
             c.execute('''
-                UPDATE request_tracking 
-                SET request_count = 0 
+                SELECT request_count FROM request_tracking 
                 WHERE telegram_id = ? AND request_date = ?
             ''', (telegram_id, today))
-        else:
+            row = c.fetchone()
+            if row:
+                c.execute('''
+                    UPDATE request_tracking 
+                    SET request_count = 0 
+                    WHERE telegram_id = ? AND request_date = ?
+                ''', (telegram_id, today))
+            else:
+                c.execute('''
+                    INSERT INTO request_tracking (telegram_id, request_date, request_count)
+                    VALUES (?, ?, 0)
+                ''', (telegram_id, today))
+
+    def rollup_request_tracking(self, before: date = None, dry_run: bool = False) -> tuple[int, int]:
+        """Fold the daily request counts of whole months before `before` into request_tracking_monthly.
+
+        Only today's count is read to enforce the daily limit, so old daily
+        rows are replaced by one row per user and month holding the total
+        requests and the number of active days.
+
+        Args:
+            before: Defaults to REQUEST_TRACKING_RETENTION_DAYS days ago; the month it falls in is kept
+            dry_run: Only count the rows that would be rolled up
+
+        Returns:
+            tuple: (daily rows rolled up, monthly rows written)
+        """
+        if before is None:
+            before = date.today() - timedelta(days=self.REQUEST_TRACKING_RETENTION_DAYS)
+        month_start = before.replace(day=1).isoformat()
+        with transaction(self.DB_PATH, immediate=True) as conn:
+            c = conn.cursor()
             c.execute('''
-                INSERT INTO request_tracking (telegram_id, request_date, request_count)
-                VALUES (?, ?, 0)
-            ''', (telegram_id, today))
-        conn.commit()
-        conn.close() 
\ No newline at end of file
+                SELECT COUNT(*), COUNT(DISTINCT telegram_id || '-' || substr(request_date, 1, 7))
+                FROM request_tracking WHERE request_date < ?
+            ''', (month_start,))
+            daily_rows, monthly_rows = c.fetchone()
+            if dry_run or not daily_rows:
+                return daily_rows, monthly_rows
+            c.execute('''
+                INSERT INTO request_tracking_monthly (telegram_id, month, request_count, active_days)
+                SELECT telegram_id, substr(request_date, 1, 7), SUM(request_count),
+                       SUM(CASE WHEN request_count > 0 THEN 1 ELSE 0 END)
+                FROM request_tracking WHERE request_date < ?
+                GROUP BY telegram_id, substr(request_date, 1, 7)
+                ON CONFLICT (telegram_id, month) DO UPDATE SET
+                    request_count = request_count + excluded.request_count,
+                    active_days = active_days + excluded.active_days
+            ''', (month_start,))
+            c.execute('DELETE FROM request_tracking WHERE request_date < ?', (month_start,))
+        return daily_rows, monthly_rows
@@ -1,3 +1,4 @@
 from .actions import Actions
+from .registry import ActionRegistry
 
-__all__ = ['Actions']
\ No newline at end of file
+__all__ = ['Actions', 'ActionRegistry']
\ No newline at end of file
@@ -1,36 +1,58 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Dict, Optional, Tuple
+
+
+def format_action_detail(name: str, description: str, args: Dict[str, str]) -> str:
+    """Describe an action for the prompt's list of actions."""
+    arguments_str = "\n".join([f"{arg_key}: {arg_description}" for arg_key, arg_description in args.items()])
+    detail = f"""
+        Action Name: {name},
+        Action Description: {description},
+        Action Arguments: [
+            {arguments_str}
+        ]
+        """
+
+    return detail
+
 
 class Action(ABC):
-    """Base class for all actions."""
-    
-    def __init__(self, description: str, name: str, args: dict[str, str]):
-        self.description = description
-        self.name = name
-        self.args = args
-    
+    """Base class for all actions.
+
+    Subclasses declare name, description and args as class attributes, so
+    the action can be listed in the prompt before it is instantiated, and
+    list in `requires` the dependencies the ActionRegistry passes to
+    __init__ as keyword arguments (see ActionRegistry for the names).
+    """
+
+    name: str = ""
+    description: str = ""
+    args: Dict[str, str] = {}
+    requires: Tuple[str, ...] = ()
+
+    def __init__(self, description: Optional[str] = None, name: Optional[str] = None, args: Optional[Dict[str, str]] = None):
+        if description is not None:
+            self.description = description
+        if name is not None:
+            self.name = name
+        if args is not None:
+            self.args = args
+
     @abstractmethod
-    def execute(self, agent_id: str, args: dict[str, Any]):
-        """Execute the action for a given agent and return the result."""
+    def execute(self, agent_id: str, args: dict[str, Any], turn_context=None):
+        """Execute the action for a given agent and return the result.
+
+        turn_context is the TurnContext of the current turn, if the caller has one.
+        """
         pass
-    
+
 
     def get_action_name(self) -> str:
         """Return the name of the action."""
-        self.name
+        return self.name
 
     def get_action_descrption(self) -> str:
         return self.description
-    
-    def get_action_detail(self) -> str:
 
-        arguments_str = "\n".join([f"{arg_key}: {arg_description}" for arg_key, arg_description in self.args.items()])
-        detail = f"""
-        Action Name: {self.name},
-        Action Description: {self.description},
-        Action Arguments: [
-            {arguments_str}
-        ]
-        """
-
-        return detail
\ No newline at end of file
+    def get_action_detail(self) -> str:
+        return format_action_detail(self.name, self.description, self.args)
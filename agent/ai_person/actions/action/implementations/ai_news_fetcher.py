@@ -1,46 +1,12 @@
-import feedparser
 import requests
-from bs4 import BeautifulSoup
 import json
 import time
-import os
-import logging
-from datetime import datetime
+from common.logging_setup import setup_logging
 
 # Setup logging for ai_news_fetcher
 def setup_news_fetcher_logging():
     """Setup logging for the ai_news_fetcher module."""
-    log_dir = "logs"
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-
-    log_file = os.path.join(log_dir, f"ai_news_fetcher_{datetime.now().strftime('%Y%m%d')}.log")
-    
-    # Create logger
-    logger = logging.getLogger("ai_person.actions.ai_news_fetcher")
-    logger.setLevel(logging.DEBUG)
-    
-    # Remove any existing handlers
-    for handler in logger.handlers[:]:
-        logger.removeHandler(handler)
-    
-    # Create file handler
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setLevel(logging.DEBUG)
-    file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(file_formatter)
-    
-    # Create console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_formatter = logging.Formatter('%(levelname)s - %(message)s')
-    console_handler.setFormatter(console_formatter)
-    
-    # Add handlers to logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
-    return logger
+    return setup_logging("ai_person.actions.ai_news_fetcher", "ai_news_fetcher")
 
 # Initialize logger
 logger = setup_news_fetcher_logging()
@@ -76,6 +42,8 @@ def contains_ai_keywords(text):
 
 
 def extract_full_content(url, selector):
+    # Parsers are imported on first use to keep them out of agent startup
+    from bs4 import BeautifulSoup
     logger.debug(f"Extracting content from URL: {url} with selector: {selector}")
     try:
         logger.debug(f"Making HTTP request to: {url}")
@@ -127,6 +95,7 @@ def fetch_article_content(article):
 
 
 def fetch_all_sources():
+    import feedparser
     logger.info("Starting to fetch from all RSS sources")
     new_articles = []
     
@@ -1,29 +1,32 @@
-from typing import Any
+from typing import Any, Callable, Optional
 from ..action import Action
 from ....memory import Memory
+from ....memory.short_term_memory import AGENT
 from .curio_chat_messenger import send_agent_message
 
 class AskQuestionAction(Action):
+
+    name = "ask_question"
+    description = "Ask a question to the human to get more clarity. This action sends a question to the human."
+    args = {
+        "question": "The question to ask the human."
+    }
+    requires = ("memory", "messenger")
+
+    def __init__(self, memory: Optional[Memory] = None, messenger: Optional[Callable[[str, str], Any]] = None):
+        self.memory = memory or Memory()
+        self.send_message = messenger or send_agent_message
+        super().__init__()
     
-    def __init__(self,
-                description = "Ask a question to the human to get more clarity. This action sends a question to the human.", 
-                name = "ask_question",
-                args = {
-                    "question": "The question to ask the human."
-                }):
-        self.memory = Memory()
-        super().__init__(description=description, name=name, args=args)
-    
-    def execute(self, agent_id: str, args: dict[str, Any]):
+    def execute(self, agent_id: str, args: dict[str, Any], turn_context=None):
         try:
             question = args['question']
             self.ask_question(agent_id, question)
-            agent_dialouge = f"You: {question}"
-            self.memory.add_dialogue_to_current_converstaion(agent_id, agent_dialouge)
+            self.memory.add_dialogue(agent_id, AGENT, question)
         except Exception as e:
             print(e)
 
     def ask_question(self, agent_id, question: str):
-        send_agent_message(agent_id, question)
+        self.send_message(agent_id, question)
         
     
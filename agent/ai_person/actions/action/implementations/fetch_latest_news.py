@@ -1,11 +1,16 @@
-from typing import Any
+from typing import Any, Callable, Optional
 from ..action import Action
 from . import ai_news_fetcher
 from ....memory import Memory
+from ....memory.short_term_memory import AGENT, SOURCE_SYSTEM
 from ....identity import Identity
 from ....purpose import Purpose
 from ....personality import Personality
+from ....turn_context import PromptFragments, TurnContext
 from ....llm_service import get_response_from_llm
+from ....prompt_budget import count_tokens, fit_news_items, get_section_budget, prompt_metrics
+from ....memory.long_term_memory.near_duplicate import cluster_news_items
+from ....memory.long_term_memory.news_db import normalize_link
 from .curio_chat_messenger import send_agent_message
 from .logging_setup import setup_action_logging
 import json
@@ -13,54 +18,76 @@ import json
 
 class FetchLatestAINewsAction(Action):
 
-    def __init__(self, description = "Get latest AI news from web sources. This action is fetches latest AI updates and sends those updates to the human. This is the action to perform when use asks for updates. This action collects information from web and also communicates them to the user", 
-                name = "fetch_ai_news",
-                args = {}):
+    name = "fetch_ai_news"
+    description = "Get latest AI news from web sources. This action is fetches latest AI updates and sends those updates to the human. This is the action to perform when use asks for updates. This action collects information from web and also communicates them to the user"
+    args = {}
+    requires = ("memory", "personality", "prompt_fragments", "llm", "messenger")
+
+    def __init__(self, memory: Optional[Memory] = None, personality: Optional[Personality] = None,
+                 prompt_fragments: Optional[PromptFragments] = None, llm: Optional[Callable[[str], str]] = None,
+                 messenger: Optional[Callable[[str, str], Any]] = None):
         self.logger = setup_action_logging("fetch_latest_news")
         self.logger.info("Initializing FetchLatestAINewsAction")
-        self.memory = Memory()
-        self.identity = Identity()
-        self.personality = Personality()
-        self.purpose = Purpose()
-        super().__init__(description, name, args)
+        self.memory = memory or Memory()
+        self.personality = personality or Personality()
+        self.prompt_fragments = prompt_fragments or PromptFragments(Identity(), Purpose())
+        self.get_response_from_llm = llm or get_response_from_llm
+        self.send_message = messenger or send_agent_message
+        super().__init__()
         self.logger.info("FetchLatestAINewsAction initialization complete")
 
-    def execute(self, agent_id: str, args: dict[str, Any]):
+    def execute(self, agent_id: str, args: dict[str, Any], turn_context=None):
         try:
             self.logger.info(f"Starting fetch_latest_news action execution for agent_id: {agent_id}")
-            self.fetch_ai_news_and_send(agent_id)
+            self.fetch_ai_news_and_send(agent_id, turn_context=turn_context)
             self.logger.info(f"fetch_latest_news action execution completed successfully for agent_id: {agent_id}")
         except Exception as e:
             self.logger.error(f"Error in fetch_latest_news action execution for agent_id {agent_id}: {str(e)}", exc_info=True)
             print(e)
     
-    def fetch_ai_news_and_send(self, agent_id: str):
+    def fetch_ai_news_and_send(self, agent_id: str, turn_context: Optional[TurnContext] = None):
+        turn_context = turn_context or TurnContext(agent_id, self.memory, self.personality, self.prompt_fragments)
         self.logger.info(f"Starting AI news fetching process for agent_id: {agent_id}")
 
         self.logger.debug(f"Calling ai_news_fetcher.get_ai_updates() for agent_id: {agent_id}")
         ai_updates = ai_news_fetcher.get_ai_updates()
         self.logger.info(f"Retrieved {len(ai_updates)} AI updates from sources for agent_id: {agent_id}")
+        # Sources often list the same article under variants of its URL; keep the first of each
+        unique_updates = {}
+        for ai_update in ai_updates:
+            if ai_update.get('link'):
+                unique_updates.setdefault(normalize_link(ai_update['link']), ai_update)
+        if len(unique_updates) < len(ai_updates):
+            self.logger.debug(f"Dropped {len(ai_updates) - len(unique_updates)} updates without a link or with a repeated link for agent_id {agent_id}")
+        ai_updates = list(unique_updates.values())
         
         final_ai_updates = []  # All news to send to user
         to_fetch_and_save = []  # News not in DB, need to fetch content and save
         news_id_map = {}  # Map link to news_id for later marking
 
+        # Look up all links and their processed state in bulk instead of once per entry
+        links = [ai_update.get('link', '') for ai_update in ai_updates if ai_update.get('link')]
+        existing_news_ids = self.memory.check_links_exist(agent_id, links)
+        processed_news_ids = self.memory.get_processed_news_ids(agent_id, list(existing_news_ids.values()))
+        self.logger.debug(f"{len(existing_news_ids)} of {len(links)} links already stored, {len(processed_news_ids)} processed by agent_id {agent_id}")
+
         for i, ai_update in enumerate(ai_updates):
             self.logger.debug(f"Processing update {i+1}/{len(ai_updates)} for agent_id {agent_id}: {ai_update.get('title', 'No title')}")
             link = ai_update.get('link', '')
             if not link:
                 self.logger.debug(f"Skipping update {i+1} for agent_id {agent_id}: Empty or None link")
                 continue
-            news_id = self.memory.check_link_exists(agent_id, link)
+            news_id = existing_news_ids.get(link)
             if news_id:
                 news_id_map[link] = news_id
-                # Check if processed by this agent
-                if self.memory.long_term_memory.news_db.has_agent_processed_news(agent_id, news_id):
+                # Check if processed by this agent, or already picked up through another link
+                if news_id in processed_news_ids or news_id in {update.get('news_id') for update in final_ai_updates}:
                     self.logger.debug(f"Skipping update {i+1} for agent_id {agent_id}: Already processed by agent {agent_id}")
                     continue
                 # Not processed by this agent, fetch from memory and include in final_ai_updates
                 news_item = self.memory.get_news_item(agent_id, news_id)
                 if news_item:
+                    news_item['alternates'] = self.memory.get_alternate_links(agent_id, news_id)
                     final_ai_updates.append(news_item)
                 else:
                     self.logger.error(f"Could not fetch news item for news_id {news_id} for agent_id {agent_id}")
@@ -68,44 +95,69 @@ class FetchLatestAINewsAction(Action):
                 # Not in DB, need to fetch content and save
                 to_fetch_and_save.append(ai_update)
         
-        # Fetch content for new items and add to final_ai_updates
+        # Fetch content for new items
+        fetched_updates = []
         for ai_update in to_fetch_and_save:
             self.logger.debug(f"Fetching content for new update for agent_id {agent_id}: {ai_update['link']}")
             content = ai_news_fetcher.fetch_article_content(ai_update)
             if content:
                 ai_update['content'] = content
-                final_ai_updates.append(ai_update)
+                fetched_updates.append(ai_update)
             else:
                 self.logger.debug(f"No content retrieved for new update for agent_id {agent_id}: {ai_update['link']}")
+
+        # Group near-duplicate stories so only one representative per cluster is saved and sent
+        representatives = cluster_news_items(fetched_updates)
+        self.logger.info(f"Clustered {len(fetched_updates)} new updates into {len(representatives)} stories for agent_id {agent_id}")
+        to_fetch_and_save = []
+        for ai_update in representatives:
+            duplicate_id = self.memory.find_near_duplicate_news(agent_id, ai_update)
+            if not duplicate_id:
+                to_fetch_and_save.append(ai_update)
+                final_ai_updates.append(ai_update)
+                continue
+            # Same story is already stored under another link: keep these links as alternates
+            self.logger.debug(f"Update for agent_id {agent_id} is a near-duplicate of news_id {duplicate_id}: {ai_update['link']}")
+            self.memory.save_alternate_links(agent_id, duplicate_id, [ai_update] + ai_update['alternates'])
+            news_id_map[ai_update['link']] = duplicate_id
+            if duplicate_id in {update.get('news_id') for update in final_ai_updates}:
+                continue
+            if self.memory.get_processed_news_ids(agent_id, [duplicate_id]):
+                continue
+            news_item = self.memory.get_news_item(agent_id, duplicate_id)
+            if news_item:
+                news_item['alternates'] = self.memory.get_alternate_links(agent_id, duplicate_id)
+                final_ai_updates.append(news_item)
         
-        if not final_ai_updates and (last_human_dialogue := self.memory.get_last_human_dialogue(agent_id=agent_id)) and "[System]" in last_human_dialogue:
+        if not final_ai_updates and (last_human_turn := self.memory.get_last_human_turn(agent_id)) and last_human_turn.is_system:
             self.logger.info(f"Last dialogue was a system message and no updates found. Suppressing notification for agent_id: {agent_id}")
-            agent_dialogue = "You: [System] No news is found"
-            self.memory.add_dialogue_to_current_converstaion(agent_id, agent_dialogue)
+            self.memory.add_dialogue(agent_id, AGENT, "No news is found", source=SOURCE_SYSTEM)
             return
 
         self.logger.info(f"Final AI updates after processing for agent_id {agent_id}: {len(final_ai_updates)}")
-        ai_updates_string = json.dumps(final_ai_updates)
+        ai_updates_string = fit_news_items(final_ai_updates, get_section_budget("news"))
+        prompt_metrics.record("news", count_tokens(json.dumps(final_ai_updates)), count_tokens(ai_updates_string))
         self.logger.debug(f"AI updates JSON string length for agent_id {agent_id}: {len(ai_updates_string)} characters")
     
         self.logger.debug(f"Constructing prompt for LLM for agent_id: {agent_id}")
         prompt = f"""
         - Indentity:
-        {self.identity.get_indentity_prompt(agent_id) if hasattr(self.identity, 'get_indentity_prompt') and 'agent_id' in self.identity.get_indentity_prompt.__code__.co_varnames else self.identity.get_indentity_prompt()}
+        {turn_context.identity_prompt}
         - Purpose:
-        {self.purpose.get_purpose_prompt(agent_id) if hasattr(self.purpose, 'get_purpose_prompt') and 'agent_id' in self.purpose.get_purpose_prompt.__code__.co_varnames else self.purpose.get_purpose_prompt()}
+        {turn_context.purpose_prompt}
         - Personality:
-        {self.personality.get_personality_prompt_text(agent_id)}
+        {turn_context.personality_prompt}
         - Details about Human:
-        {self.memory.get_information_about_the_human_prompt(agent_id)}
+        {turn_context.user_details_prompt}
         - Current Converstaion:
-        {self.memory.get_current_conversation_prompt(agent_id)}
+        {turn_context.conversation_prompt}
         - AI news information:
         {ai_updates_string}
         - Expected Resonse
         Based on the current converstation, all the context and AI news information.
         You have to send the the human the Ai news information that would be relevant to the human.
         If AI news information is empty, communicate that to the human that theres nothing new.
+        A news item can list alternates, which are other outlets covering the same story. Treat them as one story and mention them only as extra sources.
         
         Sometimes the human dialogue can have [System] in the begnining of the dialogue it means the text didn't directly come from the human.    
         It came from the a system that is working on the human's behalf. Understand that and respond that way. 
@@ -119,7 +171,7 @@ class FetchLatestAINewsAction(Action):
         self.logger.info(f"Complete prompt for LLM for agent_id {agent_id}:\n{prompt}")
 
         self.logger.info(f"Calling LLM service for response generation for agent_id: {agent_id}")
-        response_text = get_response_from_llm(prompt=prompt)
+        response_text = self.get_response_from_llm(prompt=prompt)
         self.logger.info(f"Received response from LLM for agent_id {agent_id}, length: {len(str(response_text))} characters")
         self.logger.debug(f"LLM response for agent_id {agent_id}: {response_text}")
         
@@ -130,9 +182,8 @@ class FetchLatestAINewsAction(Action):
             return
 
         self.logger.info(f"Sending agent message to human for agent_id: {agent_id}")
-        send_agent_message(agent_id, response_text)
-        agent_dialogue = f"You: {response_text}"
-        self.memory.add_dialogue_to_current_converstaion(agent_id, agent_dialogue)
+        self.send_message(agent_id, response_text)
+        self.memory.add_dialogue(agent_id, AGENT, response_text)
         self.logger.debug(f"Added agent dialogue to conversation memory for agent_id: {agent_id}")
 
         # Save only new items to DB, get their news_id
@@ -151,16 +202,15 @@ class FetchLatestAINewsAction(Action):
 
         # Mark all items in final_ai_updates as processed for this agent
         self.logger.info(f"Marking {len(final_ai_updates)} news items as processed for agent {agent_id}")
+        processed_ids = []
         for i, update in enumerate(final_ai_updates):
             news_id = update.get('news_id') or news_id_map.get(update.get('link'))
             if news_id:
-                try:
-                    self.memory.long_term_memory.news_db.mark_news_processed_by_agent(agent_id, news_id)
-                    self.logger.debug(f"Marked news item {i+1} as processed for agent_id {agent_id}: {update.get('title', 'No title')}")
-                except Exception as e:
-                    self.logger.error(f"Error marking news item {i+1} as processed for agent_id {agent_id}: {str(e)}")
+                processed_ids.append(news_id)
             else:
                 self.logger.error(f"No news_id found for news item {i+1} for agent_id {agent_id}: {update.get('title', 'No title')}")
+        if not self.memory.mark_news_processed(agent_id, processed_ids):
+            self.logger.error(f"Error marking {len(processed_ids)} news items as processed for agent_id {agent_id}")
 
         self.logger.info(f"AI news fetching and sending process completed for agent_id: {agent_id}")
         
@@ -1,42 +1,52 @@
-from typing import Any
+from typing import Any, Callable, Optional
 from ..action import Action
 from ....memory import Memory
+from ....memory.short_term_memory import AGENT
 from ....identity import Identity
 from ....purpose import Purpose
 from ....personality import Personality
+from ....turn_context import PromptFragments, TurnContext
 from ....llm_service import get_response_from_llm
+from ....prompt_budget import count_tokens, fit_news_items, get_section_budget, prompt_metrics
 from .curio_chat_messenger import send_agent_message
 from .logging_setup import setup_action_logging
 import json
 
 class FetchNewsDetailsAction(Action):
     
-    def __init__(self, description = "Get details and extra information regarding some update when the human wants it and send it to the human. This action searches the already fetched information previously and also sends/communicates the information to the human.", 
-                name = "fetch_news_details",
-                args = {
-                    "query": "The query to search with to get the relevant article"
-                }):
+    name = "fetch_news_details"
+    description = "Get details and extra information regarding some update when the human wants it and send it to the human. This action searches the already fetched information previously and also sends/communicates the information to the human."
+    args = {
+        "query": "The query to search with to get the relevant article"
+    }
+    requires = ("memory", "personality", "prompt_fragments", "llm", "messenger")
+
+    def __init__(self, memory: Optional[Memory] = None, personality: Optional[Personality] = None,
+                 prompt_fragments: Optional[PromptFragments] = None, llm: Optional[Callable[[str], str]] = None,
+                 messenger: Optional[Callable[[str, str], Any]] = None):
         self.logger = setup_action_logging("fetch_news_details")
         self.logger.info("Initializing FetchNewsDetailsAction")
-        self.memory = Memory()
-        self.identity = Identity()
-        self.purpose = Purpose()
-        self.personality = Personality()
-        super().__init__(description, name, args)
+        self.memory = memory or Memory()
+        self.personality = personality or Personality()
+        self.prompt_fragments = prompt_fragments or PromptFragments(Identity(), Purpose())
+        self.get_response_from_llm = llm or get_response_from_llm
+        self.send_message = messenger or send_agent_message
+        super().__init__()
         self.logger.info("FetchNewsDetailsAction initialization complete")
 
-    def execute(self, agent_id: str, args: dict[str, Any]):
+    def execute(self, agent_id: str, args: dict[str, Any], turn_context=None):
         try:
             self.logger.info(f"Starting fetch_news_details action execution for agent_id: {agent_id}")
             query = args["query"]
             self.logger.info(f"Query received for agent_id {agent_id}: {query}")
-            self.fetch_news_details(query=query, agent_id=agent_id)
+            self.fetch_news_details(query=query, agent_id=agent_id, turn_context=turn_context)
             self.logger.info(f"fetch_news_details action execution completed successfully for agent_id: {agent_id}")
         except Exception as e:
             self.logger.error(f"Error in fetch_news_details action execution for agent_id {agent_id}: {str(e)}", exc_info=True)
             print(e)
     
-    def fetch_news_details(self, query: str, agent_id: str):
+    def fetch_news_details(self, query: str, agent_id: str, turn_context: Optional[TurnContext] = None):
+        turn_context = turn_context or TurnContext(agent_id, self.memory, self.personality, self.prompt_fragments)
         self.logger.info(f"Starting news details search for query: {query} for agent_id: {agent_id}")
 
         self.logger.debug(f"Searching for relevant news in memory for agent_id: {agent_id}")
@@ -49,21 +59,22 @@ class FetchNewsDetailsAction(Action):
         else:
             self.logger.warning(f"No relevant news items found for the query for agent_id: {agent_id}")
             
-        fetched_ai_news_string = json.dumps(fetched_ai_news)
+        fetched_ai_news_string = fit_news_items(fetched_ai_news, get_section_budget("news"))
+        prompt_metrics.record("news", count_tokens(json.dumps(fetched_ai_news)), count_tokens(fetched_ai_news_string))
         self.logger.debug(f"News items JSON string length for agent_id {agent_id}: {len(fetched_ai_news_string)} characters")
 
         self.logger.debug(f"Constructing prompt for LLM for agent_id: {agent_id}")
         prompt = f"""
         - Indentity:
-        {self.identity.get_indentity_prompt(agent_id) if hasattr(self.identity, 'get_indentity_prompt') and 'agent_id' in self.identity.get_indentity_prompt.__code__.co_varnames else self.identity.get_indentity_prompt()}
+        {turn_context.identity_prompt}
         - Purpose:
-        {self.purpose.get_purpose_prompt(agent_id) if hasattr(self.purpose, 'get_purpose_prompt') and 'agent_id' in self.purpose.get_purpose_prompt.__code__.co_varnames else self.purpose.get_purpose_prompt()}
+        {turn_context.purpose_prompt}
         - Personality:
-        {self.personality.get_personality_prompt_text(agent_id)}
+        {turn_context.personality_prompt}
         - Details about Human:
-        {self.memory.get_information_about_the_human_prompt(agent_id)}
+        {turn_context.user_details_prompt}
         - Current Converstaion:
-        {self.memory.get_current_conversation_prompt(agent_id)}
+        {turn_context.conversation_prompt}
         - AI news information:
         {fetched_ai_news_string}
         - Expected Resonse
@@ -79,7 +90,7 @@ class FetchNewsDetailsAction(Action):
         self.logger.info(f"Complete prompt for LLM for agent_id {agent_id}:\n{prompt}")
 
         self.logger.info(f"Calling LLM service for response generation for agent_id: {agent_id}")
-        response_text = get_response_from_llm(prompt=prompt)
+        response_text = self.get_response_from_llm(prompt=prompt)
         self.logger.info(f"Received response from LLM for agent_id {agent_id}, length: {len(str(response_text))} characters")
         self.logger.debug(f"LLM response for agent_id {agent_id}: {response_text}")
         
@@ -90,9 +101,8 @@ class FetchNewsDetailsAction(Action):
             return
         
         self.logger.info(f"Sending agent message to human for agent_id: {agent_id}")
-        send_agent_message(agent_id, response_text)
-        agent_dialogue = f"You: {response_text}"
-        self.memory.add_dialogue_to_current_converstaion(agent_id, agent_dialogue)
+        self.send_message(agent_id, response_text)
+        self.memory.add_dialogue(agent_id, AGENT, response_text)
         self.logger.debug(f"Added agent dialogue to conversation memory for agent_id: {agent_id}")
 
         self.logger.info(f"News details fetching and sending process completed for agent_id: {agent_id}")
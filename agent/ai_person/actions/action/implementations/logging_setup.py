@@ -1,6 +1,4 @@
-import logging
-import os
-from datetime import datetime
+from common.logging_setup import setup_logging
 
 def setup_action_logging(action_name: str):
     """Setup logging for news-related actions with consistent configuration.
@@ -11,34 +9,4 @@ def setup_action_logging(action_name: str):
     Returns:
         logging.Logger: Configured logger instance
     """
-    log_dir = "logs"
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-
-    log_file = os.path.join(log_dir, f"{action_name}_{datetime.now().strftime('%Y%m%d')}.log")
-    
-    # Create logger
-    logger = logging.getLogger(f"ai_person.actions.{action_name}")
-    logger.setLevel(logging.DEBUG)  # Set to DEBUG to capture all levels
-    
-    # Remove any existing handlers
-    for handler in logger.handlers[:]:
-        logger.removeHandler(handler)
-    
-    # Create file handler
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setLevel(logging.DEBUG)
-    file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(file_formatter)
-    
-    # Create console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_formatter = logging.Formatter('%(levelname)s - %(message)s')
-    console_handler.setFormatter(console_formatter)
-    
-    # Add handlers to logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
-    return logger 
\ No newline at end of file
+    return setup_logging(f"ai_person.actions.{action_name}", action_name)
@@ -1,28 +1,31 @@
-from typing import Any
+from typing import Any, Callable, Optional
 from ..action import Action
 from ....memory import Memory
+from ....memory.short_term_memory import AGENT
 from .curio_chat_messenger import send_agent_message
 
 class SayTextAction(Action):
-    
-    def __init__(self, 
-                description = "Send message to the human. This action is if you want to communicate some information to the human.", 
-                name = "say_text",
-                args = {
-                    "message": "The message to be sent to the human."
-                }):
-        self.memory = Memory()
-        super().__init__(description, name, args)
 
-    def execute(self, agent_id: str, args: dict[str, Any]):
+    name = "say_text"
+    description = "Send message to the human. This action is if you want to communicate some information to the human."
+    args = {
+        "message": "The message to be sent to the human."
+    }
+    requires = ("memory", "messenger")
+
+    def __init__(self, memory: Optional[Memory] = None, messenger: Optional[Callable[[str, str], Any]] = None):
+        self.memory = memory or Memory()
+        self.send_message = messenger or send_agent_message
+        super().__init__()
+
+    def execute(self, agent_id: str, args: dict[str, Any], turn_context=None):
         try:
             message = args['message']
             self.say_text(agent_id, message)
-            agent_dialouge = f"You: {message}"
-            self.memory.add_dialogue_to_current_converstaion(agent_id, agent_dialouge)
+            self.memory.add_dialogue(agent_id, AGENT, message)
         except Exception as e:
             print(e)
     
     def say_text(self, agent_id, message):
-        send_agent_message(agent_id, message)
+        self.send_message(agent_id, message)
     
\ No newline at end of file
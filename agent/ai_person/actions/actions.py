@@ -1,27 +1,72 @@
-from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, Type
-from datetime import datetime
-from .action import Action
-from .action.implementations import (
-    SayTextAction,
-    FetchLatestAINewsAction,
-    FetchNewsDetailsAction,
-    AskQuestionAction
-)
+from typing import List, Dict, Any, Callable, Optional
+import os
+from .action.action import format_action_detail
+from .registry import ActionRegistry, logger
+
+# Built-in actions, imported on first use; the order is the order in the prompt
+BUILTIN_ACTIONS = {
+    "say_text": ".action.implementations.say_text:SayTextAction",
+    "fetch_ai_news": ".action.implementations.fetch_latest_news:FetchLatestAINewsAction",
+    "fetch_news_details": ".action.implementations.fetch_news_details:FetchNewsDetailsAction",
+    "ask_question": ".action.implementations.ask_question:AskQuestionAction",
+}
+
+
+def _default_providers() -> Dict[str, Callable[[], Any]]:
+    """Dependencies for actions used without an AiPerson, each built on first use."""
+    def memory():
+        from ..memory import Memory
+        return Memory()
+
+    def personality():
+        from ..personality import Personality
+        return Personality()
+
+    def prompt_fragments():
+        from ..identity import Identity
+        from ..purpose import Purpose
+        from ..turn_context import PromptFragments
+        return PromptFragments(Identity(), Purpose())
+
+    def llm():
+        from ..llm_service import get_response_from_llm
+        return get_response_from_llm
+
+    def messenger():
+        from .action.implementations.curio_chat_messenger import send_agent_message
+        return send_agent_message
+
+    return {
+        "memory": memory,
+        "personality": personality,
+        "prompt_fragments": prompt_fragments,
+        "llm": llm,
+        "messenger": messenger,
+    }
+
 
 class Actions:
     """Class to manage available actions and their execution."""
-    
-    def __init__(self):
-        self.available_actions: List[Action] = [
-            SayTextAction(),
-            FetchLatestAINewsAction(),
-            FetchNewsDetailsAction(),
-            AskQuestionAction()
-        ]
-        
-
-    def execute_action(self, agent_id: str, action_name: str, action_args: dict[str, Any]) -> None:
+
+    def __init__(self, providers: Optional[Dict[str, Callable[[], Any]]] = None):
+        """Register the built-in actions and any plugins.
+
+        Plugins come from the curio.actions entry point group and from the
+        ACTION_PLUGINS environment variable ("name=module:Class,...").
+
+        Args:
+            providers: Factories of the dependencies actions declare, overriding the defaults
+        """
+        self.registry = ActionRegistry({**_default_providers(), **(providers or {})})
+        for name, target in BUILTIN_ACTIONS.items():
+            self.registry.register(name, target)
+        try:
+            self.registry.load_entry_points()
+            self.registry.load_config(os.getenv("ACTION_PLUGINS", ""))
+        except Exception as e:
+            logger.error(f"Error loading action plugins: {str(e)}", exc_info=True)
+
+    def execute_action(self, agent_id: str, action_name: str, action_args: dict[str, Any], turn_context: Optional[Any] = None) -> None:
         """
         Execute an action by its name with the provided arguments.
 
@@ -29,26 +74,33 @@ class Actions:
             agent_id (str): The ID of the agent executing the action.
             action_name (str): The name of the action to execute.
             action_args (dict[str, Any]): Arguments to pass to the action.
+            turn_context (TurnContext, optional): Prompt sections already built for this turn.
 
         Returns:
             Any: The result of the action's execution, or None if not found.
         """
-        for action in self.available_actions:
-            if action.name == action_name:
-                try:
-                    action.execute(agent_id, action_args)
-                    return None
-                except Exception as e:
-                    print(f"Error executing action '{action_name}': {e}")
-                    return None
-        print(f"Action '{action_name}' not found among available actions.")
-
-    def get_all_actions_details(self):
+        try:
+            action = self.registry.get(action_name)
+            if action is None:
+                print(f"Action '{action_name}' not found among available actions.")
+                return None
+            action.execute(agent_id, action_args, turn_context=turn_context)
+        except Exception as e:
+            print(f"Error executing action '{action_name}': {e}")
+        return None
+
+    def get_all_actions_details(self) -> List[str]:
         details = []
-        for action in self.available_actions:
-            details.append(action.get_action_detail())
+        for name in self.registry.names():
+            try:
+                action_class = self.registry.get_class(name)
+            except Exception as e:
+                # A broken plugin is left out of the prompt rather than failing startup
+                logger.error(f"Error loading action {name}: {str(e)}", exc_info=True)
+                continue
+            details.append(format_action_detail(name, action_class.description, action_class.args))
         return details
-    
+
 
     def get_all_available_actions_prompt(self) -> str:
         details = self.get_all_actions_details()
@@ -64,9 +116,3 @@ class Actions:
         """
 
         return final_text
-    
-
-
-    
-    
-    
\ No newline at end of file
@@ -0,0 +1,154 @@
+from typing import Any, Callable, Dict, List, Optional, Type, Union
+import importlib
+import threading
+from common.logging_setup import setup_logging
+from .action.action import Action
+
+# Setup logging for the action registry
+def setup_action_registry_logging():
+    """Setup logging for the action registry module."""
+    return setup_logging("ai_person.actions.registry", "action_registry")
+
+# Initialize logger
+logger = setup_action_registry_logging()
+
+# Entry point group third-party packages register actions under, as
+# name = "package.module:ActionClass"
+ENTRY_POINT_GROUP = "curio.actions"
+
+
+def _import_target(target: str) -> Type[Action]:
+    """Import "module:Class"; a module starting with "." is relative to this package."""
+    module_name, _, class_name = target.partition(":")
+    if not class_name:
+        raise ValueError(f"Action target '{target}' must look like 'module:Class'")
+    module = importlib.import_module(module_name, package=__package__)
+    return getattr(module, class_name)
+
+
+class ActionRegistry:
+    """Actions keyed by name, imported and instantiated on first use.
+
+    An action is registered as a class, a "module:Class" string or an entry
+    point, and its class is only imported when it is listed or run. The
+    instance is built the first time the action runs, with each dependency
+    named in the class's `requires` taken from the registry's providers.
+    Providers are called once and their result is shared by every action.
+    """
+
+    def __init__(self, providers: Optional[Dict[str, Callable[[], Any]]] = None):
+        """Create a registry.
+
+        Args:
+            providers: Factory per dependency name, e.g. "memory", "llm", "messenger"
+        """
+        self._lock = threading.RLock()
+        self._loaders: Dict[str, Callable[[], Type[Action]]] = {}
+        self._classes: Dict[str, Type[Action]] = {}
+        self._instances: Dict[str, Action] = {}
+        self._providers: Dict[str, Callable[[], Any]] = dict(providers or {})
+        self._dependencies: Dict[str, Any] = {}
+
+    def register(self, name: str, action: Union[Type[Action], str, Callable[[], Type[Action]]]) -> None:
+        """Register an action, replacing any action of the same name.
+
+        Args:
+            name: Name the LLM uses to choose the action
+            action: Action class, "module:Class" string or function returning the class
+        """
+        if isinstance(action, str):
+            loader = lambda target=action: _import_target(target)
+        elif isinstance(action, type):
+            loader = lambda action_class=action: action_class
+        else:
+            loader = action
+        with self._lock:
+            self._loaders[name] = loader
+            self._classes.pop(name, None)
+            self._instances.pop(name, None)
+        logger.debug(f"Registered action {name}")
+
+    def register_provider(self, dependency: str, factory: Callable[[], Any]) -> None:
+        with self._lock:
+            self._providers[dependency] = factory
+            self._dependencies.pop(dependency, None)
+
+    def load_entry_points(self, group: str = ENTRY_POINT_GROUP) -> int:
+        """Register the actions installed packages declare under an entry point group.
+
+        Returns:
+            int: Number of actions registered
+        """
+        from importlib.metadata import entry_points
+        discovered = entry_points(group=group)
+        for entry_point in discovered:
+            self.register(entry_point.name, entry_point.load)
+        return len(discovered)
+
+    def load_config(self, spec: str) -> int:
+        """Register actions from a comma-separated "name=module:Class" list.
+
+        Returns:
+            int: Number of actions registered
+        """
+        count = 0
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            name, separator, target = item.partition("=")
+            if not separator:
+                raise ValueError(f"Action plugin '{item}' must look like 'name=module:Class'")
+            self.register(name.strip(), target.strip())
+            count += 1
+        return count
+
+    def names(self) -> List[str]:
+        """Registered action names, in registration order."""
+        with self._lock:
+            return list(self._loaders)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._loaders
+
+    def get_class(self, name: str) -> Type[Action]:
+        """Import an action's class without instantiating it.
+
+        Raises:
+            KeyError: If no action has that name
+        """
+        action_class = self._classes.get(name)
+        if action_class is None:
+            with self._lock:
+                action_class = self._classes.get(name)
+                if action_class is None:
+                    action_class = self._classes[name] = self._loaders[name]()
+        return action_class
+
+    def _dependency(self, dependency: str) -> Any:
+        if dependency not in self._dependencies:
+            if dependency not in self._providers:
+                raise KeyError(f"No provider for action dependency '{dependency}'")
+            self._dependencies[dependency] = self._providers[dependency]()
+        return self._dependencies[dependency]
+
+    def get(self, name: str) -> Optional[Action]:
+        """Return the instance of an action, creating it on first use.
+
+        Returns:
+            Optional[Action]: The action, or None if no action has that name
+        """
+        action = self._instances.get(name)
+        if action is not None or name not in self._loaders:
+            return action
+        with self._lock:
+            action = self._instances.get(name)
+            if action is None:
+                action_class = self.get_class(name)
+                dependencies = {dependency: self._dependency(dependency) for dependency in action_class.requires}
+                logger.info(f"Instantiating action {name} with {list(dependencies)}")
+                action = self._instances[name] = action_class(**dependencies)
+                if action.name != name:
+                    # Registered under another name than the class declares
+                    action.name = name
+        return action
+
+    def is_instantiated(self, name: str) -> bool:
+        return name in self._instances
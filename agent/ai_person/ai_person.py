@@ -1,47 +1,23 @@
 from .memory import Memory
+from .memory.short_term_memory import HUMAN
+from .memory.short_term_memory.dialogue_record import split_source
 from .personality import Personality
 from .identity import Identity
 from .purpose import Purpose
 from .actions import Actions
+from .turn_context import PromptFragments, TurnContext
 from .llm_service import get_response_from_llm
 import json
-import logging
-import os
-from datetime import datetime
+from common import logging_setup
 
 # Configure logging
 def setup_logging():
-    log_dir = "logs"
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-
-    log_file = os.path.join(log_dir, f"ai_person_{datetime.now().strftime('%Y%m%d')}.log")
-    
-    # Create logger
-    logger = logging.getLogger(__name__)
-    logger.setLevel(logging.DEBUG)  # Set to DEBUG to capture all levels
-    
-    # Remove any existing handlers
-    for handler in logger.handlers[:]:
-        logger.removeHandler(handler)
-    
-    # Create file handler
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setLevel(logging.DEBUG)
-    file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - [%(agent_id)s] - %(message)s')
-    file_handler.setFormatter(file_formatter)
-    
-    # Create console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_formatter = logging.Formatter('%(levelname)s - [%(agent_id)s] - %(message)s')
-    console_handler.setFormatter(console_formatter)
-    
-    # Add handlers to logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
-    return logger
+    return logging_setup.setup_logging(
+        __name__,
+        "ai_person",
+        file_format='%(asctime)s - %(name)s - %(levelname)s - [%(agent_id)s] - %(message)s',
+        console_format='%(levelname)s - [%(agent_id)s] - %(message)s'
+    )
 
 # Initialize logger
 logger = setup_logging()
@@ -53,7 +29,14 @@ class AiPerson:
         self.personality = Personality()
         self.purpose = Purpose()
         self.memory = Memory()
-        self.actions = Actions()
+        # Actions are built on first use and share this person's memory and personality
+        self.actions = Actions(providers={
+            "memory": lambda: self.memory,
+            "personality": lambda: self.personality,
+            "prompt_fragments": lambda: self.prompt_fragments,
+        })
+        # Identity, purpose and the action catalog are the same for every turn
+        self.prompt_fragments = PromptFragments(self.identity, self.purpose, self.actions)
         logger.info("AiPerson initialization complete", extra={'agent_id': "system"})
     
 
@@ -61,10 +44,15 @@ class AiPerson:
         try:
             logger.info(f"Received text from human: {text}", extra={'agent_id': agent_id})
             print(text)
-            user_dialouge = f"Human: {text}"
-            self.memory.add_dialogue_to_current_converstaion(agent_id, user_dialouge)
-            logger.debug(f"Added dialogue to conversation: {user_dialouge}", extra={'agent_id': agent_id})
-
+            # The application sends "[System] ..." messages on the human's behalf
+            source, text = split_source(HUMAN, text)
+            record = self.memory.add_dialogue(agent_id, HUMAN, text, source=source)
+            logger.debug(f"Added dialogue to conversation: {record.render()}", extra={'agent_id': agent_id})
+            turn_context = TurnContext(agent_id, self.memory, self.personality, self.prompt_fragments)
+            # Versions of the state the LLM is about to see; its updates are
+            # dropped if another request changes that state meanwhile
+            user_info_version = self.memory.get_user_info_version(agent_id)
+            personality_version = self.personality.get_personality_version(agent_id)
 
             response_structure = {
                 "action": {
@@ -84,17 +72,19 @@ class AiPerson:
 
             prompt = f"""
             - Indentity:
-            {self.identity.get_indentity_prompt(agent_id) if hasattr(self.identity, 'get_indentity_prompt') and 'agent_id' in self.identity.get_indentity_prompt.__code__.co_varnames else self.identity.get_indentity_prompt()}
+            {turn_context.identity_prompt}
             - Purpose:
-            {self.purpose.get_purpose_prompt(agent_id) if hasattr(self.purpose, 'get_purpose_prompt') and 'agent_id' in self.purpose.get_purpose_prompt.__code__.co_varnames else self.purpose.get_purpose_prompt()}
+            {turn_context.purpose_prompt}
             - Personality:
-            {self.personality.get_personality_prompt_text(agent_id)}
+            {turn_context.personality_prompt}
             - Details about Human:
-            {self.memory.get_information_about_the_human_prompt(agent_id)}
+            {turn_context.user_details_prompt}
             - Available Actions:
-            {self.actions.get_all_available_actions_prompt()}
+            {turn_context.actions_prompt}
+            - Relevant Earlier Conversation:
+            {turn_context.recalled_conversation_prompt}
             - Current Conversation:
-            {self.memory.get_current_conversation_prompt(agent_id)}
+            {turn_context.conversation_prompt}
             - Expected Resonse:
             Base on the current converstaion, respond what should be the next action from the available actions.
             Analyze and Understand the most recent ask/want from human from the converstaion, not some previous ask.
@@ -107,6 +97,7 @@ class AiPerson:
             
             Also, based on feedback you might have to adjust your conversational behvaior and update the converstaional behvior part in your personality.
             Also include that in the response. Respond with the full text that needs to go in the Converstaional behvaior section. 
+            If a value or the conversational behavior is marked as truncated, respond with only the text to add to it.
             
             Don't include the update sections if not required to update.
 
@@ -163,12 +154,13 @@ class AiPerson:
             
             if details_about_human := response_json.get('details_about_human'):
                 logger.info(f"Updating human details: {details_about_human}", extra={'agent_id': agent_id})
-                for key, value in details_about_human.items():
-                    self.memory.update_user_info(agent_id, field=key, value=value)
+                self.memory.update_user_details_from_prompt(agent_id, details_about_human, expected_version=user_info_version)
+                turn_context.invalidate('user_details')
 
             if conversational_behavior := response_json.get('conversational_behavior'):
                 logger.info("Updating conversational behavior", extra={'agent_id': agent_id})
-                self.personality.update_conversational_behavior(agent_id, conversational_behavior)
+                self.personality.update_conversational_behavior_from_prompt(agent_id, conversational_behavior, expected_version=personality_version)
+                turn_context.invalidate('personality')
 
             debug_info = response_json.get('debugInfo', None)
             if debug_info:
@@ -176,7 +168,7 @@ class AiPerson:
             print("debugInfo:\n")
             print(debug_info)
 
-            self.actions.execute_action(agent_id=agent_id, action_name=action_name, action_args=action_args)
+            self.actions.execute_action(agent_id=agent_id, action_name=action_name, action_args=action_args, turn_context=turn_context)
             logger.info(f"Action {action_name} execution completed", extra={'agent_id': agent_id})
 
         except Exception as e:
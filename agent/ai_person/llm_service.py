@@ -1,18 +1,65 @@
-from anthropic import Anthropic
-import ollama
-from openai import OpenAI
 import os
-import json
+import threading
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Get API key and LLM choice from environment variables
-anthorpic_client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Get LLM choice from environment variables
 llm_choice = os.getenv("LLM_CHOICE", "anthropic")
 
+# Provider SDKs are imported and their clients built on first use, so a
+# worker only pays for the provider LLM_CHOICE selects
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _create_anthropic_client():
+    from anthropic import Anthropic
+    return Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+
+
+def _create_openai_client():
+    from openai import OpenAI
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+
+def _create_ollama_client():
+    import ollama
+    return ollama
+
+
+_CLIENT_FACTORIES = {
+    "anthropic": _create_anthropic_client,
+    "openai": _create_openai_client,
+    "ollama": _create_ollama_client,
+}
+
+
+def get_client(provider: str):
+    """Return the client of a provider, creating it on first use."""
+    client = _clients.get(provider)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(provider)
+            if client is None:
+                client = _clients[provider] = _CLIENT_FACTORIES[provider]()
+    return client
+
+
+def warm_up_client(provider: str = None) -> None:
+    """Create a provider's client and open its connection with a metadata request.
+
+    Args:
+        provider: Provider to warm up; defaults to LLM_CHOICE
+    """
+    provider = provider or llm_choice
+    client = get_client(provider)
+    if provider == "ollama":
+        client.list()
+    else:
+        client.models.list()
+
 def get_response_from_llm(prompt: str) -> str:
     if llm_choice == 'anthropic':
         return get_response_from_anthropic(prompt=prompt)
@@ -25,7 +72,7 @@ def get_response_from_anthropic(prompt: str) -> str:
     try:
         print("prompt:\n" + prompt)
         # Call Claude API
-        message = anthorpic_client.messages.create(
+        message = get_client("anthropic").messages.create(
             model="claude-3-5-sonnet-20241022",
             max_tokens=500,  # Increased for multiple responses
             temperature=0.7,
@@ -52,7 +99,7 @@ def get_response_from_ollama(prompt: str) -> str:
     try:
         print("prompt:\n" + prompt)
         
-        response = ollama.chat(model="llama3.1", messages=[{"role": "user", "content": prompt}])
+        response = get_client("ollama").chat(model="llama3.1", messages=[{"role": "user", "content": prompt}])
         
         print("llm response: \n")
         print(response)
@@ -73,7 +120,7 @@ def get_response_from_openai(prompt: str) -> str:
         print("prompt:\n" + prompt)
         
         # Call OpenAI API
-        response = openai_client.chat.completions.create(
+        response = get_client("openai").chat.completions.create(
             model="gpt-4.1",
             messages=[
                 {
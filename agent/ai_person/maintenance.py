@@ -0,0 +1,135 @@
+from typing import Any, Dict, List, Optional
+import logging
+import os
+import threading
+import time
+from common.maintenance import analyze_postgres, compact_sqlite, cutoff_date, find_sqlite_files, report_entry, total_bytes_reclaimed
+from common.storage import POSTGRES, get_storage_backend
+from .memory.long_term_memory.conversation_db import ConversationDB
+from .memory.long_term_memory.news_db import NewsDB
+from .memory.long_term_memory.news_vector_db import NewsVectorDB
+
+logger = logging.getLogger("common.maintenance")
+
+# Tables analyzed on the postgres backend, where autovacuum reclaims space
+POSTGRES_TABLES = (
+    'conversations', 'news_items', 'news_keys', 'news_key_gaps', 'agent_keys', 'agent_news_read_state',
+    'news_minhash_bands', 'news_alternate_links', 'conversation_turns', 'evicted_turns',
+    'conversation_summaries', 'user_info', 'personalities',
+)
+
+
+def run_maintenance(dry_run: bool = False, news_vector_db: Optional[NewsVectorDB] = None) -> List[Dict[str, Any]]:
+    """Apply the retention policies to the agent's stores, then compact them.
+
+    Conversations older than CONVERSATION_RETENTION_DAYS (default 180) are
+    moved to gzip files in CONVERSATION_ARCHIVE_DIR. News published more
+    than NEWS_RETENTION_DAYS ago is deleted (default 0, keep all), along
+    with its vectors in the news vector index. SQLite files are then
+    vacuumed incrementally and analyzed. Each job runs even if an earlier
+    one fails.
+
+    Args:
+        dry_run: Report what would be archived, deleted and reclaimed without changing anything
+        news_vector_db: The process's news vector index, so the mmap backend keeps a single
+            writer; opened here when not given
+
+    Returns:
+        List[Dict[str, Any]]: One report entry per job
+    """
+    started = time.monotonic()
+    report = []
+    conversation_days = int(os.getenv("CONVERSATION_RETENTION_DAYS", "180"))
+    news_days = int(os.getenv("NEWS_RETENTION_DAYS", "0"))
+    archive_dir = os.getenv(
+        "CONVERSATION_ARCHIVE_DIR",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "archive")
+    )
+
+    if conversation_days > 0:
+        try:
+            rows, size = ConversationDB().archive_conversations(cutoff_date(conversation_days), archive_dir, dry_run=dry_run)
+            report.append(report_entry("conversations", "archive", rows=rows, bytes_reclaimed=size, dry_run=dry_run))
+        except Exception as e:
+            logger.error(f"Conversation archiving failed: {str(e)}", exc_info=True)
+            report.append(report_entry("conversations", "archive", error=str(e)))
+
+    if news_days > 0:
+        try:
+            # Vectors are deleted with each batch, so stale ids never fill search results
+            on_delete = None if dry_run else (news_vector_db or NewsVectorDB()).delete_news_items
+            rows, size = NewsDB().delete_news_before(int(time.time()) - news_days * 86400, dry_run=dry_run, on_delete=on_delete)
+            report.append(report_entry("news_items", "delete", rows=rows, bytes_reclaimed=size, dry_run=dry_run))
+        except Exception as e:
+            logger.error(f"News retention failed: {str(e)}", exc_info=True)
+            report.append(report_entry("news_items", "delete", error=str(e)))
+
+    if get_storage_backend() == POSTGRES:
+        if not dry_run:
+            try:
+                report.append(analyze_postgres(POSTGRES_TABLES))
+            except Exception as e:
+                logger.error(f"PostgreSQL analyze failed: {str(e)}", exc_info=True)
+                report.append(report_entry("postgres", "analyze", error=str(e)))
+    else:
+        for db_path in find_sqlite_files(os.path.dirname(os.path.abspath(__file__))):
+            try:
+                report.append(compact_sqlite(db_path, dry_run=dry_run))
+            except Exception as e:
+                logger.error(f"Compacting {db_path} failed: {str(e)}", exc_info=True)
+                report.append(report_entry(os.path.basename(db_path), "compact", error=str(e)))
+
+    logger.info(
+        f"Maintenance {'dry run ' if dry_run else ''}finished in {time.monotonic() - started:.1f}s, "
+        f"{total_bytes_reclaimed(report)} bytes {'reclaimable' if dry_run else 'reclaimed'}"
+    )
+    return report
+
+
+class MaintenanceRunner:
+    """Runs run_maintenance on a background thread, one run at a time.
+
+    Vacuuming and archiving can take minutes, longer than an HTTP request
+    should, so the maintenance route starts a run here and callers poll
+    status() for its report.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._status: Dict[str, Any] = {"state": "idle"}
+
+    def start(self, dry_run: bool = False, news_vector_db: Optional[NewsVectorDB] = None) -> bool:
+        """Start a run unless one is in progress.
+
+        Returns:
+            bool: True if a run was started
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._status = {"state": "running", "dry_run": dry_run, "started_at": time.time()}
+            self._thread = threading.Thread(
+                target=self._run, args=(dry_run, news_vector_db), name="agent-maintenance", daemon=True
+            )
+            self._thread.start()
+            return True
+
+    def _run(self, dry_run: bool, news_vector_db: Optional[NewsVectorDB]) -> None:
+        try:
+            report = run_maintenance(dry_run=dry_run, news_vector_db=news_vector_db)
+            status = {"state": "finished", "report": report}
+        except Exception as e:
+            logger.error(f"Maintenance run failed: {str(e)}", exc_info=True)
+            status = {"state": "failed", "error": str(e)}
+        with self._lock:
+            self._status = {**self._status, **status, "finished_at": time.time()}
+
+    def status(self) -> Dict[str, Any]:
+        """State of the latest run ("idle", "running", "finished" or "failed"), with its report once finished."""
+        with self._lock:
+            return dict(self._status)
+
+
+# Shared by the routes of this process
+maintenance_runner = MaintenanceRunner()
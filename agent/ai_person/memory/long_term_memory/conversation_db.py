@@ -1,47 +1,38 @@
-import sqlite3
 import os
-from typing import Dict, Any, Optional, List
-from datetime import datetime
-import logging
+from typing import Dict, Any, Iterator, Optional, List, Tuple
+from common.storage import connect, get_dialect
+from common.maintenance import append_archive
+from common.logging_setup import setup_logging
 
 # Setup logging for conversation database
 def setup_conversation_db_logging():
     """Setup logging for the conversation database module."""
-    log_dir = "logs"
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-
-    log_file = os.path.join(log_dir, f"conversation_db_{datetime.now().strftime('%Y%m%d')}.log")
-    
-    # Create logger
-    logger = logging.getLogger("ai_person.memory.conversation_db")
-    logger.setLevel(logging.DEBUG)
-    
-    # Remove any existing handlers
-    for handler in logger.handlers[:]:
-        logger.removeHandler(handler)
-    
-    # Create file handler
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setLevel(logging.DEBUG)
-    file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(file_formatter)
-    
-    # Create console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_formatter = logging.Formatter('%(levelname)s - %(message)s')
-    console_handler.setFormatter(console_formatter)
-    
-    # Add handlers to logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
-    return logger
+    return setup_logging("ai_person.memory.conversation_db", "conversation_db")
 
 # Initialize logger
 logger = setup_conversation_db_logging()
 
+CURSOR_SEPARATOR = "|"
+
+
+def conversation_cursor(conversation: Dict[str, Any]) -> str:
+    """Opaque keyset cursor pointing at a conversation row."""
+    return f"{conversation['created_at']}{CURSOR_SEPARATOR}{conversation['dialogue_id']}"
+
+
+def _parse_cursor(cursor_value: str) -> Tuple[str, str]:
+    created_at, _, dialogue_id = cursor_value.rpartition(CURSOR_SEPARATOR)
+    return created_at, dialogue_id
+
+
+def _row_to_conversation(row) -> Dict[str, Any]:
+    return {
+        'dialogue_id': row[0],
+        'agent_id': row[1],
+        'dialogue': row[2],
+        'created_at': row[3]
+    }
+
 class ConversationDB:
     def __init__(self, db_path: str = "conversation.db"):
         """Initialize the conversation SQLite database.
@@ -55,6 +46,7 @@ class ConversationDB:
         # Create full path to database file
         self.db_path = os.path.join(current_dir, db_path)
         logger.debug(f"SQLite database path: {self.db_path}")
+        self.dialect = get_dialect()
         self._create_tables()
         logger.info("ConversationDB initialization complete")
     
@@ -62,16 +54,27 @@ class ConversationDB:
         """Create necessary database tables if they don't exist"""
         logger.debug("Creating database tables if they don't exist")
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with connect(self.db_path) as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
+                cursor.execute(f'''
                     CREATE TABLE IF NOT EXISTS conversations (
                         dialogue_id TEXT PRIMARY KEY,
                         agent_id TEXT NOT NULL,
                         dialogue TEXT NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                        created_at {self.dialect.timestamp_column}
                     )
                 ''')
+                # Serves per-agent history in time order; dialogue_id breaks
+                # ties between rows created in the same second
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_conversations_agent_created
+                    ON conversations (agent_id, created_at, dialogue_id)
+                ''')
+                # Finds the oldest rows across agents for archiving
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_conversations_created
+                    ON conversations (created_at)
+                ''')
                 conn.commit()
                 logger.debug("Database tables created/verified successfully")
         except Exception as e:
@@ -92,7 +95,7 @@ class ConversationDB:
         logger.info(f"Saving conversation to SQLite database with agent_id: {agent_id}, dialogue_id: {dialogue_id}")
         logger.debug(f"Dialogue length: {len(dialogue)} characters")
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO conversations 
@@ -107,6 +110,34 @@ class ConversationDB:
             print(f"Error saving conversation to SQLite: {str(e)}")
             return False
     
+    def save_conversations(self, rows: List[Tuple[str, str, str, str]]) -> bool:
+        """Save many conversation dialogues in a single transaction.
+        
+        Args:
+            rows: (agent_id, dialogue_id, dialogue, created_at) tuples; created_at
+                  is a UTC 'YYYY-MM-DD HH:MM:SS' string like CURRENT_TIMESTAMP
+            
+        Returns:
+            bool: True if save was successful, False otherwise
+        """
+        if not rows:
+            return True
+        logger.debug(f"Saving {len(rows)} conversations to SQLite database")
+        try:
+            with connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    INSERT INTO conversations 
+                    (agent_id, dialogue_id, dialogue, created_at)
+                    VALUES (?, ?, ?, ?)
+                ''', rows)
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error(f"Error saving conversations to SQLite: {str(e)}", exc_info=True)
+            print(f"Error saving conversations to SQLite: {str(e)}")
+            return False
+    
     def get_conversation(self, agent_id: str, dialogue_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve a conversation for a specific agent from the database.
         
@@ -119,7 +150,7 @@ class ConversationDB:
         """
         logger.debug(f"Retrieving conversation from SQLite database: agent_id={agent_id}, dialogue_id={dialogue_id}")
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT dialogue_id, agent_id, dialogue, created_at
@@ -145,6 +176,35 @@ class ConversationDB:
             print(f"Error retrieving conversation: {str(e)}")
             return None
     
+    def get_conversations_by_ids(self, agent_id: str, dialogue_ids: List[str]) -> List[Dict[str, Any]]:
+        """Retrieve several conversations for a specific agent in one query, ordered by creation time.
+        
+        Args:
+            agent_id: ID of the agent
+            dialogue_ids: IDs of the dialogues to retrieve
+            
+        Returns:
+            List[Dict[str, Any]]: Conversation data of the dialogues found
+        """
+        if not dialogue_ids:
+            return []
+        logger.debug(f"Retrieving {len(dialogue_ids)} conversations by id for agent_id={agent_id}")
+        try:
+            with connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                placeholders = ",".join("?" * len(dialogue_ids))
+                cursor.execute(f'''
+                    SELECT dialogue_id, agent_id, dialogue, created_at
+                    FROM conversations
+                    WHERE agent_id = ? AND dialogue_id IN ({placeholders})
+                    ORDER BY created_at
+                ''', (agent_id, *dialogue_ids))
+                return [_row_to_conversation(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Error retrieving conversations by id from SQLite: {str(e)}", exc_info=True)
+            print(f"Error retrieving conversations: {str(e)}")
+            return []
+    
     def get_all_conversations(self, agent_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """Retrieve all conversations for a specific agent from the database, ordered by creation time.
         
@@ -157,14 +217,14 @@ class ConversationDB:
         """
         logger.debug(f"Retrieving all conversations from SQLite database for agent_id={agent_id}, limit: {limit}")
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 if limit:
                     cursor.execute('''
                         SELECT dialogue_id, agent_id, dialogue, created_at
                         FROM conversations
                         WHERE agent_id = ?
-                        ORDER BY created_at DESC
+                        ORDER BY created_at DESC, dialogue_id DESC
                         LIMIT ?
                     ''', (agent_id, limit))
                 else:
@@ -172,7 +232,7 @@ class ConversationDB:
                         SELECT dialogue_id, agent_id, dialogue, created_at
                         FROM conversations
                         WHERE agent_id = ?
-                        ORDER BY created_at DESC
+                        ORDER BY created_at DESC, dialogue_id DESC
                     ''', (agent_id,))
                 
                 rows = cursor.fetchall()
@@ -193,6 +253,76 @@ class ConversationDB:
             print(f"Error retrieving conversations: {str(e)}")
             return []
     
+    def get_conversations_page(self, agent_id: str, limit: int = 50, before: Optional[str] = None,
+                               after: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Retrieve one page of an agent's conversations using keyset pagination.
+        
+        Pages are read through the (agent_id, created_at, dialogue_id) index, so
+        the cost of a page does not grow with how far back it is.
+        
+        Args:
+            agent_id: ID of the agent
+            limit: Maximum number of conversations in the page
+            before: Cursor; return conversations older than it (newest first)
+            after: Cursor; return conversations newer than it (oldest first).
+                   An empty string starts from the oldest conversation.
+            
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[str]]: The page and the cursor to pass
+            in the same direction for the next page, or None when there are no more rows
+        """
+        if before is not None and after is not None:
+            raise ValueError("Pass either before or after, not both")
+        logger.debug(f"Retrieving conversations page for agent_id={agent_id}, limit: {limit}, before: {before}, after: {after}")
+        query = '''
+            SELECT dialogue_id, agent_id, dialogue, created_at
+            FROM conversations
+            WHERE agent_id = ?
+        '''
+        params: List[Any] = [agent_id]
+        if after is not None:
+            query += " AND (created_at, dialogue_id) > (?, ?) ORDER BY created_at, dialogue_id LIMIT ?"
+            params.extend(_parse_cursor(after))
+        elif before is not None:
+            query += " AND (created_at, dialogue_id) < (?, ?) ORDER BY created_at DESC, dialogue_id DESC LIMIT ?"
+            params.extend(_parse_cursor(before))
+        else:
+            query += " ORDER BY created_at DESC, dialogue_id DESC LIMIT ?"
+        params.append(limit)
+        try:
+            with connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                conversations = [_row_to_conversation(row) for row in cursor.fetchall()]
+            next_cursor = conversation_cursor(conversations[-1]) if len(conversations) == limit else None
+            logger.debug(f"Retrieved page of {len(conversations)} conversations for agent_id={agent_id}")
+            return conversations, next_cursor
+        except Exception as e:
+            logger.error(f"Error retrieving conversations page from SQLite: {str(e)}", exc_info=True)
+            print(f"Error retrieving conversations: {str(e)}")
+            return [], None
+    
+    def iter_conversations(self, agent_id: str, batch_size: int = 500, oldest_first: bool = True) -> Iterator[Dict[str, Any]]:
+        """Stream all of an agent's conversations, holding one batch in memory at a time.
+        
+        Args:
+            agent_id: ID of the agent
+            batch_size: Rows fetched per query
+            oldest_first: Stream in chronological order (default) or newest first
+            
+        Yields:
+            Dict[str, Any]: Conversation data
+        """
+        cursor_value = None
+        while True:
+            if oldest_first:
+                page, cursor_value = self.get_conversations_page(agent_id, limit=batch_size, after=cursor_value or "")
+            else:
+                page, cursor_value = self.get_conversations_page(agent_id, limit=batch_size, before=cursor_value)
+            yield from page
+            if cursor_value is None:
+                return
+    
     def delete_conversation(self, agent_id: str, dialogue_id: str) -> bool:
         """Delete a conversation for a specific agent from the database.
         
@@ -205,7 +335,7 @@ class ConversationDB:
         """
         logger.info(f"Deleting conversation from SQLite database: agent_id={agent_id}, dialogue_id={dialogue_id}")
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     DELETE FROM conversations
@@ -222,4 +352,67 @@ class ConversationDB:
         except Exception as e:
             logger.error(f"Error deleting conversation from SQLite: {str(e)}", exc_info=True)
             print(f"Error deleting conversation: {str(e)}")
-            return False 
\ No newline at end of file
+            return False 
+
+    def archive_conversations(self, before: str, archive_dir: str, dry_run: bool = False,
+                              batch_size: int = 1000) -> Tuple[int, int]:
+        """Move conversations created before a timestamp to gzip JSON-lines files and delete them.
+
+        Rows go to one file per month of creation, conversations_YYYY-MM.jsonl.gz
+        in archive_dir, and each batch is synced to disk before it is deleted.
+
+        Args:
+            before: 'YYYY-MM-DD HH:MM:SS' UTC; older conversations are archived
+            archive_dir: Directory of the archive files
+            dry_run: Only count the rows and their bytes
+            batch_size: Rows archived per transaction
+
+        Returns:
+            Tuple[int, int]: Rows archived and the bytes of their values
+        """
+        logger.info(f"Archiving conversations created before {before} to {archive_dir} (dry_run={dry_run})")
+        try:
+            with connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                if dry_run:
+                    cursor.execute('''
+                        SELECT COUNT(*), COALESCE(SUM(LENGTH(dialogue_id) + LENGTH(agent_id) + LENGTH(dialogue) + LENGTH(created_at)), 0)
+                        FROM conversations WHERE created_at < ?
+                    ''', (before,))
+                    rows, size = cursor.fetchone()
+                    return rows, size
+            archived, size = 0, 0
+            while True:
+                with connect(self.db_path) as conn:
+                    cursor = conn.cursor()
+                    cursor.execute('''
+                        SELECT dialogue_id, agent_id, dialogue, created_at FROM conversations
+                        WHERE created_at < ?
+                        ORDER BY created_at, dialogue_id
+                        LIMIT ?
+                    ''', (before, batch_size))
+                    conversations = [_row_to_conversation(row) for row in cursor.fetchall()]
+                    if not conversations:
+                        break
+                    by_month: Dict[str, List[Dict[str, Any]]] = {}
+                    for conversation in conversations:
+                        by_month.setdefault(str(conversation['created_at'])[:7], []).append(conversation)
+                    for month, month_conversations in by_month.items():
+                        append_archive(os.path.join(archive_dir, f"conversations_{month}.jsonl.gz"), month_conversations)
+                    placeholders = ", ".join("?" for _ in conversations)
+                    cursor.execute(
+                        f"DELETE FROM conversations WHERE dialogue_id IN ({placeholders})",
+                        [conversation['dialogue_id'] for conversation in conversations]
+                    )
+                    conn.commit()
+                archived += len(conversations)
+                size += sum(
+                    len(c['dialogue_id']) + len(c['agent_id']) + len(c['dialogue']) + len(str(c['created_at']))
+                    for c in conversations
+                )
+            logger.info(f"Archived {archived} conversations")
+            return archived, size
+        except Exception as e:
+            logger.error(f"Error archiving conversations: {str(e)}", exc_info=True)
+            print(f"Error archiving conversations: {str(e)}")
+            raise
@@ -0,0 +1,124 @@
+from typing import Dict, List, Tuple
+from datetime import datetime, timezone
+import atexit
+import queue
+import threading
+import time
+from .conversation_db import logger
+
+# Rows are (agent_id, dialogue_id, dialogue, created_at)
+ConversationRow = Tuple[str, str, str, str]
+
+_STOP = object()
+
+
+class ConversationWriter:
+    """Write-behind logger for conversation rows.
+
+    enqueue() puts the row on a bounded queue and returns. A background thread
+    commits queued rows in one transaction once batch_size rows are waiting or
+    flush_interval has passed since the first of them, and flushes what is left
+    at interpreter exit. When the queue is full the row is written
+    synchronously instead, so bursts slow down rather than lose rows.
+    """
+
+    def __init__(self, conversation_db, max_queue: int = 10000, batch_size: int = 100, flush_interval: float = 0.05):
+        """Start the writer.
+
+        Args:
+            conversation_db: ConversationDB the rows are written to
+            max_queue: Maximum rows waiting to be written
+            batch_size: Rows committed per transaction at most
+            flush_interval: Seconds a row may wait for more rows before being committed
+        """
+        self.conversation_db = conversation_db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="conversation-writer", daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    @property
+    def queue_depth(self) -> int:
+        """Rows waiting to be written."""
+        return self._queue.qsize()
+
+    def enqueue(self, agent_id: str, dialogue_id: str, dialogue: str) -> bool:
+        """Queue a conversation row; returns False only if a synchronous fallback write failed."""
+        created_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        row = (agent_id, dialogue_id, dialogue, created_at)
+        if not self._closed:
+            try:
+                self._queue.put_nowait(row)
+                return True
+            except queue.Full:
+                logger.warning("Conversation write queue is full, writing synchronously")
+        return self.conversation_db.save_conversations([row])
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                self._queue.task_done()
+                return
+            batch: List[ConversationRow] = [first]
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    row = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if row is _STOP:
+                    stop = True
+                    break
+                batch.append(row)
+            self._write(batch)
+            for _ in range(len(batch) + (1 if stop else 0)):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch: List[ConversationRow]) -> None:
+        if batch and not self.conversation_db.save_conversations(batch):
+            logger.error(f"Failed to write {len(batch)} queued conversation rows")
+
+    def flush(self) -> None:
+        """Block until every queued row has been written."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Write the remaining rows and stop the background thread."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._worker.is_alive():
+            self._queue.put(_STOP)
+            self._worker.join()
+        # Rows enqueued while the worker was stopping
+        leftover = []
+        while True:
+            try:
+                row = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if row is not _STOP:
+                leftover.append(row)
+        self._write(leftover)
+
+
+_writers: Dict[str, ConversationWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_conversation_writer(conversation_db, **kwargs) -> ConversationWriter:
+    """Return the process-wide writer for a conversation database file."""
+    with _writers_lock:
+        if conversation_db.db_path not in _writers:
+            _writers[conversation_db.db_path] = ConversationWriter(conversation_db, **kwargs)
+        return _writers[conversation_db.db_path]
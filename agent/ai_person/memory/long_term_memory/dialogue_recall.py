@@ -0,0 +1,167 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+import hashlib
+import os
+import queue
+import threading
+import time
+from common.storage import POSTGRES, get_storage_backend
+from common.logging_setup import setup_logging
+
+# Setup logging for dialogue recall
+def setup_dialogue_recall_logging():
+    """Setup logging for the dialogue recall module."""
+    return setup_logging("ai_person.memory.dialogue_recall", "dialogue_recall")
+
+# Initialize logger
+logger = setup_dialogue_recall_logging()
+
+# Dialogues embedded per API call by the background indexer
+EMBED_BATCH_SIZE = 32
+# Per-agent indexes kept open at once
+MAX_OPEN_INDEXES = 256
+# Table of dialogue vectors when state lives in PostgreSQL
+PGVECTOR_TABLE = "dialogue_embeddings"
+# Rows first allocated per agent index; most agents hold few dialogues, and
+# the files double as they fill up
+INITIAL_AGENT_CAPACITY = 16
+# Threads embedding recall queries; a hung call holds one until the API times out
+QUERY_WORKERS = 4
+
+
+class DialogueRecall:
+    """Per-agent vector index over past dialogue lines, for long-range recall.
+
+    Each agent gets its own MmapVectorIndex directory, so a recall only scores
+    that agent's history. With STORAGE_BACKEND=postgres the vectors go to a
+    pgvector table instead, one namespace per agent, so every agent process
+    sees the same history. add() queues the dialogue and returns; a daemon
+    thread embeds queued dialogues in batches and appends them to the index,
+    keeping the embedding call off the turn's critical path. recall() does
+    embed the query on the prompt path, so that call is bounded by
+    query_timeout.
+    """
+
+    def __init__(self, directory: str, embedding_function: Optional[Callable[[List[str]], List[List[float]]]] = None,
+                 dtype: str = "float16", query_timeout: Optional[float] = None):
+        """Create the recall index.
+
+        Args:
+            directory: Directory holding one sub-directory per agent
+            embedding_function: Callable embedding a list of texts; defaults to OpenAI text-embedding-3-small
+            dtype: Storage type of the vectors, "float16" or "int8"
+            query_timeout: Seconds recall() waits for the query embedding, from
+                CONVERSATION_RECALL_TIMEOUT_MS by default; 0 waits indefinitely
+        """
+        if embedding_function is None:
+            from .embeddings import OpenAIEmbeddingFunction
+            embedding_function = OpenAIEmbeddingFunction(model_name="text-embedding-3-small")
+        self.directory = directory
+        self.embedding_function = embedding_function
+        self.dtype = dtype
+        if query_timeout is None:
+            query_timeout = int(os.getenv("CONVERSATION_RECALL_TIMEOUT_MS", "2000")) / 1000
+        self.query_timeout = query_timeout or None
+        self._query_executor = ThreadPoolExecutor(max_workers=QUERY_WORKERS, thread_name_prefix="dialogue-recall-query")
+        self.use_pgvector = get_storage_backend() == POSTGRES
+        self._indexes: "OrderedDict[str, object]" = OrderedDict()
+        self._indexes_lock = threading.Lock()
+        self._queue: "queue.Queue[Tuple[str, str, str, int]]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="dialogue-recall-indexer", daemon=True)
+        self._worker.start()
+
+    def _open_index(self, agent_id: str):
+        if self.use_pgvector:
+            from .pgvector_index import PgVectorIndex
+            return PgVectorIndex(PGVECTOR_TABLE, namespace=agent_id)
+        from .mmap_vector_index import MmapVectorIndex
+        agent_key = hashlib.sha1(agent_id.encode('utf-8')).hexdigest()[:16]
+        return MmapVectorIndex(os.path.join(self.directory, agent_key), dtype=self.dtype, initial_capacity=INITIAL_AGENT_CAPACITY)
+
+    def _index(self, agent_id: str):
+        with self._indexes_lock:
+            index = self._indexes.get(agent_id)
+            if index is None:
+                index = self._open_index(agent_id)
+                self._indexes[agent_id] = index
+                while len(self._indexes) > MAX_OPEN_INDEXES:
+                    self._indexes.popitem(last=False)
+            else:
+                self._indexes.move_to_end(agent_id)
+            return index
+
+    def add(self, agent_id: str, dialogue_id: str, dialogue: str, timestamp: Optional[int] = None) -> None:
+        """Queue a dialogue line for indexing; returns immediately."""
+        if dialogue and dialogue.strip():
+            self._queue.put((agent_id, dialogue_id, dialogue, timestamp or int(time.time())))
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < EMBED_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._index_batch(batch)
+            except Exception as e:
+                logger.error(f"Error indexing {len(batch)} dialogues for recall: {str(e)}", exc_info=True)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _index_batch(self, batch: List[Tuple[str, str, str, int]]) -> None:
+        vectors = self.embedding_function([dialogue for _, _, dialogue, _ in batch])
+        by_agent: Dict[str, List[int]] = {}
+        for position, (agent_id, _, _, _) in enumerate(batch):
+            by_agent.setdefault(agent_id, []).append(position)
+        for agent_id, positions in by_agent.items():
+            self._index(agent_id).add_many(
+                [batch[position][1] for position in positions],
+                [vectors[position] for position in positions],
+                timestamps=[batch[position][3] for position in positions]
+            )
+        logger.debug(f"Indexed {len(batch)} dialogues for {len(by_agent)} agent(s)")
+
+    def recall(self, agent_id: str, query: str, top_k: int = 3, min_similarity: float = 0.0) -> List[Tuple[str, float]]:
+        """Return the agent's past dialogues most similar to the query.
+
+        Args:
+            agent_id: ID of the agent
+            query: Text to match, usually the latest human message
+            top_k: Number of dialogues to return
+            min_similarity: Drop matches with a lower cosine similarity
+
+        Returns:
+            List[Tuple[str, float]]: (dialogue_id, cosine similarity) pairs, best match first
+
+        Raises:
+            concurrent.futures.TimeoutError: If the query is not embedded within query_timeout
+        """
+        index = self._index(agent_id)
+        # Pick up rows the indexer appended through another instance of this agent's index
+        index.refresh()
+        if index.count == 0 or not query.strip():
+            return []
+        query_vector = self._query_executor.submit(self.embedding_function, [query]).result(timeout=self.query_timeout)[0]
+        results = index.search(query_vector, top_k=top_k)
+        return [(dialogue_id, similarity) for dialogue_id, similarity in results if similarity >= min_similarity]
+
+    def wait_until_idle(self) -> None:
+        """Block until every queued dialogue has been indexed."""
+        self._queue.join()
+
+
+_shared_recall: Optional[DialogueRecall] = None
+_shared_recall_lock = threading.Lock()
+
+
+def get_dialogue_recall(directory: str) -> DialogueRecall:
+    """Return the process-wide DialogueRecall; one indexer thread must own the index files."""
+    global _shared_recall
+    with _shared_recall_lock:
+        if _shared_recall is None:
+            _shared_recall = DialogueRecall(directory)
+        return _shared_recall
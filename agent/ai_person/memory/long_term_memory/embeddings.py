@@ -0,0 +1,30 @@
+from typing import List, Optional
+import os
+
+
+class OpenAIEmbeddingFunction:
+    """Embeds texts with the OpenAI embeddings API.
+
+    The client is created on first use so that importing this module does not
+    require the OpenAI SDK or an API key.
+    """
+
+    def __init__(self, model_name: str = "text-embedding-3-small", api_key: Optional[str] = None):
+        self.model_name = model_name
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        if not self.api_key:
+            raise ValueError("OPENAI_API_KEY environment variable is required")
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            from openai import OpenAI
+            self._client = OpenAI(api_key=self.api_key)
+        return self._client
+
+    def __call__(self, texts: List[str]) -> List[List[float]]:
+        """Return one embedding per input text, in input order."""
+        if not texts:
+            return []
+        response = self._get_client().embeddings.create(model=self.model_name, input=texts)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
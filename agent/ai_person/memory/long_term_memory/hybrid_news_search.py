@@ -0,0 +1,170 @@
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+import re
+import time
+from common.logging_setup import setup_logging
+
+# Setup logging for hybrid news search
+def setup_hybrid_search_logging():
+    """Setup logging for the hybrid news search module."""
+    return setup_logging("ai_person.memory.hybrid_news_search", "hybrid_news_search")
+
+# Initialize logger
+logger = setup_hybrid_search_logging()
+
+# Constant from the original reciprocal-rank fusion paper; dampens the
+# influence of the very top ranks so neither retriever dominates.
+DEFAULT_RRF_K = 60
+
+Reranker = Callable[[str, List[Tuple[str, float]]], List[Tuple[str, float]]]
+
+
+def reciprocal_rank_fusion(ranked_lists: Iterable[List[str]], k: int = DEFAULT_RRF_K) -> List[Tuple[str, float]]:
+    """Fuse several ranked id lists into one using reciprocal-rank fusion.
+
+    Args:
+        ranked_lists: Lists of ids, each ordered best match first
+        k: RRF damping constant
+
+    Returns:
+        List[Tuple[str, float]]: (id, fused score) pairs, highest score first
+    """
+    scores: Dict[str, float] = {}
+    for ranked_ids in ranked_lists:
+        for rank, item_id in enumerate(ranked_ids, 1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def recency_decay(age_seconds: float, half_life_days: float) -> float:
+    """Exponential decay factor: 1.0 for brand new items, 0.5 after one half-life."""
+    if half_life_days <= 0:
+        return 1.0
+    return 0.5 ** (max(age_seconds, 0.0) / (half_life_days * 86400.0))
+
+
+class KeywordOverlapReranker:
+    """Lightweight reranker that boosts candidates whose headline contains the query terms.
+
+    Exact entity names ("Anthropic", "GPT-4o") are what users ask about, so a
+    candidate mentioning them in its title or summary is moved ahead of one
+    that only matched semantically.
+
+    The weights are fractions of the best candidate's score, so the boost
+    keeps the same effect whatever the scale of the fused scores: RRF scores
+    are at most 2 / (k + 1), about 0.03 with the default k.
+    """
+
+    def __init__(self, news_db, title_weight: float = 0.3, summary_weight: float = 0.15):
+        """Initialize the reranker.
+
+        Args:
+            news_db: NewsDB instance providing the headlines
+            title_weight: Boost for a title containing every query term, as a fraction of the top score
+            summary_weight: Boost for a summary containing every query term, as a fraction of the top score
+        """
+        self.news_db = news_db
+        self.title_weight = title_weight
+        self.summary_weight = summary_weight
+
+    def __call__(self, query: str, candidates: List[Tuple[str, float]]) -> List[Tuple[str, float]]:
+        terms = set(re.findall(r"\w+", query.lower()))
+        if not terms or not candidates:
+            return candidates
+        top_score = max(score for _, score in candidates)
+        headlines = self.news_db.get_news_headlines([news_id for news_id, _ in candidates])
+        reranked = []
+        for news_id, score in candidates:
+            title, summary = headlines.get(news_id, ('', ''))
+            title_terms = set(re.findall(r"\w+", title.lower()))
+            summary_terms = set(re.findall(r"\w+", summary.lower()))
+            title_overlap = len(terms & title_terms) / len(terms)
+            summary_overlap = len(terms & summary_terms) / len(terms)
+            boost = self.title_weight * title_overlap + self.summary_weight * summary_overlap
+            reranked.append((news_id, score + top_score * boost))
+        return sorted(reranked, key=lambda item: item[1], reverse=True)
+
+
+class HybridNewsRetriever:
+    """Combines BM25 keyword search with vector search over the stored news."""
+
+    def __init__(self, news_db, news_vector_db, rrf_k: int = DEFAULT_RRF_K,
+                 min_candidates: int = 20, candidate_multiplier: int = 5,
+                 reranker: Optional[Reranker] = None,
+                 recency_half_life_days: float = 0.0, recency_weight: float = 0.5):
+        """Initialize the hybrid retriever.
+
+        Args:
+            news_db: NewsDB instance providing the BM25 index
+            news_vector_db: NewsVectorDB instance providing the dense index
+            rrf_k: Reciprocal-rank fusion damping constant
+            min_candidates: Minimum number of candidates pulled from each retriever
+            candidate_multiplier: Candidates pulled per requested result
+            reranker: Optional callable that reorders the fused candidates
+            recency_half_life_days: Half-life of the recency decay; 0 disables it
+            recency_weight: Share of the score subject to the decay, between 0 and 1
+        """
+        self.news_db = news_db
+        self.news_vector_db = news_vector_db
+        self.rrf_k = rrf_k
+        self.min_candidates = min_candidates
+        self.candidate_multiplier = candidate_multiplier
+        self.reranker = reranker
+        self.recency_half_life_days = recency_half_life_days
+        self.recency_weight = recency_weight
+
+    def _apply_recency(self, candidates: List[Tuple[str, float]]) -> List[Tuple[str, float]]:
+        """Scale scores down for older items so fresh news wins close calls."""
+        if self.recency_half_life_days <= 0 or not candidates:
+            return candidates
+        now = time.time()
+        timestamps = self.news_db.get_published_timestamps([news_id for news_id, _ in candidates])
+        rescored = []
+        for news_id, score in candidates:
+            published_ts = timestamps.get(news_id)
+            decay = recency_decay(now - published_ts, self.recency_half_life_days) if published_ts else 1.0
+            rescored.append((news_id, score * (1.0 - self.recency_weight + self.recency_weight * decay)))
+        return sorted(rescored, key=lambda item: item[1], reverse=True)
+
+    def search(self, query: str, top_k: int = 3, allowed_ids: Optional[Set[str]] = None,
+               since_ts: Optional[int] = None,
+               filter_ids: Optional[Callable[[List[str]], Set[str]]] = None) -> List[str]:
+        """Return the ids of the news items that best match the query.
+
+        Args:
+            query: Search query string
+            top_k: Number of results to return
+            allowed_ids: Optional set of ids the results are restricted to
+            since_ts: Optional epoch seconds; older news items are excluded
+            filter_ids: Optional function returning which of the candidate ids
+                are allowed, called once with all candidates
+
+        Returns:
+            List[str]: News IDs, best match first
+        """
+        candidate_count = max(self.min_candidates, top_k * self.candidate_multiplier)
+        logger.info(f"Hybrid search for query: '{query}', top_k: {top_k}, candidates: {candidate_count}, since_ts: {since_ts}")
+
+        keyword_ids = [news_id for news_id, _ in self.news_db.search_news_bm25(query, top_k=candidate_count, since_ts=since_ts)]
+        try:
+            vector_ids = [news_id for news_id, _ in self.news_vector_db.search_news_with_scores(query, top_k=candidate_count, since_ts=since_ts)]
+        except Exception as e:
+            logger.error(f"Vector search failed, falling back to keyword results only: {str(e)}", exc_info=True)
+            vector_ids = []
+        logger.debug(f"BM25 returned {len(keyword_ids)} ids, vector search returned {len(vector_ids)} ids")
+
+        if allowed_ids is not None:
+            keyword_ids = [news_id for news_id in keyword_ids if news_id in allowed_ids]
+            vector_ids = [news_id for news_id in vector_ids if news_id in allowed_ids]
+        if filter_ids is not None:
+            allowed = filter_ids(list(dict.fromkeys(keyword_ids + vector_ids)))
+            keyword_ids = [news_id for news_id in keyword_ids if news_id in allowed]
+            vector_ids = [news_id for news_id in vector_ids if news_id in allowed]
+
+        fused = reciprocal_rank_fusion([keyword_ids, vector_ids], k=self.rrf_k)
+        if self.reranker and fused:
+            fused = self.reranker(query, fused)
+        fused = self._apply_recency(fused)
+
+        news_ids = [news_id for news_id, _ in fused[:top_k]]
+        logger.debug(f"Hybrid search results: {news_ids}")
+        return news_ids
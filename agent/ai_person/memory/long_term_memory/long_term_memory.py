@@ -2,46 +2,21 @@ from .user_info import UserInfo
 from .news_vector_db import NewsVectorDB
 from .news_db import NewsDB
 from .conversation_db import ConversationDB
-from typing import Dict, Any, Optional, List
-import logging
+from .conversation_writer import get_conversation_writer
+from .dialogue_recall import get_dialogue_recall
+from .hybrid_news_search import HybridNewsRetriever, KeywordOverlapReranker
+from .near_duplicate import news_signature, news_words, DEFAULT_DUPLICATE_THRESHOLD
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, Any, Iterator, Optional, List, Set, Tuple
 import os
-from datetime import datetime
+import time
 import uuid
+from common.logging_setup import setup_logging
 
 # Setup logging for long term memory
 def setup_memory_logging():
     """Setup logging for the long term memory module."""
-    log_dir = "logs"
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-
-    log_file = os.path.join(log_dir, f"long_term_memory_{datetime.now().strftime('%Y%m%d')}.log")
-    
-    # Create logger
-    logger = logging.getLogger("ai_person.memory.long_term_memory")
-    logger.setLevel(logging.DEBUG)
-    
-    # Remove any existing handlers
-    for handler in logger.handlers[:]:
-        logger.removeHandler(handler)
-    
-    # Create file handler
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setLevel(logging.DEBUG)
-    file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(file_formatter)
-    
-    # Create console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_formatter = logging.Formatter('%(levelname)s - %(message)s')
-    console_handler.setFormatter(console_formatter)
-    
-    # Add handlers to logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
-    return logger
+    return setup_logging("ai_person.memory.long_term_memory", "long_term_memory")
 
 # Initialize logger
 logger = setup_memory_logging()
@@ -53,7 +28,39 @@ class LongTermMemory:
         self.user_info = UserInfo()
         self.news_vector_db = NewsVectorDB()
         self.news_db = NewsDB()
+        self.news_vector_db.backfill_timestamps(self.news_db.get_published_timestamps)
         self.conversation_db = ConversationDB()
+        self.conversation_writer = None
+        if os.getenv("CONVERSATION_WRITE_BEHIND", "true").lower() == "true":
+            self.conversation_writer = get_conversation_writer(
+                self.conversation_db,
+                max_queue=int(os.getenv("CONVERSATION_WRITE_QUEUE_SIZE", "10000")),
+                batch_size=int(os.getenv("CONVERSATION_WRITE_BATCH_SIZE", "100")),
+                flush_interval=float(os.getenv("CONVERSATION_WRITE_FLUSH_MS", "50")) / 1000.0
+            )
+        reranker = None
+        if os.getenv("NEWS_SEARCH_RERANKER", "keyword") == "keyword":
+            reranker = KeywordOverlapReranker(
+                self.news_db,
+                title_weight=float(os.getenv("NEWS_RERANK_TITLE_WEIGHT", "0.3")),
+                summary_weight=float(os.getenv("NEWS_RERANK_SUMMARY_WEIGHT", "0.15"))
+            )
+        self.news_retriever = HybridNewsRetriever(
+            self.news_db,
+            self.news_vector_db,
+            reranker=reranker,
+            recency_half_life_days=float(os.getenv("NEWS_RECENCY_HALF_LIFE_DAYS", "30")),
+            recency_weight=float(os.getenv("NEWS_RECENCY_WEIGHT", "0.5"))
+        )
+        self.search_window_days = int(os.getenv("NEWS_SEARCH_WINDOW_DAYS", "0"))
+        self.duplicate_threshold = float(os.getenv("NEWS_DUPLICATE_THRESHOLD", DEFAULT_DUPLICATE_THRESHOLD))
+        self.dialogue_recall = None
+        if os.getenv("CONVERSATION_RECALL_ENABLED", "true").lower() == "true":
+            try:
+                recall_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "conversation_vectors")
+                self.dialogue_recall = get_dialogue_recall(recall_dir)
+            except Exception as e:
+                logger.error(f"Conversation recall disabled, could not create the index: {str(e)}", exc_info=True)
         logger.info("LongTermMemory initialization complete")
 
     def get_user_information_text(self, agent_id: str) -> str:
@@ -62,9 +69,19 @@ class LongTermMemory:
     def update_user_information(self, agent_id: str, field, value):
         logger.debug(f"Updating user information: {field} = {value}")
         return self.user_info.update_user_info(agent_id, field=field, value=value)
+
+    def update_user_information_fields(self, agent_id: str, fields: Dict[str, Any], expected_version: Optional[int] = None) -> bool:
+        logger.debug(f"Updating user information fields: {list(fields)}")
+        return self.user_info.update_user_info_fields(agent_id, fields, expected_version=expected_version)
+
+    def get_user_information_version(self, agent_id: str) -> int:
+        return self.user_info.get_user_info_version(agent_id)
     
     def save_news_item(self, agent_id: str, news_item: Dict[str, Any]) -> Optional[str]:
-        """Save a news item to both vector database and SQLite database.
+        """Save a news item to both SQLite database and vector database.
+
+        If the link is already stored, e.g. saved by another agent since it was
+        looked up, the existing ID is returned.
         
         Args:
             agent_id: ID of the agent
@@ -76,19 +93,39 @@ class LongTermMemory:
         """
         logger.info(f"Saving news item: {news_item.get('title', 'No title')}")
         try:
-            # First save to vector database to get the news_id
-            logger.debug("Saving to vector database")
-            news_id = self.news_vector_db.add_news_item(news_item)
+            news_id = str(uuid.uuid4())
             logger.debug(f"Generated news_id: {news_id}")
-            
-            # Then save full details to SQLite
+
+            # First save full details to SQLite, with the signature used for near-duplicate lookups.
+            # The row goes first so a rejected insert, e.g. a link another agent saved
+            # meanwhile, never leaves a vector behind
             logger.debug("Saving to SQLite database")
-            if self.news_db.save_news_item(news_id, news_item):
-                logger.info(f"Successfully saved news item with ID: {news_id}")
-                return news_id
-            else:
+            if not self.news_db.save_news_item(news_id, news_item, signature=news_signature(news_item)):
+                existing_id = self.news_db.link_exists(news_item.get('link', '')) if news_item.get('link') else None
+                if existing_id:
+                    logger.info(f"News item was already saved with ID: {existing_id}")
+                    if news_item.get('alternates'):
+                        self.news_db.add_alternate_links(existing_id, news_item['alternates'])
+                    return existing_id
                 logger.error("Failed to save news item to SQLite database")
                 return None
+
+            # Then the vector; without one the row is deleted again, so the link is saved on a later fetch
+            logger.debug("Saving to vector database")
+            try:
+                self.news_vector_db.add_news_item(news_item, news_id=news_id)
+            except Exception:
+                self.news_db.delete_news_items([news_id])
+                try:
+                    self.news_vector_db.delete_news_items([news_id])
+                except Exception as e:
+                    logger.error(f"Error removing partial vector of news_id {news_id}: {str(e)}")
+                raise
+
+            logger.info(f"Successfully saved news item with ID: {news_id}")
+            if news_item.get('alternates'):
+                self.news_db.add_alternate_links(news_id, news_item['alternates'])
+            return news_id
         except Exception as e:
             logger.error(f"Error saving news item: {str(e)}", exc_info=True)
             print(f"Error saving news item: {str(e)}")
@@ -109,34 +146,55 @@ class LongTermMemory:
         news_item = self.news_db.get_news_item(news_id)
         if news_item:
             logger.debug(f"Successfully retrieved news item: {news_item.get('title', 'No title')}")
-        else:
-            logger.warning(f"No news item found with ID: {news_id}")
-        return news_item
+            return news_item.to_dict()
+        logger.warning(f"No news item found with ID: {news_id}")
+        return None
+
+    def get_news_items(self, agent_id: str, news_ids: List[str], fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Retrieve several news items in one query.
+
+        Args:
+            agent_id: ID of the agent
+            news_ids: IDs of the news items to retrieve
+            fields: Columns to return (see NEWS_ITEM_FIELDS); defaults to all
+
+        Returns:
+            List[Dict[str, Any]]: The items found, in the order of news_ids
+        """
+        return [news_item.to_dict() for news_item in self.news_db.get_news_items(news_ids, fields=fields)]
     
-    def search_relevant_news(self, agent_id: str, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
-        """Search for news items relevant to the query and return their full details, filtered by agent_id."""
-        logger.info(f"Searching for relevant news with query: '{query}', top_k: {top_k}, agent_id: {agent_id}")
+    def search_relevant_news(self, agent_id: str, query: str, top_k: int = 3, since_days: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Search for news items relevant to the query and return their full details, filtered by agent_id.
+
+        Uses hybrid retrieval: BM25 keyword matches and vector matches are fused
+        with reciprocal-rank fusion, optionally reranked, and weighted by recency.
+
+        Args:
+            agent_id: ID of the agent
+            query: Search query string
+            top_k: Number of results to return
+            since_days: Only consider news published in the last N days.
+                        Defaults to NEWS_SEARCH_WINDOW_DAYS; 0 means no window.
+        """
+        if since_days is None:
+            since_days = self.search_window_days
+        since_ts = int(time.time()) - since_days * 86400 if since_days else None
+        logger.info(f"Searching for relevant news with query: '{query}', top_k: {top_k}, agent_id: {agent_id}, since_days: {since_days}")
         try:
-            # First get relevant news IDs from vector database
-            logger.debug("Searching vector database for relevant news IDs")
-            news_ids = self.news_vector_db.search_news(query, top_k=top_k)
-            logger.debug(f"Found {len(news_ids)} relevant news IDs: {news_ids}")
-
-            # Filter news_ids to only those processed by this agent
-            processed_news_ids = set(self.news_db.get_news_ids_processed_by_agent(agent_id))
-            news_ids = [nid for nid in news_ids if nid in processed_news_ids]
-            logger.debug(f"Filtered news_ids for agent_id {agent_id}: {news_ids}")
-
-            # Then get full details for each news item from SQLite
-            news_items = []
-            for i, news_id in enumerate(news_ids):
-                logger.debug(f"Retrieving details for news item {i+1}/{len(news_ids)}: {news_id}")
-                news_item = self.get_news_item(agent_id, news_id)
-                if news_item:
-                    news_items.append(news_item)
-                    logger.debug(f"Added news item to results: {news_item.get('title', 'No title')}")
-                else:
-                    logger.warning(f"Could not retrieve details for news_id: {news_id}")
+            # Only news this agent has already processed is eligible; checked
+            # for the retrieved candidates only, against the agent's read state
+            logger.debug("Running hybrid search for relevant news IDs")
+            news_ids = self.news_retriever.search(
+                query, top_k=top_k, since_ts=since_ts,
+                filter_ids=lambda candidate_ids: self.news_db.get_news_ids_processed_by_agent_among(agent_id, candidate_ids)
+            )
+            logger.debug(f"Found {len(news_ids)} relevant news IDs for agent_id {agent_id}: {news_ids}")
+
+            # Then get full details for all of them in one query, keeping the ranking order
+            news_items = self.get_news_items(agent_id, news_ids)
+            if len(news_items) < len(news_ids):
+                found = {news_item['news_id'] for news_item in news_items}
+                logger.warning(f"Could not retrieve details for news_ids: {[news_id for news_id in news_ids if news_id not in found]}")
 
             logger.info(f"Search completed, returning {len(news_items)} news items")
             return news_items
@@ -169,9 +227,59 @@ class LongTermMemory:
             print(f"Error checking link existence in long-term memory: {str(e)}")
             return None
     
+    def check_links_exist(self, agent_id: str, links: List[str]) -> Dict[str, str]:
+        """Check many news links at once.
+        
+        Args:
+            agent_id: ID of the agent
+            links: The URL links to check for existence
+            
+        Returns:
+            Dict[str, str]: Mapping of each link that already exists to its news_id
+        """
+        logger.debug(f"Bulk checking {len(links)} links")
+        return self.news_db.get_news_ids_for_links(links)
+
+    def get_processed_news_ids(self, agent_id: str, news_ids: List[str]) -> Set[str]:
+        """Return which of the given news_ids have already been processed by the agent."""
+        return self.news_db.get_news_ids_processed_by_agent_among(agent_id, news_ids)
+
+    def mark_news_processed(self, agent_id: str, news_ids: List[str]) -> bool:
+        """Mark news items as processed by the agent."""
+        return self.news_db.mark_news_ids_processed_by_agent(agent_id, news_ids)
+
+    def find_near_duplicate_news(self, agent_id: str, news_item: Dict[str, Any]) -> Optional[str]:
+        """Find an already stored news item covering the same story as the given one.
+        
+        Args:
+            agent_id: ID of the agent
+            news_item: News item dict with title, summary and content
+            
+        Returns:
+            Optional[str]: The news_id of the closest stored duplicate, None if there is none
+        """
+        logger.debug(f"Checking for near-duplicates of: {news_item.get('title', 'No title')}")
+        matches = self.news_db.find_near_duplicates(news_signature(news_item), self.duplicate_threshold, words=news_words(news_item))
+        if matches:
+            news_id, similarity = matches[0]
+            logger.info(f"Found near-duplicate news item {news_id} (similarity {similarity:.2f}) for: {news_item.get('title', 'No title')}")
+            return news_id
+        return None
+
+    def save_alternate_links(self, agent_id: str, news_id: str, alternates: List[Dict[str, Any]]) -> bool:
+        """Record links of near-duplicate stories as alternates of a stored news item."""
+        return self.news_db.add_alternate_links(news_id, alternates)
+
+    def get_alternate_links(self, agent_id: str, news_id: str) -> List[Dict[str, Any]]:
+        """Return the alternate links recorded for a stored news item."""
+        return self.news_db.get_alternate_links(news_id)
+
     def save_dialogue(self, agent_id: str, dialogue: str) -> Optional[str]:
         """Save a conversation dialogue to the conversation database.
         
+        With write-behind enabled the row is queued and committed in a batch by
+        the background writer shortly after this returns.
+        
         Args:
             agent_id: ID of the agent
             dialogue: The conversation dialogue text to save
@@ -179,25 +287,73 @@ class LongTermMemory:
         Returns:
             Optional[str]: The ID of the saved conversation if successful, None otherwise
         """
-        logger.info(f"Saving dialogue to conversation database")
-        logger.debug(f"Dialogue length: {len(dialogue)} characters")
         try:
             # Generate a unique conversation ID
             conversation_id = str(uuid.uuid4())
-            logger.debug(f"Generated conversation_id: {conversation_id}")
+            logger.debug(f"Saving dialogue {conversation_id}, length: {len(dialogue)} characters")
             
-            # Save to conversation database
-            if self.conversation_db.save_conversation(agent_id, conversation_id, dialogue):
-                logger.info(f"Successfully saved dialogue with ID: {conversation_id}")
-                return conversation_id
+            if self.conversation_writer is not None:
+                saved = self.conversation_writer.enqueue(agent_id, conversation_id, dialogue)
             else:
+                saved = self.conversation_db.save_conversation(agent_id, conversation_id, dialogue)
+            if not saved:
                 logger.error("Failed to save dialogue to conversation database")
                 return None
+            if self.dialogue_recall is not None:
+                self.dialogue_recall.add(agent_id, conversation_id, dialogue)
+            return conversation_id
         except Exception as e:
             logger.error(f"Error saving dialogue: {str(e)}", exc_info=True)
             print(f"Error saving dialogue: {str(e)}")
             return None
-    
+
+    def get_conversation_write_queue_depth(self) -> int:
+        """Number of dialogue rows waiting for the background writer."""
+        return self.conversation_writer.queue_depth if self.conversation_writer is not None else 0
+
+    def flush_conversations(self) -> None:
+        """Block until queued dialogue rows are committed, e.g. before reading history back."""
+        if self.conversation_writer is not None:
+            self.conversation_writer.flush()
+
+    def recall_dialogues(self, agent_id: str, query: str, top_k: int = 3,
+                         exclude_dialogues: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """Return the past dialogues most relevant to the query, oldest first.
+        
+        Args:
+            agent_id: ID of the agent
+            query: Text to match, usually the latest human message
+            top_k: Number of dialogues to return
+            exclude_dialogues: Dialogue texts to leave out, e.g. those still in short-term memory
+            
+        Returns:
+            List[Dict[str, Any]]: Conversation data with an added 'similarity' key
+        """
+        if self.dialogue_recall is None:
+            return []
+        exclude_dialogues = exclude_dialogues or set()
+        try:
+            # Over-fetch so excluded recent lines do not leave the result short
+            matches = self.dialogue_recall.recall(
+                agent_id, query, top_k=top_k + len(exclude_dialogues),
+                min_similarity=float(os.getenv("CONVERSATION_RECALL_MIN_SIMILARITY", "0.3"))
+            )
+            similarities = dict(matches)
+            conversations = self.conversation_db.get_conversations_by_ids(agent_id, [dialogue_id for dialogue_id, _ in matches])
+            conversations = [conversation for conversation in conversations if conversation['dialogue'] not in exclude_dialogues]
+            conversations = sorted(conversations, key=lambda conversation: similarities[conversation['dialogue_id']], reverse=True)[:top_k]
+            for conversation in conversations:
+                conversation['similarity'] = similarities[conversation['dialogue_id']]
+            logger.debug(f"Recalled {len(conversations)} dialogues for agent_id={agent_id}")
+            return sorted(conversations, key=lambda conversation: conversation['created_at'])
+        except FutureTimeoutError:
+            logger.warning(f"Skipped conversation recall for agent_id={agent_id}: query embedding timed out")
+            return []
+        except Exception as e:
+            logger.error(f"Error recalling dialogues: {str(e)}", exc_info=True)
+            print(f"Error recalling dialogues: {str(e)}")
+            return []
+
     def get_conversation(self, agent_id: str, conversation_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve a conversation from the conversation database.
         
@@ -209,6 +365,7 @@ class LongTermMemory:
             Optional[Dict[str, Any]]: Conversation data if found, None otherwise
         """
         logger.debug(f"Retrieving conversation with ID: {conversation_id}")
+        self.flush_conversations()
         conversation = self.conversation_db.get_conversation(agent_id, conversation_id)
         if conversation:
             logger.debug(f"Successfully retrieved conversation: {conversation_id}")
@@ -227,6 +384,7 @@ class LongTermMemory:
             List[Dict[str, Any]]: List of conversation data
         """
         logger.info(f"Retrieving all conversations for agent_id={agent_id}, limit: {limit}")
+        self.flush_conversations()
         try:
             conversations = self.conversation_db.get_all_conversations(agent_id, limit=limit)
             logger.info(f"Retrieved {len(conversations)} conversations")
@@ -235,5 +393,26 @@ class LongTermMemory:
             logger.error(f"Error retrieving conversations: {str(e)}", exc_info=True)
             print(f"Error retrieving conversations: {str(e)}")
             return []
-    
-    
\ No newline at end of file
+
+    def get_conversations_page(self, agent_id: str, limit: int = 50, before: Optional[str] = None,
+                               after: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Retrieve one page of conversation history using keyset cursors.
+        
+        Args:
+            agent_id: ID of the agent
+            limit: Maximum number of conversations in the page
+            before: Cursor; return conversations older than it (newest first)
+            after: Cursor; return conversations newer than it (oldest first)
+            
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[str]]: The page and the cursor for the next page, if any
+        """
+        logger.info(f"Retrieving conversations page for agent_id={agent_id}, limit: {limit}")
+        self.flush_conversations()
+        return self.conversation_db.get_conversations_page(agent_id, limit=limit, before=before, after=after)
+
+    def iter_conversations(self, agent_id: str, batch_size: int = 500, oldest_first: bool = True) -> Iterator[Dict[str, Any]]:
+        """Stream the whole conversation history in bounded batches."""
+        logger.info(f"Streaming conversations for agent_id={agent_id}, batch_size: {batch_size}")
+        self.flush_conversations()
+        return self.conversation_db.iter_conversations(agent_id, batch_size=batch_size, oldest_first=oldest_first)
@@ -0,0 +1,392 @@
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from contextlib import nullcontext
+import json
+import os
+import threading
+import numpy as np
+from common.backup import index_write_lock
+from common.logging_setup import setup_logging
+
+# Setup logging for the mmap vector index
+def setup_mmap_index_logging():
+    """Setup logging for the mmap vector index module."""
+    return setup_logging("ai_person.memory.mmap_vector_index", "mmap_vector_index")
+
+# Initialize logger
+logger = setup_mmap_index_logging()
+
+VECTORS_FILE = "vectors.npy"
+SCALES_FILE = "scales.npy"
+TIMESTAMPS_FILE = "timestamps.npy"
+IDS_FILE = "ids.json"
+HNSW_FILE = "hnsw.bin"
+
+SUPPORTED_DTYPES = ("float16", "int8")
+INITIAL_CAPACITY = 1024
+# Rows scored per matrix product, to bound the float32 scratch memory
+QUERY_CHUNK_ROWS = 8192
+# Times a reader retries mapping the files while the writer replaces them
+LOAD_ATTEMPTS = 5
+
+
+class MmapVectorIndex:
+    """Flat cosine-similarity index stored in memory-mapped NumPy files.
+
+    Vectors are L2-normalized and stored as float16, or as int8 with one float32
+    scale per row. An int64 timestamp per row (0 when unknown) allows searches to
+    be restricted to recent items. The id of each row is kept in ids.json, which is written
+    after the vectors, so its length is the number of valid rows. Opening the
+    index only maps the files, and read-only instances in several worker
+    processes share the same pages through the OS page cache.
+
+    A single process is expected to write; readers call refresh() to pick up
+    rows appended or removed since they opened the index. Writes hold the
+    directory's shared write lock (see index_write_lock), so a backup can
+    pause them while it copies the files.
+    """
+
+    def __init__(self, directory: str, dtype: str = "float16", read_only: bool = False, use_hnsw: bool = False,
+                 initial_capacity: int = INITIAL_CAPACITY):
+        """Open or create the index.
+
+        Args:
+            directory: Directory holding the index files
+            dtype: Storage type for new indexes, "float16" or "int8"
+            read_only: Map the files read-only and never write
+            use_hnsw: Build or load an HNSW graph (requires hnswlib) for approximate search
+            initial_capacity: Rows allocated when the first vectors are added; the files double when full
+        """
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported dtype '{dtype}', expected one of {SUPPORTED_DTYPES}")
+        self.directory = directory
+        self.dtype = dtype
+        self.read_only = read_only
+        self.use_hnsw = use_hnsw
+        self.initial_capacity = max(initial_capacity, 1)
+        self._lock = threading.RLock()
+        self._vectors = None
+        self._scales = None
+        self._timestamps = None
+        self._ids: List[str] = []
+        self._ids_mtime = None
+        self._hnsw = None
+        if not read_only:
+            os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    @property
+    def count(self) -> int:
+        return len(self._ids)
+
+    @property
+    def dim(self) -> Optional[int]:
+        return None if self._vectors is None else self._vectors.shape[1]
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _write_lock(self):
+        return nullcontext() if self.read_only else index_write_lock(self.directory)
+
+    def _load(self) -> None:
+        """Map the index files, if they exist.
+
+        If ids.json changes while the files are mapped, remove() may have
+        moved rows under the ids just read, so the load is repeated.
+        """
+        with self._lock:
+            ids_path = self._path(IDS_FILE)
+            for _ in range(LOAD_ATTEMPTS):
+                if not os.path.exists(ids_path) or not os.path.exists(self._path(VECTORS_FILE)):
+                    return
+                ids_mtime = os.path.getmtime(ids_path)
+                self._map_files(ids_path)
+                if os.path.getmtime(ids_path) == ids_mtime:
+                    break
+            self._ids_mtime = ids_mtime
+            self._hnsw = None
+            if self.use_hnsw:
+                # A rebuilt graph is saved, which must not happen during a backup
+                with self._write_lock():
+                    self._load_hnsw()
+            logger.info(f"Loaded mmap vector index from {self.directory} with {self.count} vectors")
+
+    def _map_files(self, ids_path: str) -> None:
+        with open(ids_path, "r") as f:
+            self._ids = json.load(f)
+        mode = "r" if self.read_only else "r+"
+        self._vectors = np.load(self._path(VECTORS_FILE), mmap_mode=mode)
+        self.dtype = str(self._vectors.dtype)
+        if self.dtype == "int8":
+            self._scales = np.load(self._path(SCALES_FILE), mmap_mode=mode)
+        self._timestamps = None
+        if os.path.exists(self._path(TIMESTAMPS_FILE)):
+            self._timestamps = np.load(self._path(TIMESTAMPS_FILE), mmap_mode=mode)
+        elif not self.read_only:
+            # Index created before timestamps were tracked: every row is "unknown"
+            self._timestamps = np.lib.format.open_memmap(self._path(TIMESTAMPS_FILE), mode="w+", dtype="int64", shape=(self._vectors.shape[0],))
+            self._timestamps.flush()
+
+    def refresh(self) -> None:
+        """Reopen the index if another process changed it since it was loaded."""
+        ids_path = self._path(IDS_FILE)
+        if os.path.exists(ids_path) and os.path.getmtime(ids_path) != self._ids_mtime:
+            self._load()
+
+    def _allocate(self, capacity: int, dim: int) -> None:
+        """Create (or grow into) files with room for `capacity` vectors."""
+        vectors_path = self._path(VECTORS_FILE)
+        new_vectors = np.lib.format.open_memmap(vectors_path + ".tmp", mode="w+", dtype=self.dtype, shape=(capacity, dim))
+        new_scales = None
+        if self.dtype == "int8":
+            new_scales = np.lib.format.open_memmap(self._path(SCALES_FILE) + ".tmp", mode="w+", dtype="float32", shape=(capacity,))
+        new_timestamps = np.lib.format.open_memmap(self._path(TIMESTAMPS_FILE) + ".tmp", mode="w+", dtype="int64", shape=(capacity,))
+        if self._vectors is not None and self.count:
+            new_vectors[:self.count] = self._vectors[:self.count]
+            if new_scales is not None:
+                new_scales[:self.count] = self._scales[:self.count]
+            if self._timestamps is not None:
+                new_timestamps[:self.count] = self._timestamps[:self.count]
+        new_vectors.flush()
+        new_timestamps.flush()
+        os.replace(self._path(TIMESTAMPS_FILE) + ".tmp", self._path(TIMESTAMPS_FILE))
+        os.replace(vectors_path + ".tmp", vectors_path)
+        if new_scales is not None:
+            new_scales.flush()
+            os.replace(self._path(SCALES_FILE) + ".tmp", self._path(SCALES_FILE))
+        self._vectors = np.load(vectors_path, mmap_mode="r+")
+        self._timestamps = np.load(self._path(TIMESTAMPS_FILE), mmap_mode="r+")
+        if self.dtype == "int8":
+            self._scales = np.load(self._path(SCALES_FILE), mmap_mode="r+")
+        logger.debug(f"Allocated mmap vector index with capacity {capacity}, dim {dim}")
+
+    def _write_ids(self) -> None:
+        ids_path = self._path(IDS_FILE)
+        with open(ids_path + ".tmp", "w") as f:
+            json.dump(self._ids, f)
+        os.replace(ids_path + ".tmp", ids_path)
+        self._ids_mtime = os.path.getmtime(ids_path)
+
+    def add(self, item_id: str, vector: List[float], timestamp: Optional[int] = None) -> None:
+        """Append one vector to the index."""
+        self.add_many([item_id], [vector], None if timestamp is None else [timestamp])
+
+    def add_many(self, item_ids: List[str], vectors: List[List[float]], timestamps: Optional[List[int]] = None) -> None:
+        """Append several vectors to the index, optionally with a timestamp (epoch seconds) each."""
+        if self.read_only:
+            raise RuntimeError("Cannot add vectors to a read-only index")
+        if not item_ids:
+            return
+        matrix = np.asarray(vectors, dtype="float32")
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.maximum(norms, 1e-12)
+        with self._lock, self._write_lock():
+            if self._vectors is None:
+                self._allocate(max(self.initial_capacity, len(item_ids)), matrix.shape[1])
+            elif matrix.shape[1] != self.dim:
+                raise ValueError(f"Vector dimension {matrix.shape[1]} does not match index dimension {self.dim}")
+            needed = self.count + len(item_ids)
+            if needed > self._vectors.shape[0]:
+                self._allocate(max(needed, self._vectors.shape[0] * 2), self.dim)
+                if self._hnsw is not None:
+                    self._hnsw.resize_index(self._vectors.shape[0])
+            start = self.count
+            if self.dtype == "int8":
+                scales = np.maximum(np.abs(matrix).max(axis=1), 1e-12) / 127.0
+                self._vectors[start:needed] = np.round(matrix / scales[:, None]).astype("int8")
+                self._scales[start:needed] = scales
+                self._scales.flush()
+            else:
+                self._vectors[start:needed] = matrix.astype(self.dtype)
+            self._timestamps[start:needed] = timestamps if timestamps is not None else 0
+            self._timestamps.flush()
+            self._vectors.flush()
+            self._ids.extend(item_ids)
+            self._write_ids()
+            if self._hnsw is not None:
+                self._hnsw.add_items(matrix, np.arange(start, needed))
+            elif self.use_hnsw:
+                self._load_hnsw()
+        logger.debug(f"Added {len(item_ids)} vectors to mmap index, total {self.count}")
+
+    def backfill_timestamps(self, get_timestamps: Callable[[List[str]], Dict[str, int]]) -> int:
+        """Fill the timestamps of rows stored without one (0) from get_timestamps.
+
+        Returns:
+            int: Number of rows given a timestamp
+        """
+        if self.read_only:
+            raise RuntimeError("Cannot change a read-only index")
+        with self._lock, self._write_lock():
+            if self._timestamps is None or not self.count:
+                return 0
+            rows = np.flatnonzero(self._timestamps[:self.count] == 0)
+            if not len(rows):
+                return 0
+            timestamps = get_timestamps([self._ids[row] for row in rows])
+            filled = 0
+            for row in rows:
+                timestamp = timestamps.get(self._ids[row])
+                if timestamp:
+                    self._timestamps[row] = timestamp
+                    filled += 1
+            self._timestamps.flush()
+        logger.info(f"Backfilled timestamps of {filled} of {len(rows)} rows without one")
+        return filled
+
+    def remove(self, item_ids: Iterable[str]) -> int:
+        """Delete the vectors of some ids, rewriting the files without their rows.
+
+        The remaining rows move up, so ids.json is emptied before the new
+        files replace the old ones and written again after; a reader loading
+        meanwhile sees an empty index or retries (see _load), never ids
+        paired with the wrong rows.
+
+        Returns:
+            int: Number of vectors removed
+        """
+        if self.read_only:
+            raise RuntimeError("Cannot remove vectors from a read-only index")
+        removed_ids = set(item_ids)
+        with self._lock, self._write_lock():
+            keep = np.asarray([row for row, item_id in enumerate(self._ids) if item_id not in removed_ids], dtype="int64")
+            removed = self.count - len(keep)
+            if not removed:
+                return 0
+            capacity = max(self.initial_capacity, len(keep))
+            new_vectors = np.lib.format.open_memmap(self._path(VECTORS_FILE) + ".tmp", mode="w+", dtype=self.dtype, shape=(capacity, self.dim))
+            new_timestamps = np.lib.format.open_memmap(self._path(TIMESTAMPS_FILE) + ".tmp", mode="w+", dtype="int64", shape=(capacity,))
+            new_scales = None
+            if self.dtype == "int8":
+                new_scales = np.lib.format.open_memmap(self._path(SCALES_FILE) + ".tmp", mode="w+", dtype="float32", shape=(capacity,))
+            for start in range(0, len(keep), QUERY_CHUNK_ROWS):
+                rows = keep[start:start + QUERY_CHUNK_ROWS]
+                new_vectors[start:start + len(rows)] = self._vectors[rows]
+                new_timestamps[start:start + len(rows)] = self._timestamps[rows]
+                if new_scales is not None:
+                    new_scales[start:start + len(rows)] = self._scales[rows]
+            new_vectors.flush()
+            new_timestamps.flush()
+            if new_scales is not None:
+                new_scales.flush()
+            new_ids = [self._ids[row] for row in keep]
+            self._ids = []
+            self._write_ids()
+            for name in (VECTORS_FILE, TIMESTAMPS_FILE) + ((SCALES_FILE,) if new_scales is not None else ()):
+                os.replace(self._path(name) + ".tmp", self._path(name))
+            self._vectors = np.load(self._path(VECTORS_FILE), mmap_mode="r+")
+            self._timestamps = np.load(self._path(TIMESTAMPS_FILE), mmap_mode="r+")
+            if new_scales is not None:
+                self._scales = np.load(self._path(SCALES_FILE), mmap_mode="r+")
+            self._ids = new_ids
+            self._write_ids()
+            # Graph labels are row numbers, which have changed
+            self._hnsw = None
+            if os.path.exists(self._path(HNSW_FILE)):
+                os.remove(self._path(HNSW_FILE))
+            if self.use_hnsw:
+                self._load_hnsw()
+        logger.info(f"Removed {removed} vectors from mmap index, {self.count} left")
+        return removed
+
+    def _row_scores(self, start: int, end: int, query: np.ndarray) -> np.ndarray:
+        scores = self._vectors[start:end].astype("float32") @ query
+        if self.dtype == "int8":
+            scores *= self._scales[start:end]
+        return scores
+
+    def _allowed_rows(self, count: int, min_timestamp: Optional[int]):
+        """Boolean mask of rows at or after min_timestamp; rows with unknown time are kept."""
+        if min_timestamp is None or self._timestamps is None:
+            return None
+        timestamps = self._timestamps[:count]
+        return (timestamps >= min_timestamp) | (timestamps == 0)
+
+    def search(self, vector: List[float], top_k: int = 3, min_timestamp: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Return the top_k (id, cosine similarity) pairs, most similar first.
+
+        Args:
+            vector: Query embedding
+            top_k: Number of results to return
+            min_timestamp: Optional epoch seconds; rows with an older timestamp are skipped
+        """
+        with self._lock:
+            count = self.count
+            if not count or top_k <= 0:
+                return []
+            query = np.asarray(vector, dtype="float32")
+            query = query / max(float(np.linalg.norm(query)), 1e-12)
+            allowed = self._allowed_rows(count, min_timestamp)
+            available = count if allowed is None else int(allowed.sum())
+            top_k = min(top_k, available)
+            if not top_k:
+                return []
+
+            if self._hnsw is not None:
+                row_filter = None if allowed is None else (lambda label: bool(allowed[label]))
+                labels, distances = self._hnsw.knn_query(query, k=top_k, filter=row_filter)
+                return [(self._ids[int(label)], 1.0 - float(distance)) for label, distance in zip(labels[0], distances[0])]
+
+            scores = np.concatenate([
+                self._row_scores(start, min(start + QUERY_CHUNK_ROWS, count), query)
+                for start in range(0, count, QUERY_CHUNK_ROWS)
+            ])
+            if allowed is not None:
+                scores[~allowed] = -np.inf
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+            best = best[np.argsort(-scores[best])]
+            return [(self._ids[int(row)], float(scores[row])) for row in best]
+
+    def _load_hnsw(self) -> None:
+        """Load the persisted HNSW graph, rebuilding it when it is missing or stale."""
+        try:
+            import hnswlib
+        except ImportError:
+            logger.warning("hnswlib is not installed, falling back to flat search")
+            self.use_hnsw = False
+            return
+        if not self.count:
+            return
+        index = hnswlib.Index(space="ip", dim=self.dim)
+        hnsw_path = self._path(HNSW_FILE)
+        capacity = self._vectors.shape[0]
+        if os.path.exists(hnsw_path):
+            index.load_index(hnsw_path, max_elements=capacity)
+            if index.get_current_count() == self.count:
+                self._hnsw = index
+                return
+        logger.info(f"Building HNSW graph over {self.count} vectors")
+        index.init_index(max_elements=capacity, ef_construction=200, M=16)
+        for start in range(0, self.count, QUERY_CHUNK_ROWS):
+            end = min(start + QUERY_CHUNK_ROWS, self.count)
+            rows = self._vectors[start:end].astype("float32")
+            if self.dtype == "int8":
+                rows *= self._scales[start:end, None]
+            index.add_items(rows, np.arange(start, end))
+        index.set_ef(64)
+        if not self.read_only:
+            index.save_index(hnsw_path)
+        self._hnsw = index
+
+    def warm_up(self) -> int:
+        """Read every row once so the first searches do not fault the mapped pages in.
+
+        Returns:
+            int: Number of rows read
+        """
+        with self._lock:
+            count = self.count
+            for start in range(0, count, QUERY_CHUNK_ROWS):
+                end = min(start + QUERY_CHUNK_ROWS, count)
+                np.abs(self._vectors[start:end]).max()
+                if self._scales is not None:
+                    self._scales[start:end].max()
+                if self._timestamps is not None:
+                    self._timestamps[start:end].max()
+            return count
+
+    def save(self) -> None:
+        """Persist the HNSW graph, if one is in use. Vectors and ids are written on every add."""
+        with self._lock, self._write_lock():
+            if self._hnsw is not None and not self.read_only:
+                self._hnsw.save_index(self._path(HNSW_FILE))
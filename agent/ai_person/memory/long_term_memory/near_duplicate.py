@@ -0,0 +1,189 @@
+from array import array
+from typing import Any, Dict, List, Optional, Set
+import hashlib
+import random
+import re
+
+# MinHash signature length and LSH banding. 64 bands of 2 rows put the LSH
+# candidate threshold at a Jaccard similarity of roughly (1/64) ** (1/2) ~ 0.13,
+# and an item at the default threshold becomes a candidate with probability
+# 1 - (1 - 0.35 ** 2) ** 64 > 0.999, so true duplicates are rarely missed.
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 64
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+# Bumped when the signed text or its tokens change; NewsDB re-signs stored
+# items with an older version
+SIGNATURE_VERSION = 2
+# Items are compared on the set of content words of their title and summary.
+# Outlets covering the same event in their own words share the names and key
+# terms but few word pairs: on a hand-built set of same-story and
+# different-story pairs modeled on AI news coverage (launches, funding,
+# policy), same-story pairs scored 0.20-0.50 and different stories about the
+# same company or product 0.00-0.32 ("OpenAI fires Sam Altman" vs "Sam Altman
+# returns as OpenAI CEO"). 0.35 keeps every different-story pair apart and
+# folds about half of the same-story pairs; a missed duplicate only repeats
+# a story, while a false merge hides one.
+DEFAULT_DUPLICATE_THRESHOLD = 0.35
+# Fewer content words than this (typically a bare headline) are not signed:
+# two short titles share a large fraction of their words by chance
+MIN_SIGNATURE_TOKENS = 8
+
+STOP_WORDS = frozenset("""
+    a an the and or but if then than so such of to in on for with at by from as into over under up down out about
+    after before while also just only yet not no is are was were be been being it its this that these those
+    he she they his her their them we our you your i has have had do does did can will would could should may
+    might new says said say
+""".split())
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Fixed seed so signatures stay comparable across processes and restarts
+_rng = random.Random(1729)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+
+def _news_text(news_item: Dict[str, Any]) -> str:
+    return " ".join(str(news_item.get(key) or '') for key in ('title', 'summary', 'content'))
+
+
+def _signature_text(news_item: Dict[str, Any]) -> str:
+    return " ".join(str(news_item.get(key) or '') for key in ('title', 'summary'))
+
+
+def content_words(text: str) -> Set[str]:
+    """Return the set of lowercased words of a text, without stop words.
+
+    Names such as "GPT-4o" or "Claude 3.5" keep their hyphen or dot, so
+    related products are not confused, and a possessive "'s" is dropped.
+    """
+    words = (re.sub(r"'s$", "", word) for word in re.findall(r"\w+(?:[-.']\w+)*", text.lower()))
+    return {word for word in words if len(word) > 1 and word not in STOP_WORDS}
+
+
+def news_words(news_item: Dict[str, Any]) -> Set[str]:
+    """Content words of a news item's title and summary, the text compared for duplicates."""
+    return content_words(_signature_text(news_item))
+
+
+def jaccard(words_a: Set[str], words_b: Set[str]) -> float:
+    """Exact Jaccard similarity of two word sets."""
+    union = words_a | words_b
+    return len(words_a & words_b) / len(union) if union else 0.0
+
+
+def minhash_signature(tokens: Set[str]) -> List[int]:
+    """Compute the MinHash signature of a set of tokens; empty for an empty set."""
+    if not tokens:
+        return []
+    token_hashes = [
+        int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=4).digest(), 'little')
+        for token in tokens
+    ]
+    return [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in token_hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def news_signature(news_item: Dict[str, Any]) -> List[int]:
+    """Compute the MinHash signature of a news item from the content words of its title and summary.
+
+    Returns:
+        List[int]: The signature, or an empty list if the item has fewer than
+            MIN_SIGNATURE_TOKENS content words and is never matched
+    """
+    tokens = news_words(news_item)
+    if len(tokens) < MIN_SIGNATURE_TOKENS:
+        return []
+    return minhash_signature(tokens)
+
+
+def estimate_jaccard(signature_a: List[int], signature_b: List[int]) -> float:
+    """Estimate the Jaccard similarity of two texts from their MinHash signatures."""
+    if not signature_a or len(signature_a) != len(signature_b):
+        return 0.0
+    matches = sum(1 for a, b in zip(signature_a, signature_b) if a == b)
+    return matches / len(signature_a)
+
+
+def lsh_band_keys(signature: List[int]) -> List[str]:
+    """Return one bucket key per LSH band; items sharing any key are duplicate candidates."""
+    keys = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        digest = hashlib.blake2b(array('I', rows).tobytes(), digest_size=8).hexdigest()
+        keys.append(f"v{SIGNATURE_VERSION}:{band}:{digest}")
+    return keys
+
+
+def pack_signature(signature: List[int]) -> bytes:
+    return array('I', signature).tobytes()
+
+
+def unpack_signature(data: Optional[bytes]) -> List[int]:
+    if not data:
+        return []
+    signature = array('I')
+    signature.frombytes(data)
+    return signature.tolist()
+
+
+def cluster_news_items(news_items: List[Dict[str, Any]],
+                       threshold: float = DEFAULT_DUPLICATE_THRESHOLD) -> List[Dict[str, Any]]:
+    """Group near-duplicate news items and keep one representative per cluster.
+
+    The representative is the item with the most text. The links of the other
+    members are attached to it under 'alternates'. Items too short to sign
+    (see news_signature) stay on their own.
+
+    Args:
+        news_items: News item dicts with title, summary, content, link and source
+        threshold: Minimum Jaccard similarity of their title and summary words to treat two items as duplicates
+
+    Returns:
+        List[Dict[str, Any]]: One representative per cluster, in first-seen order
+    """
+    words = [news_words(item) for item in news_items]
+    signatures = [news_signature(item) for item in news_items]
+    parents = list(range(len(news_items)))
+
+    def find(index: int) -> int:
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    buckets: Dict[str, List[int]] = {}
+    for index, signature in enumerate(signatures):
+        if not signature:
+            continue
+        for key in lsh_band_keys(signature):
+            for other in buckets.setdefault(key, []):
+                # LSH only proposes candidates; the exact similarity decides, as the
+                # MinHash estimate is too noisy this close to the threshold
+                if find(index) != find(other) and jaccard(words[index], words[other]) >= threshold:
+                    parents[find(index)] = find(other)
+            buckets[key].append(index)
+
+    clusters: Dict[int, List[int]] = {}
+    for index in range(len(news_items)):
+        clusters.setdefault(find(index), []).append(index)
+
+    representatives = []
+    for members in sorted(clusters.values(), key=lambda member_ids: member_ids[0]):
+        best = max(members, key=lambda index: len(_news_text(news_items[index])))
+        representative = news_items[best]
+        representative['alternates'] = representative.get('alternates', []) + [
+            {
+                'source': news_items[index].get('source', ''),
+                'title': news_items[index].get('title', ''),
+                'link': news_items[index].get('link', '')
+            }
+            for index in members if index != best
+        ]
+        representatives.append(representative)
+    return representatives
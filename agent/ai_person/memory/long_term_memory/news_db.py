@@ -1,47 +1,128 @@
-import sqlite3
 import os
-from typing import Dict, Any, Optional
-from datetime import datetime
-import logging
+import re
+import time
+from typing import Dict, Any, Optional, List, Tuple, Set, Iterable, Callable
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from common.storage import connect, get_dialect, transaction
+from common.logging_setup import setup_logging
+from .near_duplicate import (
+    SIGNATURE_VERSION, estimate_jaccard, jaccard, lsh_band_keys, news_signature, news_words, pack_signature,
+    unpack_signature
+)
+from .news_item import NewsItem, NEWS_ITEM_FIELDS
+from .text_compression import TextCompressor, decompress_text, train_dictionary, NONE
+from .read_state import ReadState
 
 # Setup logging for news database
 def setup_news_db_logging():
     """Setup logging for the news database module."""
-    log_dir = "logs"
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-
-    log_file = os.path.join(log_dir, f"news_db_{datetime.now().strftime('%Y%m%d')}.log")
-    
-    # Create logger
-    logger = logging.getLogger("ai_person.memory.news_db")
-    logger.setLevel(logging.DEBUG)
-    
-    # Remove any existing handlers
-    for handler in logger.handlers[:]:
-        logger.removeHandler(handler)
-    
-    # Create file handler
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setLevel(logging.DEBUG)
-    file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(file_formatter)
-    
-    # Create console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_formatter = logging.Formatter('%(levelname)s - %(message)s')
-    console_handler.setFormatter(console_formatter)
-    
-    # Add handlers to logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
-    return logger
+    return setup_logging("ai_person.memory.news_db", "news_db")
 
 # Initialize logger
 logger = setup_news_db_logging()
 
+# BM25 column weights for (title, summary, content). Entity names usually show
+# up in the title, so a title hit counts for more than a body hit.
+BM25_COLUMN_WEIGHTS = (5.0, 2.0, 1.0)
+
+def build_fts_query(query: str) -> str:
+    """Turn free text into an FTS5 MATCH expression.
+
+    Every word is quoted so that user input can never be parsed as FTS5 syntax,
+    and terms are OR-ed together so BM25 can rank partial matches.
+    """
+    terms = []
+    for term in re.findall(r"\w+", query.lower()):
+        if term not in terms:
+            terms.append(term)
+    return " OR ".join(f'"{term}"' for term in terms)
+
+def build_tsquery(query: str) -> str:
+    """Turn free text into a PostgreSQL to_tsquery expression, the counterpart of build_fts_query."""
+    terms = []
+    for term in re.findall(r"\w+", query.lower()):
+        if term not in terms:
+            terms.append(term)
+    return " | ".join(terms)
+
+# ts_rank_cd weights for the {D, C, B, A} labels; A, B and C carry the
+# BM25_COLUMN_WEIGHTS of title, summary and content scaled to at most 1
+TS_RANK_WEIGHTS = "{0, %s, %s, %s}" % tuple(weight / max(BM25_COLUMN_WEIGHTS) for weight in reversed(BM25_COLUMN_WEIGHTS))
+
+# Query parameters that only identify the referrer or campaign, never the article
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', 'igshid',
+    'ref', 'ref_src', 'ref_url', 'referrer', 'cmpid', 'guccounter',
+    'guce_referrer', 'guce_referrer_sig', 'ncid', 'sr_share', 'yptr',
+}
+TRACKING_PARAM_PREFIXES = ('utm_', '_hs', 'mkt_', 'pk_', 'trk_')
+
+# Keep IN (...) lists well below SQLite's host parameter limit
+MAX_QUERY_PARAMS = 500
+
+# A news key missing between an agent's watermark and its newest processed
+# key may belong to an insert that has not committed yet; it is only taken as
+# lost to a rolled back insert after staying missing this long
+NEWS_KEY_GAP_GRACE_SECONDS = int(os.getenv("NEWS_KEY_GAP_GRACE_SECONDS", "600"))
+
+def normalize_link(link: str) -> str:
+    """Canonicalize an article URL so the same article always maps to the same key.
+
+    Lowercases scheme and host, treats http as https, drops a leading "www.",
+    default ports, fragments, trailing slashes and tracking query parameters,
+    and sorts the remaining query parameters.
+    """
+    link = (link or '').strip()
+    if not link:
+        return ''
+    parts = urlsplit(link)
+    scheme = parts.scheme.lower()
+    if scheme == 'http':
+        scheme = 'https'
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    path = parts.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/')
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PARAM_PREFIXES)
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+def parse_published_timestamp(value: Optional[str]) -> Optional[int]:
+    """Parse a feed's published date (RFC 2822 or ISO 8601) into epoch seconds."""
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+def _chunked(values: List[Any], size: int = MAX_QUERY_PARAMS) -> Iterable[List[Any]]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def _fts_values(title: Optional[str], summary: Optional[str], content: Optional[str]) -> Tuple[str, str, str]:
+    """Values indexed in news_search_fts for a row.
+
+    A contentless FTS5 row is deleted by passing back the values it was
+    indexed with, so inserts and deletes must both go through this.
+    """
+    return title or '', summary or '', content or ''
+
 class NewsDB:
     def __init__(self, db_path: str = "news.db"):
         """Initialize the news SQLite database.
@@ -55,16 +136,21 @@ class NewsDB:
         # Create full path to database file
         self.db_path = os.path.join(current_dir, db_path)
         logger.debug(f"SQLite database path: {self.db_path}")
+        self.dialect = get_dialect()
+        # Article bodies shorter than this many characters are stored as plain text
+        self.compression_min_length = int(os.getenv("NEWS_CONTENT_COMPRESSION_MIN_LENGTH", "512"))
+        self._dictionaries: Dict[int, bytes] = {}
         self._create_tables()
+        self._compressor = self._load_compressor()
         logger.info("NewsDB initialization complete")
     
     def _create_tables(self):
         """Create necessary database tables if they don't exist"""
         logger.debug("Creating database tables if they don't exist")
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with connect(self.db_path) as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
+                cursor.execute(f'''
                     CREATE TABLE IF NOT EXISTS news_items (
                         news_id TEXT PRIMARY KEY,
                         title TEXT NOT NULL,
@@ -73,31 +159,397 @@ class NewsDB:
                         link TEXT,
                         source TEXT,
                         published_at TEXT,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                        created_at {self.dialect.timestamp_column},
+                        minhash {self.dialect.blob_type},
+                        minhash_version INTEGER,
+                        link_normalized TEXT,
+                        published_ts BIGINT
+                    )
+                ''')
+                self._create_read_state_tables(cursor)
+                self._ensure_column(cursor, 'news_items', 'minhash', self.dialect.blob_type)
+                self._ensure_column(cursor, 'news_items', 'minhash_version', 'INTEGER')
+                self._ensure_column(cursor, 'news_items', 'link_normalized', 'TEXT')
+                self._ensure_column(cursor, 'news_items', 'published_ts', 'BIGINT')
+                # Compressed article body; content is then left empty
+                self._ensure_column(cursor, 'news_items', 'content_compressed', self.dialect.blob_type)
+                # zstd dictionaries trained on stored articles, by the id written into each value
+                cursor.execute(f'''
+                    CREATE TABLE IF NOT EXISTS news_compression_dictionaries (
+                        dictionary_id INTEGER PRIMARY KEY,
+                        data {self.dialect.blob_type} NOT NULL,
+                        created_at {self.dialect.timestamp_column}
+                    )
+                ''')
+                self._backfill_published_timestamps(cursor)
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_news_items_published_ts
+                    ON news_items (published_ts)
+                ''')
+                # LSH buckets of each item's MinHash signature, for near-duplicate lookups
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS news_minhash_bands (
+                        band_key TEXT NOT NULL,
+                        news_id TEXT NOT NULL,
+                        PRIMARY KEY (band_key, news_id)
                     )
                 ''')
-                # New table for agent-news mapping
+                self._resign_news_items(cursor)
+                # Links of near-duplicate stories folded into a representative news item
                 cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS agent_news_processed (
-                        agent_id TEXT NOT NULL,
+                    CREATE TABLE IF NOT EXISTS news_alternate_links (
+                        link TEXT PRIMARY KEY,
                         news_id TEXT NOT NULL,
-                        processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        PRIMARY KEY (agent_id, news_id),
+                        source TEXT,
+                        title TEXT,
+                        link_normalized TEXT,
                         FOREIGN KEY (news_id) REFERENCES news_items(news_id)
                     )
                 ''')
+                self._ensure_column(cursor, 'news_alternate_links', 'link_normalized', 'TEXT')
+                self._backfill_normalized_links(cursor)
+                cursor.execute('''
+                    CREATE UNIQUE INDEX IF NOT EXISTS idx_news_items_link_normalized
+                    ON news_items (link_normalized)
+                ''')
+                cursor.execute('''
+                    CREATE UNIQUE INDEX IF NOT EXISTS idx_news_alternate_links_link_normalized
+                    ON news_alternate_links (link_normalized)
+                ''')
+                self._create_search_index(cursor)
                 conn.commit()
                 logger.debug("Database tables created/verified successfully")
         except Exception as e:
             logger.error(f"Error creating database tables: {str(e)}", exc_info=True)
             raise
+
+    def _create_search_index(self, cursor) -> None:
+        """Create the full-text index used by search_news_bm25."""
+        if self.dialect.name == "postgres":
+            # Title, summary and content weighted A, B and C; the column is
+            # computed by PostgreSQL, so inserts need no extra statement
+            if 'search_vector' not in self.dialect.column_names(cursor, 'news_items'):
+                logger.info("Building full-text index for existing news items")
+                cursor.execute('''
+                    ALTER TABLE news_items ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+                        setweight(to_tsvector('english', title), 'A') ||
+                        setweight(to_tsvector('english', COALESCE(summary, '')), 'B') ||
+                        setweight(to_tsvector('english', content), 'C')
+                    ) STORED
+                ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_news_items_search_vector
+                ON news_items USING GIN (search_vector)
+            ''')
+            return
+        # Contentless FTS5 index over the searchable text. Rows are keyed on
+        # the item's news_key, which unlike the implicit rowid of news_items
+        # is an explicit INTEGER PRIMARY KEY and survives VACUUM.
+        fts_exists = self.dialect.table_exists(cursor, 'news_search_fts')
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS news_search_fts USING fts5(
+                title, summary, content,
+                content='',
+                tokenize='porter unicode61'
+            )
+        ''')
+        if not fts_exists:
+            # The index before this one was keyed on news_items' rowid
+            cursor.execute("DROP TABLE IF EXISTS news_items_fts")
+            logger.info("Building full-text index for existing news items")
+            cursor.execute('''
+                INSERT INTO news_keys (news_id)
+                SELECT news_id FROM news_items
+                WHERE news_id NOT IN (SELECT news_id FROM news_keys)
+            ''')
+            cursor.execute('''
+                SELECT k.news_key, n.title, n.summary, n.content, n.content_compressed
+                FROM news_items n JOIN news_keys k ON k.news_id = n.news_id
+            ''')
+            cursor.executemany('''
+                INSERT INTO news_search_fts (rowid, title, summary, content)
+                VALUES (?, ?, ?, ?)
+            ''', [
+                (news_key, *_fts_values(title, summary, self._decode_content(content, compressed, cursor)))
+                for news_key, title, summary, content, compressed in cursor.fetchall()
+            ])
+
+    def _create_read_state_tables(self, cursor) -> None:
+        """Create the tables recording which news each agent has processed.
+
+        Agents and news items get integer keys, news keys in the order items
+        are stored, and each agent's processed set is one ReadState row.
+        """
+        news_keys_exist = self.dialect.table_exists(cursor, 'news_keys')
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS news_keys (
+                news_key {self.dialect.identity_column},
+                news_id TEXT NOT NULL UNIQUE
+            )
+        ''')
+        if not news_keys_exist:
+            cursor.execute('''
+                INSERT INTO news_keys (news_id)
+                SELECT news_id FROM news_items ORDER BY created_at, news_id
+            ''')
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS agent_keys (
+                agent_key {self.dialect.identity_column},
+                agent_id TEXT NOT NULL UNIQUE
+            )
+        ''')
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS agent_news_read_state (
+                agent_key BIGINT PRIMARY KEY,
+                watermark BIGINT NOT NULL DEFAULT 0,
+                base BIGINT NOT NULL DEFAULT 0,
+                bitmap {self.dialect.blob_type},
+                updated_at {self.dialect.timestamp_column}
+            )
+        ''')
+        # News keys found missing below an agent's newest processed key, with
+        # when they were first found missing (see _lost_news_keys)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS news_key_gaps (
+                news_key BIGINT PRIMARY KEY,
+                first_seen BIGINT NOT NULL
+            )
+        ''')
+        self._migrate_agent_news_processed(cursor)
+
+    def _migrate_agent_news_processed(self, cursor) -> None:
+        """Fold the old one-row-per-agent-per-item table into read states and drop it."""
+        if not self.dialect.table_exists(cursor, 'agent_news_processed'):
+            return
+        cursor.execute("SELECT DISTINCT agent_id FROM agent_news_processed")
+        agent_ids = [row[0] for row in cursor.fetchall()]
+        logger.info(f"Migrating processed news of {len(agent_ids)} agents to read states")
+        for agent_id in agent_ids:
+            cursor.execute("SELECT news_id FROM agent_news_processed WHERE agent_id = ?", (agent_id,))
+            news_ids = [row[0] for row in cursor.fetchall()]
+            self._mark_processed(cursor, agent_id, news_ids)
+        cursor.execute("DROP TABLE agent_news_processed")
+
+    def _get_news_keys(self, cursor, news_ids: List[str], create: bool = False) -> Dict[str, int]:
+        """Map news_ids to their integer keys; with create, assign keys to ids that have none."""
+        keys = {}
+        for chunk in _chunked(news_ids):
+            placeholders = ", ".join("?" for _ in chunk)
+            cursor.execute(f"SELECT news_id, news_key FROM news_keys WHERE news_id IN ({placeholders})", chunk)
+            keys.update(cursor.fetchall())
+        missing = [news_id for news_id in news_ids if news_id not in keys] if create else []
+        if missing:
+            # Only ids without a key are inserted: a conflicting insert still uses up a key
+            cursor.executemany(
+                "INSERT INTO news_keys (news_id) VALUES (?) ON CONFLICT DO NOTHING",
+                [(news_id,) for news_id in missing]
+            )
+            keys.update(self._get_news_keys(cursor, missing))
+        return keys
+
+    def _get_agent_keys(self, cursor, agent_ids: List[str], create: bool = False) -> Dict[str, int]:
+        """Map agent_ids to their integer keys; with create, assign keys to ids that have none."""
+        keys = {}
+        for chunk in _chunked(agent_ids):
+            placeholders = ", ".join("?" for _ in chunk)
+            cursor.execute(f"SELECT agent_id, agent_key FROM agent_keys WHERE agent_id IN ({placeholders})", chunk)
+            keys.update(cursor.fetchall())
+        missing = [agent_id for agent_id in agent_ids if agent_id not in keys] if create else []
+        if missing:
+            # Only ids without a key are inserted: a conflicting insert still uses up a key
+            cursor.executemany(
+                "INSERT INTO agent_keys (agent_id) VALUES (?) ON CONFLICT DO NOTHING",
+                [(agent_id,) for agent_id in missing]
+            )
+            keys.update(self._get_agent_keys(cursor, missing))
+        return keys
+
+    def _get_read_states(self, cursor, agent_keys: List[int]) -> Dict[int, ReadState]:
+        states = {}
+        for chunk in _chunked(agent_keys):
+            placeholders = ", ".join("?" for _ in chunk)
+            cursor.execute(f'''
+                SELECT agent_key, watermark, base, bitmap FROM agent_news_read_state
+                WHERE agent_key IN ({placeholders})
+            ''', chunk)
+            for agent_key, watermark, base, bitmap in cursor.fetchall():
+                states[agent_key] = ReadState.from_row(watermark, base, bitmap)
+        return states
+
+    def _get_read_state(self, cursor, agent_id: str) -> Optional[ReadState]:
+        agent_key = self._get_agent_keys(cursor, [agent_id]).get(agent_id)
+        if agent_key is None:
+            return None
+        return self._get_read_states(cursor, [agent_key]).get(agent_key, ReadState())
+
+    def _lost_news_keys(self, cursor, news_keys: List[int]) -> List[int]:
+        """Return which of the keys missing from news_keys will never be used.
+
+        A missing key is either lost to a rolled back insert or, on
+        PostgreSQL, allocated by an insert that has not committed yet and so
+        is not visible. Missing keys are recorded with the time they were
+        first found missing, and only taken as lost once they have stayed
+        missing for NEWS_KEY_GAP_GRACE_SECONDS.
+        """
+        now = int(time.time())
+        cursor.executemany(
+            "INSERT INTO news_key_gaps (news_key, first_seen) VALUES (?, ?) ON CONFLICT DO NOTHING",
+            [(news_key, now) for news_key in news_keys]
+        )
+        lost = []
+        for chunk in _chunked(news_keys):
+            placeholders = ", ".join("?" for _ in chunk)
+            cursor.execute(
+                f"SELECT news_key FROM news_key_gaps WHERE news_key IN ({placeholders}) AND first_seen <= ?",
+                (*chunk, now - NEWS_KEY_GAP_GRACE_SECONDS)
+            )
+            lost.extend(row[0] for row in cursor.fetchall())
+        return lost
+
+    def _mark_processed(self, cursor, agent_id: str, news_ids: List[str]) -> None:
+        agent_key = self._get_agent_keys(cursor, [agent_id], create=True)[agent_id]
+        # Two processes marking for the same agent must not overwrite each other's bits
+        self.dialect.lock(cursor, f"agent_news_read_state:{agent_key}")
+        state = self._get_read_states(cursor, [agent_key]).get(agent_key, ReadState())
+        changed = state.add(self._get_news_keys(cursor, news_ids, create=True).values())
+        if changed and state.bits:
+            # Keys lost to rolled back inserts belong to no item; counting them
+            # as processed lets the watermark move past them
+            highest = state.base + state.bits.bit_length() - 1
+            cursor.execute(
+                "SELECT news_key FROM news_keys WHERE news_key > ? AND news_key < ?",
+                (state.watermark, highest)
+            )
+            used = {row[0] for row in cursor.fetchall()}
+            missing = [key for key in range(state.watermark + 1, highest) if key not in used]
+            if missing:
+                state.add(self._lost_news_keys(cursor, missing))
+        if changed:
+            cursor.execute(f'''
+                INSERT INTO agent_news_read_state (agent_key, watermark, base, bitmap, updated_at)
+                VALUES (?, ?, ?, ?, {self.dialect.current_timestamp})
+                ON CONFLICT(agent_key) DO UPDATE SET
+                    watermark=excluded.watermark,
+                    base=excluded.base,
+                    bitmap=excluded.bitmap,
+                    updated_at=excluded.updated_at
+            ''', (agent_key, *state.to_row()))
+
+    def _load_compressor(self) -> TextCompressor:
+        """Build the content compressor from NEWS_CONTENT_COMPRESSION and the newest trained dictionary."""
+        # PostgreSQL already compresses large text values (TOAST) and indexes
+        # the content column for full-text search, so it is stored as is there
+        codec = os.getenv("NEWS_CONTENT_COMPRESSION", "zlib").lower() if self.dialect.name == "sqlite" else NONE
+        level = os.getenv("NEWS_CONTENT_COMPRESSION_LEVEL")
+        dictionary_id, dictionary = None, None
+        if codec == "zstd":
+            with connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT dictionary_id, data FROM news_compression_dictionaries
+                    ORDER BY dictionary_id DESC LIMIT 1
+                ''')
+                row = cursor.fetchone()
+            if row:
+                dictionary_id, dictionary = row[0], bytes(row[1])
+                self._dictionaries[dictionary_id] = dictionary
+        return TextCompressor(codec, level=int(level) if level else None,
+                              dictionary=dictionary, dictionary_id=dictionary_id)
+
+    def _get_dictionary(self, dictionary_id: int, cursor) -> Optional[bytes]:
+        if dictionary_id not in self._dictionaries:
+            cursor.execute("SELECT data FROM news_compression_dictionaries WHERE dictionary_id = ?", (dictionary_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            self._dictionaries[dictionary_id] = bytes(row[0])
+        return self._dictionaries[dictionary_id]
+
+    def _encode_content(self, content: str) -> Tuple[str, Optional[bytes]]:
+        """Return the (content, content_compressed) column values for an article body."""
+        if not self._compressor.enabled or len(content) < self.compression_min_length:
+            return content, None
+        return '', self._compressor.compress(content)
+
+    def _decode_content(self, content: Optional[str], compressed: Optional[bytes], cursor) -> Optional[str]:
+        if compressed is None:
+            return content
+        return decompress_text(compressed, lambda dictionary_id: self._get_dictionary(dictionary_id, cursor))
+
+    def _ensure_column(self, cursor, table: str, column: str, definition: str) -> None:
+        """Add a column to an existing table if it is missing."""
+        if column not in self.dialect.column_names(cursor, table):
+            logger.info(f"Adding column {column} to table {table}")
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
     
-    def save_news_item(self, news_id: str, news_item: Dict[str, Any]) -> bool:
+    @staticmethod
+    def _backfill_normalized_links(cursor) -> None:
+        """Fill link_normalized for rows stored before the column existed.
+
+        When several old rows normalize to the same link only the first keeps
+        the value, so the unique index can be created.
+        """
+        for table, key_column in (('news_items', 'news_id'), ('news_alternate_links', 'link')):
+            cursor.execute(f"SELECT link_normalized FROM {table} WHERE link_normalized IS NOT NULL")
+            seen = {row[0] for row in cursor.fetchall()}
+            cursor.execute(f"SELECT {key_column}, link FROM {table} WHERE link_normalized IS NULL AND link IS NOT NULL AND link != ''")
+            updates = []
+            for key, link in cursor.fetchall():
+                normalized = normalize_link(link)
+                if normalized and normalized not in seen:
+                    seen.add(normalized)
+                    updates.append((normalized, key))
+            if updates:
+                logger.info(f"Backfilling normalized links for {len(updates)} rows in {table}")
+                cursor.executemany(f"UPDATE {table} SET link_normalized = ? WHERE {key_column} = ?", updates)
+
+    @staticmethod
+    def _resign_news_items(cursor) -> None:
+        """Recompute the MinHash signatures and LSH bands of items signed by an older SIGNATURE_VERSION."""
+        cursor.execute(
+            "SELECT news_id, title, summary FROM news_items WHERE minhash_version IS NULL OR minhash_version < ?",
+            (SIGNATURE_VERSION,)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            return
+        logger.info(f"Recomputing near-duplicate signatures of {len(rows)} news items")
+        for chunk in _chunked(rows):
+            news_ids = [news_id for news_id, _, _ in chunk]
+            placeholders = ", ".join("?" for _ in news_ids)
+            cursor.execute(f"DELETE FROM news_minhash_bands WHERE news_id IN ({placeholders})", news_ids)
+            updates, bands = [], []
+            for news_id, title, summary in chunk:
+                signature = news_signature({'title': title, 'summary': summary})
+                updates.append((pack_signature(signature) if signature else None, SIGNATURE_VERSION, news_id))
+                bands.extend((band_key, news_id) for band_key in lsh_band_keys(signature))
+            cursor.executemany("UPDATE news_items SET minhash = ?, minhash_version = ? WHERE news_id = ?", updates)
+            if bands:
+                cursor.executemany("INSERT INTO news_minhash_bands (band_key, news_id) VALUES (?, ?) ON CONFLICT DO NOTHING", bands)
+
+    @staticmethod
+    def _backfill_published_timestamps(cursor) -> None:
+        """Fill published_ts for rows stored before the column existed.
+
+        Falls back to created_at when the feed's published date can't be parsed.
+        """
+        cursor.execute("SELECT news_id, published_at, created_at FROM news_items WHERE published_ts IS NULL")
+        updates = []
+        for news_id, published_at, created_at in cursor.fetchall():
+            timestamp = parse_published_timestamp(published_at) or parse_published_timestamp(created_at)
+            if timestamp is not None:
+                updates.append((timestamp, news_id))
+        if updates:
+            logger.info(f"Backfilling published timestamps for {len(updates)} news items")
+            cursor.executemany("UPDATE news_items SET published_ts = ? WHERE news_id = ?", updates)
+
+    def save_news_item(self, news_id: str, news_item: Dict[str, Any], signature: Optional[List[int]] = None) -> bool:
         """Save a news item to the SQLite database.
         
         Args:
             news_id: Unique identifier for the news item
             news_item: Dictionary containing news item data
+            signature: Optional MinHash signature used for near-duplicate detection
             
         Returns:
             bool: True if save was successful, False otherwise
@@ -105,21 +557,40 @@ class NewsDB:
         logger.info(f"Saving news item to SQLite database: {news_item.get('title', 'No title')}")
         logger.debug(f"News ID: {news_id}")
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO news_items 
-                    (news_id, title, summary, content, link, source, published_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    (news_id, title, summary, content, content_compressed, link, source, published_at, minhash, minhash_version, link_normalized, published_ts)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     news_id,
                     news_item.get('title', ''),
                     news_item.get('summary', ''),
-                    news_item.get('content', ''),
+                    *self._encode_content(news_item.get('content', '')),
                     news_item.get('link', ''),
                     news_item.get('source', ''),
-                    news_item.get('published', '')  # Store the published date string as is
+                    news_item.get('published', ''),  # Store the published date string as is
+                    pack_signature(signature) if signature else None,
+                    SIGNATURE_VERSION,
+                    normalize_link(news_item.get('link', '')) or None,
+                    parse_published_timestamp(news_item.get('published')) or int(datetime.now(timezone.utc).timestamp())
                 ))
+                cursor.execute("INSERT INTO news_keys (news_id) VALUES (?) ON CONFLICT DO NOTHING", (news_id,))
+                if self.dialect.name == "sqlite":
+                    cursor.execute('''
+                        INSERT INTO news_search_fts (rowid, title, summary, content)
+                        VALUES (?, ?, ?, ?)
+                    ''', (
+                        self._get_news_keys(cursor, [news_id])[news_id],
+                        *_fts_values(news_item.get('title', ''), news_item.get('summary', ''), news_item.get('content', ''))
+                    ))
+                if signature:
+                    cursor.executemany('''
+                        INSERT INTO news_minhash_bands (band_key, news_id)
+                        VALUES (?, ?)
+                        ON CONFLICT DO NOTHING
+                    ''', [(band_key, news_id) for band_key in lsh_band_keys(signature)])
                 conn.commit()
                 logger.info(f"Successfully saved news item to SQLite database: {news_item.get('title', 'No title')}")
                 return True
@@ -128,47 +599,356 @@ class NewsDB:
             print(f"Error saving news item to SQLite: {str(e)}")
             return False
     
-    def get_news_item(self, news_id: str) -> Optional[Dict[str, Any]]:
+    def get_news_item(self, news_id: str, fields: Optional[Iterable[str]] = None) -> Optional[NewsItem]:
         """Retrieve a news item from the database.
         
         Args:
             news_id: ID of the news item to retrieve
+            fields: Columns to select (see NEWS_ITEM_FIELDS); defaults to all.
+                Content left out is loaded on first access.
             
         Returns:
-            Optional[Dict[str, Any]]: News item data if found, None otherwise
+            Optional[NewsItem]: News item if found, None otherwise
         """
         logger.debug(f"Retrieving news item from SQLite database: {news_id}")
+        news_items = self.get_news_items([news_id], fields=fields)
+        if news_items:
+            logger.debug(f"Successfully retrieved news item: {news_items[0].get('title', 'No title')}")
+            return news_items[0]
+        logger.warning(f"No news item found with ID: {news_id}")
+        return None
+
+    def get_news_items(self, news_ids: List[str], fields: Optional[Iterable[str]] = None) -> List[NewsItem]:
+        """Retrieve several news items with one IN query per chunk of ids.
+
+        Args:
+            news_ids: IDs of the news items to retrieve
+            fields: Columns to select (see NEWS_ITEM_FIELDS); defaults to all.
+                news_id is always selected; content left out is loaded on first access.
+
+        Returns:
+            List[NewsItem]: The items found, in the order of news_ids
+        """
+        if fields is None:
+            columns = list(NEWS_ITEM_FIELDS)
+        else:
+            fields = set(fields)
+            unknown = fields - set(NEWS_ITEM_FIELDS)
+            if unknown:
+                raise ValueError(f"Unknown news item fields: {sorted(unknown)}")
+            columns = [field for field in NEWS_ITEM_FIELDS if field in fields or field == 'news_id']
+        unique_ids = list(dict.fromkeys(news_ids))
+        if not unique_ids:
+            return []
+        logger.debug(f"Retrieving {len(unique_ids)} news items with fields {columns}")
+        select_columns = columns + (['content_compressed'] if 'content' in columns else [])
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            rows = {}
+            with connect(self.db_path) as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT news_id, title, summary, content, link, source, published_at, created_at
-                    FROM news_items
-                    WHERE news_id = ?
-                ''', (news_id,))
+                for chunk in _chunked(unique_ids):
+                    placeholders = ", ".join("?" for _ in chunk)
+                    cursor.execute(f'''
+                        SELECT {", ".join(select_columns)}
+                        FROM news_items
+                        WHERE news_id IN ({placeholders})
+                    ''', chunk)
+                    for row in cursor.fetchall():
+                        values = dict(zip(select_columns, row))
+                        if 'content' in values:
+                            values['content'] = self._decode_content(values['content'], values.pop('content_compressed'), cursor)
+                        rows[row[0]] = NewsItem(values, loader=self.get_news_content)
+            return [rows[news_id] for news_id in unique_ids if news_id in rows]
+        except Exception as e:
+            logger.error(f"Error retrieving news items from SQLite: {str(e)}", exc_info=True)
+            print(f"Error retrieving news items: {str(e)}")
+            return []
+
+    def get_news_content(self, news_id: str) -> Optional[str]:
+        """Retrieve only the content column of a news item."""
+        try:
+            with connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT content, content_compressed FROM news_items WHERE news_id = ?", (news_id,))
                 row = cursor.fetchone()
-                
-                if row:
-                    news_item = {
-                        'news_id': row[0],
-                        'title': row[1],
-                        'summary': row[2],
-                        'content': row[3],
-                        'link': row[4],
-                        'source': row[5],
-                        'published_at': row[6],
-                        'created_at': row[7]
-                    }
-                    logger.debug(f"Successfully retrieved news item: {news_item.get('title', 'No title')}")
-                    return news_item
-                else:
-                    logger.warning(f"No news item found with ID: {news_id}")
+                return self._decode_content(row[0], row[1], cursor) if row else None
+        except Exception as e:
+            logger.error(f"Error retrieving news content: {str(e)}", exc_info=True)
+            return None
+
+    def get_news_headlines(self, news_ids: List[str]) -> Dict[str, Tuple[str, str]]:
+        """Retrieve title and summary for several news items in one query.
+
+        Args:
+            news_ids: IDs of the news items to look up
+
+        Returns:
+            Dict[str, Tuple[str, str]]: Mapping of news_id to (title, summary)
+        """
+        return {
+            news_item.news_id: (news_item.title or '', news_item.summary or '')
+            for news_item in self.get_news_items(news_ids, fields=('title', 'summary'))
+        }
+
+    def compress_existing_content(self, batch_size: int = 200) -> int:
+        """Compress article bodies stored before compression was enabled.
+
+        Returns:
+            int: Number of news items compressed
+        """
+        if not self._compressor.enabled:
+            return 0
+        compressed = 0
+        try:
+            while True:
+                with connect(self.db_path) as conn:
+                    cursor = conn.cursor()
+                    cursor.execute('''
+                        SELECT news_id, content FROM news_items
+                        WHERE content_compressed IS NULL AND LENGTH(content) >= ?
+                        LIMIT ?
+                    ''', (self.compression_min_length, batch_size))
+                    rows = cursor.fetchall()
+                    if not rows:
+                        break
+                    cursor.executemany(
+                        "UPDATE news_items SET content = ?, content_compressed = ? WHERE news_id = ?",
+                        [(*self._encode_content(content), news_id) for news_id, content in rows]
+                    )
+                    conn.commit()
+                compressed += len(rows)
+            logger.info(f"Compressed content of {compressed} news items")
+            return compressed
+        except Exception as e:
+            logger.error(f"Error compressing news content: {str(e)}", exc_info=True)
+            return compressed
+
+    def _delete_rows(self, cursor, news_ids: List[str]) -> None:
+        """Delete news items with their search index entries; the caller commits."""
+        placeholders = ", ".join("?" for _ in news_ids)
+        if self.dialect.name == "sqlite":
+            # A contentless FTS5 row is deleted by passing its indexed values back
+            cursor.execute(f'''
+                SELECT k.news_key, n.title, n.summary, n.content, n.content_compressed
+                FROM news_items n JOIN news_keys k ON k.news_id = n.news_id
+                WHERE n.news_id IN ({placeholders})
+            ''', news_ids)
+            cursor.executemany('''
+                INSERT INTO news_search_fts (news_search_fts, rowid, title, summary, content)
+                VALUES ('delete', ?, ?, ?, ?)
+            ''', [
+                (news_key, *_fts_values(title, summary, self._decode_content(content, compressed, cursor)))
+                for news_key, title, summary, content, compressed in cursor.fetchall()
+            ])
+        for table in ('news_minhash_bands', 'news_alternate_links', 'news_items'):
+            cursor.execute(f"DELETE FROM {table} WHERE news_id IN ({placeholders})", news_ids)
+
+    def delete_news_items(self, news_ids: List[str]) -> bool:
+        """Delete news items by id, with their search index entries.
+
+        Used to undo a save whose vector could not be stored, so the link is
+        fetched and saved again later. Their news keys are kept.
+
+        Returns:
+            bool: True if the delete was successful, False otherwise
+        """
+        logger.info(f"Deleting {len(news_ids)} news items from the database")
+        try:
+            with connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                for chunk in _chunked(news_ids):
+                    self._delete_rows(cursor, chunk)
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error(f"Error deleting news items: {str(e)}", exc_info=True)
+            print(f"Error deleting news items: {str(e)}")
+            return False
+
+    def delete_news_before(self, cutoff_ts: int, dry_run: bool = False, batch_size: int = MAX_QUERY_PARAMS,
+                           on_delete: Optional[Callable[[List[str]], None]] = None) -> Tuple[int, int]:
+        """Delete news items published before a time, with their search index entries.
+
+        Their news keys are kept, so agents' read states stay valid.
+
+        Args:
+            cutoff_ts: Epoch seconds; items with an older published_ts are deleted
+            dry_run: Only count the items and their stored bytes
+            batch_size: Items deleted per transaction
+            on_delete: Called with the news_ids of each batch before it is
+                committed, to delete them from the vector index; if it raises,
+                the batch is rolled back
+
+        Returns:
+            Tuple[int, int]: Items deleted and the bytes of their stored text
+        """
+        size_expression = "COALESCE(LENGTH(content), 0) + COALESCE(LENGTH(content_compressed), 0) + COALESCE(LENGTH(summary), 0)"
+        logger.info(f"Deleting news items published before {cutoff_ts} (dry_run={dry_run})")
+        try:
+            if dry_run:
+                with connect(self.db_path) as conn:
+                    cursor = conn.cursor()
+                    cursor.execute(
+                        f"SELECT COUNT(*), COALESCE(SUM({size_expression}), 0) FROM news_items WHERE published_ts < ?",
+                        (cutoff_ts,)
+                    )
+                    rows, size = cursor.fetchone()
+                    return rows, size
+            deleted, size = 0, 0
+            while True:
+                with connect(self.db_path) as conn:
+                    cursor = conn.cursor()
+                    cursor.execute(f'''
+                        SELECT news_id, {size_expression} FROM news_items
+                        WHERE published_ts < ? LIMIT ?
+                    ''', (cutoff_ts, batch_size))
+                    rows = cursor.fetchall()
+                    if not rows:
+                        break
+                    news_ids = [row[0] for row in rows]
+                    self._delete_rows(cursor, news_ids)
+                    if on_delete is not None:
+                        on_delete(news_ids)
+                    conn.commit()
+                deleted += len(rows)
+                size += sum(row[1] for row in rows)
+            logger.info(f"Deleted {deleted} news items")
+            return deleted, size
+        except Exception as e:
+            logger.error(f"Error deleting old news items: {str(e)}", exc_info=True)
+            print(f"Error deleting old news items: {str(e)}")
+            raise
+
+    def train_content_dictionary(self, sample_count: int = 1000, size: int = 112640) -> Optional[int]:
+        """Train a zstd dictionary on the newest article bodies and use it for new items.
+
+        Only takes effect with NEWS_CONTENT_COMPRESSION=zstd. Items compressed
+        earlier keep the id of the dictionary they were written with.
+
+        Args:
+            sample_count: Number of recent articles to train on
+            size: Dictionary size in bytes
+
+        Returns:
+            Optional[int]: The new dictionary's id, or None if none was trained
+        """
+        if self._compressor.codec != "zstd":
+            logger.warning("Compression dictionaries need NEWS_CONTENT_COMPRESSION=zstd with zstandard installed")
+            return None
+        try:
+            with connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT content, content_compressed FROM news_items
+                    ORDER BY published_ts DESC LIMIT ?
+                ''', (sample_count,))
+                samples = [self._decode_content(content, blob, cursor) for content, blob in cursor.fetchall()]
+                samples = [sample for sample in samples if sample]
+                if len(samples) < 10:
+                    logger.info(f"Only {len(samples)} articles stored, not training a compression dictionary")
                     return None
+                dictionary = train_dictionary(samples, size)
+                cursor.execute('''
+                    INSERT INTO news_compression_dictionaries (dictionary_id, data)
+                    SELECT COALESCE(MAX(dictionary_id), 0) + 1, ? FROM news_compression_dictionaries
+                    RETURNING dictionary_id
+                ''', (dictionary,))
+                dictionary_id = cursor.fetchone()[0]
+                conn.commit()
+            self._dictionaries[dictionary_id] = dictionary
+            self._compressor = self._load_compressor()
+            logger.info(f"Trained compression dictionary {dictionary_id} on {len(samples)} articles")
+            return dictionary_id
         except Exception as e:
-            logger.error(f"Error retrieving news item from SQLite: {str(e)}", exc_info=True)
-            print(f"Error retrieving news item: {str(e)}")
+            logger.error(f"Error training compression dictionary: {str(e)}", exc_info=True)
             return None
 
+    def get_published_timestamps(self, news_ids: List[str]) -> Dict[str, int]:
+        """Return the published timestamp (epoch seconds) of several news items."""
+        news_ids = sorted(set(news_ids))
+        if not news_ids:
+            return {}
+        try:
+            timestamps = {}
+            with connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                for chunk in _chunked(news_ids):
+                    placeholders = ", ".join("?" for _ in chunk)
+                    cursor.execute(f'''
+                        SELECT news_id, published_ts FROM news_items
+                        WHERE news_id IN ({placeholders}) AND published_ts IS NOT NULL
+                    ''', chunk)
+                    timestamps.update(dict(cursor.fetchall()))
+            return timestamps
+        except Exception as e:
+            logger.error(f"Error retrieving published timestamps: {str(e)}", exc_info=True)
+            return {}
+
+    def search_news_bm25(self, query: str, top_k: int = 20, since_ts: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Keyword search over title, summary and content using the FTS5 BM25 ranking.
+
+        Args:
+            query: Free text search query
+            top_k: Maximum number of results to return
+            since_ts: Optional epoch seconds; older news items are excluded
+
+        Returns:
+            List[Tuple[str, float]]: (news_id, bm25 score) pairs, best match first.
+            Lower scores are better, as reported by SQLite's bm25(); on
+            PostgreSQL the score is the negated ts_rank_cd.
+        """
+        if self.dialect.name == "postgres":
+            return self._search_news_ts_rank(query, top_k, since_ts)
+        match_expression = build_fts_query(query)
+        if not match_expression:
+            return []
+        logger.debug(f"Running BM25 search with match expression: {match_expression}")
+        try:
+            with connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT n.news_id, bm25(news_search_fts, ?, ?, ?) AS score
+                    FROM news_search_fts
+                    JOIN news_keys k ON k.news_key = news_search_fts.rowid
+                    JOIN news_items n ON n.news_id = k.news_id
+                    WHERE news_search_fts MATCH ? AND (? IS NULL OR n.published_ts >= ?)
+                    ORDER BY score
+                    LIMIT ?
+                ''', (*BM25_COLUMN_WEIGHTS, match_expression, since_ts, since_ts, top_k))
+                results = [(row[0], row[1]) for row in cursor.fetchall()]
+                logger.debug(f"BM25 search found {len(results)} results")
+                return results
+        except Exception as e:
+            logger.error(f"Error running BM25 search: {str(e)}", exc_info=True)
+            return []
+
+    def _search_news_ts_rank(self, query: str, top_k: int, since_ts: Optional[int]) -> List[Tuple[str, float]]:
+        tsquery = build_tsquery(query)
+        if not tsquery:
+            return []
+        logger.debug(f"Running full-text search with tsquery: {tsquery}")
+        sql = '''
+            SELECT news_id, -ts_rank_cd(?::float4[], search_vector, q) AS score
+            FROM news_items, to_tsquery('english', ?) q
+            WHERE search_vector @@ q
+        '''
+        params: List[Any] = [TS_RANK_WEIGHTS, tsquery]
+        if since_ts is not None:
+            sql += " AND published_ts >= ?"
+            params.append(since_ts)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(top_k)
+        try:
+            with connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(sql, params)
+                results = [(row[0], row[1]) for row in cursor.fetchall()]
+                logger.debug(f"Full-text search found {len(results)} results")
+                return results
+        except Exception as e:
+            logger.error(f"Error running full-text search: {str(e)}", exc_info=True)
+            return []
+
     def link_exists(self, link: str) -> Optional[str]:
         """Check if a news link already exists in the database.
         
@@ -180,14 +960,23 @@ class NewsDB:
         """
         logger.debug(f"Checking if link exists in SQLite database: {link}")
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with connect(self.db_path) as conn:
                 cursor = conn.cursor()
+                normalized = normalize_link(link)
                 cursor.execute('''
                     SELECT news_id
                     FROM news_items
-                    WHERE link = ?
-                ''', (link,))
+                    WHERE link_normalized = ?
+                ''', (normalized,))
                 row = cursor.fetchone()
+                if not row:
+                    # The link may belong to a near-duplicate folded into another item
+                    cursor.execute('''
+                        SELECT news_id
+                        FROM news_alternate_links
+                        WHERE link_normalized = ?
+                    ''', (normalized,))
+                    row = cursor.fetchone()
                 if row:
                     logger.debug(f"Link already exists in SQLite database: {link}, news_id: {row[0]}")
                     return row[0]
@@ -199,51 +988,230 @@ class NewsDB:
             print(f"Error checking link existence: {str(e)}")
             return None
 
-    def mark_news_processed_by_agent(self, agent_id: str, news_id: str) -> bool:
-        """Mark a news item as processed by a specific agent."""
-        logger.info(f"Marking news_id {news_id} as processed by agent_id {agent_id}")
+    def find_near_duplicates(self, signature: List[int], threshold: float,
+                             words: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """Find stored news items whose MinHash signature is similar to the given one.
+
+        Candidates come from the LSH band index, so only items sharing at least
+        one band bucket are compared.
+
+        Args:
+            signature: MinHash signature of the incoming item (see news_signature)
+            threshold: Minimum Jaccard similarity
+            words: Title and summary words of the incoming item (see news_words);
+                when given, candidates are compared exactly instead of by
+                their estimated similarity
+
+        Returns:
+            List[Tuple[str, float]]: (news_id, similarity) pairs, most similar first
+        """
+        if not signature:
+            return []
+        band_keys = lsh_band_keys(signature)
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with connect(self.db_path) as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT OR IGNORE INTO agent_news_processed (agent_id, news_id)
-                    VALUES (?, ?)
-                ''', (agent_id, news_id))
+                placeholders = ", ".join("?" for _ in band_keys)
+                cursor.execute(f'''
+                    SELECT n.news_id, n.minhash, n.title, n.summary
+                    FROM news_items n
+                    WHERE n.news_id IN (
+                        SELECT DISTINCT news_id FROM news_minhash_bands WHERE band_key IN ({placeholders})
+                    )
+                ''', band_keys)
+                matches = []
+                for news_id, packed, title, summary in cursor.fetchall():
+                    if words is not None:
+                        similarity = jaccard(words, news_words({'title': title, 'summary': summary}))
+                    else:
+                        similarity = estimate_jaccard(signature, unpack_signature(packed))
+                    if similarity >= threshold:
+                        matches.append((news_id, similarity))
+                matches.sort(key=lambda match: match[1], reverse=True)
+                logger.debug(f"Found {len(matches)} near-duplicate news items")
+                return matches
+        except Exception as e:
+            logger.error(f"Error finding near-duplicate news items: {str(e)}", exc_info=True)
+            return []
+
+    def add_alternate_links(self, news_id: str, alternates: List[Dict[str, Any]]) -> bool:
+        """Record the links of near-duplicate stories as alternates of a news item.
+
+        Args:
+            news_id: ID of the representative news item
+            alternates: Dicts with link, source and title of the duplicate stories
+
+        Returns:
+            bool: True if the links were saved, False otherwise
+        """
+        rows = [
+            (alternate['link'], news_id, alternate.get('source', ''), alternate.get('title', ''), normalize_link(alternate['link']))
+            for alternate in alternates if alternate.get('link')
+        ]
+        if not rows:
+            return True
+        logger.info(f"Saving {len(rows)} alternate links for news_id {news_id}")
+        try:
+            with connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    INSERT INTO news_alternate_links (link, news_id, source, title, link_normalized)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT DO NOTHING
+                ''', rows)
                 conn.commit()
-                logger.debug(f"Marked news_id {news_id} as processed by agent_id {agent_id}")
                 return True
         except Exception as e:
-            logger.error(f"Error marking news as processed: {str(e)}", exc_info=True)
+            logger.error(f"Error saving alternate links: {str(e)}", exc_info=True)
             return False
 
-    def has_agent_processed_news(self, agent_id: str, news_id: str) -> bool:
-        """Check if a specific agent has processed a news item."""
-        logger.debug(f"Checking if agent_id {agent_id} has processed news_id {news_id}")
+    def get_alternate_links(self, news_id: str) -> List[Dict[str, Any]]:
+        """Return the alternate links recorded for a news item."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    SELECT 1 FROM agent_news_processed
-                    WHERE agent_id = ? AND news_id = ?
-                    LIMIT 1
-                ''', (agent_id, news_id))
-                result = cursor.fetchone()
-                return result is not None
-        except Exception as e:
-            logger.error(f"Error checking if agent processed news: {str(e)}", exc_info=True)
+                    SELECT link, source, title FROM news_alternate_links WHERE news_id = ?
+                ''', (news_id,))
+                return [{'link': row[0], 'source': row[1], 'title': row[2]} for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Error retrieving alternate links: {str(e)}", exc_info=True)
+            return []
+
+    def get_news_ids_for_links(self, links: List[str]) -> Dict[str, str]:
+        """Look up the news_id for many links at once, including alternate links.
+
+        Args:
+            links: URLs to look up
+
+        Returns:
+            Dict[str, str]: Mapping of each known link (as given) to its news_id
+        """
+        normalized_by_link = {link: normalize_link(link) for link in links if link}
+        normalized_values = sorted({value for value in normalized_by_link.values() if value})
+        if not normalized_values:
+            return {}
+        logger.debug(f"Bulk checking {len(normalized_values)} links in SQLite database")
+        try:
+            news_ids_by_normalized = {}
+            with connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                for chunk in _chunked(normalized_values):
+                    placeholders = ", ".join("?" for _ in chunk)
+                    cursor.execute(f'''
+                        SELECT link_normalized, news_id FROM news_alternate_links
+                        WHERE link_normalized IN ({placeholders})
+                        UNION ALL
+                        SELECT link_normalized, news_id FROM news_items
+                        WHERE link_normalized IN ({placeholders})
+                    ''', chunk + chunk)
+                    # Rows from news_items come last so they win over alternates
+                    news_ids_by_normalized.update(dict(cursor.fetchall()))
+            found = {
+                link: news_ids_by_normalized[normalized]
+                for link, normalized in normalized_by_link.items()
+                if normalized in news_ids_by_normalized
+            }
+            logger.debug(f"Found {len(found)} of {len(normalized_by_link)} links in SQLite database")
+            return found
+        except Exception as e:
+            logger.error(f"Error bulk checking link existence in SQLite: {str(e)}", exc_info=True)
+            return {}
+
+    def get_news_ids_processed_by_agent_among(self, agent_id: str, news_ids: List[str]) -> Set[str]:
+        """Return which of the given news_ids the agent has already processed, in one query."""
+        news_ids = sorted(set(news_ids))
+        if not news_ids:
+            return set()
+        try:
+            with connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                state = self._get_read_state(cursor, agent_id)
+                if state is None:
+                    return set()
+                news_keys = self._get_news_keys(cursor, news_ids)
+            processed = {news_id for news_id, news_key in news_keys.items() if news_key in state}
+            logger.debug(f"Agent {agent_id} has processed {len(processed)} of {len(news_ids)} news_ids")
+            return processed
+        except Exception as e:
+            logger.error(f"Error bulk checking processed news: {str(e)}", exc_info=True)
+            return set()
+
+    def get_news_ids_unprocessed_by_agents(self, agent_ids: List[str], news_ids: List[str]) -> Dict[str, List[str]]:
+        """For each agent, the given news_ids it has not processed yet, e.g. for a broadcast.
+
+        Reads every agent's read state and every news key with one query per
+        chunk of ids, instead of a query per agent.
+
+        Returns:
+            Dict[str, List[str]]: agent_id to its unprocessed news_ids, in the given order
+        """
+        agent_ids = list(dict.fromkeys(agent_ids))
+        news_ids = list(dict.fromkeys(news_ids))
+        if not agent_ids or not news_ids:
+            return {agent_id: [] for agent_id in agent_ids}
+        try:
+            with connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                agent_keys = self._get_agent_keys(cursor, agent_ids)
+                states = self._get_read_states(cursor, list(agent_keys.values()))
+                news_keys = self._get_news_keys(cursor, news_ids)
+            unprocessed = {}
+            for agent_id in agent_ids:
+                state = states.get(agent_keys.get(agent_id)) or ReadState()
+                unprocessed[agent_id] = [
+                    news_id for news_id in news_ids
+                    if news_id not in news_keys or news_keys[news_id] not in state
+                ]
+            return unprocessed
+        except Exception as e:
+            logger.error(f"Error bulk checking unprocessed news: {str(e)}", exc_info=True)
+            return {agent_id: [] for agent_id in agent_ids}
+
+    def mark_news_processed_by_agent(self, agent_id: str, news_id: str) -> bool:
+        """Mark a news item as processed by a specific agent."""
+        logger.info(f"Marking news_id {news_id} as processed by agent_id {agent_id}")
+        return self.mark_news_ids_processed_by_agent(agent_id, [news_id])
+
+    def mark_news_ids_processed_by_agent(self, agent_id: str, news_ids: List[str]) -> bool:
+        """Mark several news items as processed by a specific agent in one transaction."""
+        news_ids = sorted(set(news_ids))
+        if not news_ids:
+            return True
+        logger.info(f"Marking {len(news_ids)} news_ids as processed by agent_id {agent_id}")
+        try:
+            # The read state is read, changed and written back, so take the write lock first
+            with transaction(self.db_path, immediate=True) as conn:
+                self._mark_processed(conn.cursor(), agent_id, news_ids)
+            return True
+        except Exception as e:
+            logger.error(f"Error marking news as processed: {str(e)}", exc_info=True)
             return False
 
+    def has_agent_processed_news(self, agent_id: str, news_id: str) -> bool:
+        """Check if a specific agent has processed a news item."""
+        logger.debug(f"Checking if agent_id {agent_id} has processed news_id {news_id}")
+        return news_id in self.get_news_ids_processed_by_agent_among(agent_id, [news_id])
+
     def get_news_ids_processed_by_agent(self, agent_id: str) -> list:
-        """Return a list of news_ids processed by the given agent_id."""
+        """Return a list of news_ids processed by the given agent_id.
+
+        Prefer get_news_ids_processed_by_agent_among, which only looks up the
+        ids the caller has in hand.
+        """
         logger.debug(f"Getting news_ids processed by agent_id: {agent_id}")
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with connect(self.db_path) as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT news_id FROM agent_news_processed WHERE agent_id = ?
-                ''', (agent_id,))
-                rows = cursor.fetchall()
-                news_ids = [row[0] for row in rows]
+                state = self._get_read_state(cursor, agent_id)
+                if state is None:
+                    return []
+                cursor.execute("SELECT news_id FROM news_keys WHERE news_key <= ?", (state.watermark,))
+                news_ids = [row[0] for row in cursor.fetchall()]
+                for chunk in _chunked(list(state.keys_above_watermark())):
+                    placeholders = ", ".join("?" for _ in chunk)
+                    cursor.execute(f"SELECT news_id FROM news_keys WHERE news_key IN ({placeholders})", chunk)
+                    news_ids.extend(row[0] for row in cursor.fetchall())
                 logger.debug(f"Found {len(news_ids)} news_ids processed by agent_id {agent_id}")
                 return news_ids
         except Exception as e:
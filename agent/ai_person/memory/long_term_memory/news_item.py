@@ -0,0 +1,72 @@
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+# Columns of news_items a NewsItem can carry, in the order get_news_item returns them
+NEWS_ITEM_FIELDS: Tuple[str, ...] = (
+    'news_id', 'title', 'summary', 'content', 'link', 'source', 'published_at', 'created_at'
+)
+
+# Marks content that was not selected and has not been loaded yet
+_NOT_LOADED = object()
+
+
+class NewsItem:
+    """A stored news item, holding only the columns that were selected.
+
+    The article content is by far the largest column, so listing and
+    ranking paths select without it. Reading `content` on such an item
+    loads it on first access through the loader the store attached.
+    Supports `item['title']` and `item.get('title')` like the dicts the
+    store used to return.
+    """
+
+    __slots__ = ('news_id', 'title', 'summary', 'link', 'source', 'published_at', 'created_at',
+                 '_content', '_fields', '_loader')
+
+    def __init__(self, values: Dict[str, Any], loader: Optional[Callable[[str], Optional[str]]] = None):
+        """Create an item from selected column values.
+
+        Args:
+            values: Column name to value; must include news_id
+            loader: Returns the content of a news_id; used when content was not selected
+        """
+        self._fields = tuple(field for field in NEWS_ITEM_FIELDS if field in values)
+        self._loader = loader
+        for field in NEWS_ITEM_FIELDS:
+            if field != 'content':
+                setattr(self, field, values.get(field))
+        self._content = values['content'] if 'content' in values else _NOT_LOADED
+
+    @property
+    def content(self) -> Optional[str]:
+        if self._content is _NOT_LOADED:
+            self._content = self._loader(self.news_id) if self._loader else None
+        return self._content
+
+    @property
+    def content_loaded(self) -> bool:
+        return self._content is not _NOT_LOADED
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in NEWS_ITEM_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        # Like dict.get: columns that were not selected are absent, except the lazy content
+        if key != 'content' and key not in self._fields:
+            return default
+        return getattr(self, key)
+
+    def to_dict(self, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """The item as a plain dict.
+
+        Args:
+            fields: Columns to include; defaults to the selected ones plus
+                content if it has been loaded
+        """
+        if fields is None:
+            fields = [field for field in NEWS_ITEM_FIELDS if field in self._fields or (field == 'content' and self.content_loaded)]
+        return {field: self[field] for field in fields}
+
+    def __repr__(self) -> str:
+        return f"NewsItem(news_id={self.news_id!r}, title={self.title!r})"
@@ -1,65 +1,51 @@
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional, Tuple
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 import os
-import chromadb
-from chromadb.utils import embedding_functions
-import logging
+from common.backup import index_write_lock
+from common.logging_setup import setup_logging
+from .news_db import parse_published_timestamp
 
 # Setup logging for news vector database
 def setup_vector_db_logging():
     """Setup logging for the news vector database module."""
-    log_dir = "logs"
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-
-    log_file = os.path.join(log_dir, f"news_vector_db_{datetime.now().strftime('%Y%m%d')}.log")
-    
-    # Create logger
-    logger = logging.getLogger("ai_person.memory.news_vector_db")
-    logger.setLevel(logging.DEBUG)
-    
-    # Remove any existing handlers
-    for handler in logger.handlers[:]:
-        logger.removeHandler(handler)
-    
-    # Create file handler
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setLevel(logging.DEBUG)
-    file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(file_formatter)
-    
-    # Create console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_formatter = logging.Formatter('%(levelname)s - %(message)s')
-    console_handler.setFormatter(console_formatter)
-    
-    # Add handlers to logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
-    return logger
+    return setup_logging("ai_person.memory.news_vector_db", "news_vector_db")
 
 # Initialize logger
 logger = setup_vector_db_logging()
 
-class NewsVectorDB:
-    def __init__(self, persist_directory: str = "news_vector_db"):
-        """Initialize the news vector database.
-        
-        Args:
-            persist_directory: Directory to persist the database
-        """
-        logger.info("Initializing NewsVectorDB")
-        # Get the directory where this file is located
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        # Create full path to database directory
-        db_path = os.path.join(current_dir, persist_directory)
-        logger.debug(f"Vector database path: {db_path}")
-        
+class ChromaNewsIndex:
+    """News vector index backed by an embedded ChromaDB persistent client.
+
+    With partition_by_month, each item goes to a per-month collection
+    (ai_news_YYYY_MM) and time-windowed queries only touch the months inside
+    the window and the ai_news collection, where items stored before
+    partitioning stay.
+
+    Documents stored before published_ts was recorded get it from NewsDB
+    through backfill_timestamps(); a document whose time is unknown has
+    published_ts 0 and, as in the other backends, is kept by windowed queries.
+
+    Writes hold the directory's shared write lock (see index_write_lock), so
+    a backup can pause them while it copies the directory.
+    """
+
+    COLLECTION_NAME = "ai_news"
+    # Written once every document of the ai_news collection has a published_ts
+    BACKFILL_MARKER = "published_ts_backfilled"
+    BACKFILL_BATCH_SIZE = 500
+
+    def __init__(self, db_path: str, partition_by_month: Optional[bool] = None):
+        import chromadb
+        from chromadb.utils import embedding_functions
+
+        if partition_by_month is None:
+            partition_by_month = os.getenv("NEWS_VECTOR_PARTITION_BY_MONTH", "false").lower() == "true"
+        self.partition_by_month = partition_by_month
+
         # Initialize ChromaDB client with persistence
         logger.debug("Initializing ChromaDB client")
+        self.db_path = db_path
         self.client = chromadb.PersistentClient(path=db_path)
         
         # Get OpenAI API key from environment variable
@@ -75,36 +61,234 @@ class NewsVectorDB:
         )
         
         # Get or create collection
-        logger.debug("Getting or creating ChromaDB collection: ai_news")
-        self.collection = self.client.get_or_create_collection(
-            name="ai_news",
-            embedding_function=self.embedding_function
+        logger.debug(f"Getting or creating ChromaDB collection: {self.COLLECTION_NAME}")
+        self.collection = self._get_collection(self.COLLECTION_NAME)
+        self._partitions: Dict[str, Any] = {}
+
+    def _get_collection(self, name: str):
+        return self.client.get_or_create_collection(name=name, embedding_function=self.embedding_function)
+
+    @classmethod
+    def _partition_name(cls, timestamp: int) -> str:
+        month = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+        return f"{cls.COLLECTION_NAME}_{month.year:04d}_{month.month:02d}"
+
+    def _partition(self, name: str):
+        if name not in self._partitions:
+            self._partitions[name] = self._get_collection(name)
+        return self._partitions[name]
+
+    def _collections_for_window(self, since_ts: Optional[int]) -> List[Any]:
+        if not self.partition_by_month:
+            return [self.collection]
+        names = sorted(
+            collection if isinstance(collection, str) else collection.name
+            for collection in self.client.list_collections()
+        )
+        partition_names = [name for name in names if name.startswith(f"{self.COLLECTION_NAME}_")]
+        if since_ts is None:
+            return [self.collection] + [self._partition(name) for name in partition_names]
+        first_partition = self._partition_name(since_ts)
+        return [self.collection] + [self._partition(name) for name in partition_names if name >= first_partition]
+
+    def add(self, news_id: str, text: str, published_ts: int) -> None:
+        # Only the embedding is stored; the text lives in NewsDB and is read from there by news_id
+        embeddings = self.embedding_function([text])
+        with index_write_lock(self.db_path):
+            collection = self._partition(self._partition_name(published_ts)) if self.partition_by_month else self.collection
+            logger.debug(f"Adding embedding to ChromaDB collection: {collection.name}")
+            collection.add(embeddings=embeddings, ids=[news_id], metadatas=[{"published_ts": published_ts}])
+
+    def query(self, text: str, top_k: int, since_ts: Optional[int] = None) -> List[Tuple[str, float]]:
+        collections = self._collections_for_window(since_ts)
+        logger.debug(f"Executing ChromaDB query over {len(collections)} collection(s)")
+        if not collections:
+            return []
+        query_embeddings = self.embedding_function([text])
+        where = None
+        if since_ts is not None:
+            where = {"$or": [{"published_ts": {"$gte": since_ts}}, {"published_ts": 0}]}
+        results: List[Tuple[str, float]] = []
+        for collection in collections:
+            collection_results = collection.query(query_embeddings=query_embeddings, n_results=top_k, where=where, include=["distances"])
+            news_ids = collection_results['ids'][0]
+            distances = (collection_results.get('distances') or [[]])[0] or [0.0] * len(news_ids)
+            results.extend(zip(news_ids, distances))
+        results.sort(key=lambda result: result[1])
+        return results[:top_k]
+
+    def backfill_timestamps(self, get_timestamps: Callable[[List[str]], Dict[str, int]]) -> int:
+        marker_path = os.path.join(self.db_path, self.BACKFILL_MARKER)
+        if os.path.exists(marker_path):
+            return 0
+        # Partitions were always written with published_ts; only ai_news can lack it
+        missing = []
+        offset = 0
+        while True:
+            page = self.collection.get(include=["metadatas"], limit=self.BACKFILL_BATCH_SIZE, offset=offset)
+            if not page["ids"]:
+                break
+            missing.extend(
+                news_id for news_id, metadata in zip(page["ids"], page["metadatas"])
+                if not metadata or "published_ts" not in metadata
+            )
+            offset += len(page["ids"])
+        for start in range(0, len(missing), self.BACKFILL_BATCH_SIZE):
+            chunk = missing[start:start + self.BACKFILL_BATCH_SIZE]
+            timestamps = get_timestamps(chunk)
+            with index_write_lock(self.db_path):
+                self.collection.update(ids=chunk, metadatas=[{"published_ts": timestamps.get(news_id) or 0} for news_id in chunk])
+        open(marker_path, "w").close()
+        return len(missing)
+
+    def delete(self, news_ids: List[str]) -> None:
+        # Items may be in any monthly partition, so every collection is asked
+        collections = self._collections_for_window(None)
+        with index_write_lock(self.db_path):
+            for collection in collections:
+                collection.delete(ids=news_ids)
+
+    def warm_up(self) -> None:
+        # Counting loads the collection's segments
+        count = sum(collection.count() for collection in self._collections_for_window(None))
+        logger.debug(f"Warmed up ChromaDB index with {count} embeddings")
+
+
+class MmapNewsIndex:
+    """News vector index backed by memory-mapped NumPy files (see MmapVectorIndex).
+
+    The per-row timestamps make a time-windowed query a vectorized mask over a
+    single file, so this backend does not need monthly partitions.
+    """
+
+    def __init__(self, db_path: str):
+        from .embeddings import OpenAIEmbeddingFunction
+        from .mmap_vector_index import MmapVectorIndex
+
+        logger.debug("Creating OpenAI embedding function with model: text-embedding-3-small")
+        self.embedding_function = OpenAIEmbeddingFunction(model_name="text-embedding-3-small")
+        self.index = MmapVectorIndex(
+            os.path.join(db_path, "mmap"),
+            dtype=os.getenv("NEWS_VECTOR_DTYPE", "float16"),
+            read_only=os.getenv("NEWS_VECTOR_READ_ONLY", "false").lower() == "true",
+            use_hnsw=os.getenv("NEWS_VECTOR_HNSW", "false").lower() == "true"
         )
+
+    def add(self, news_id: str, text: str, published_ts: int) -> None:
+        logger.debug("Adding vector to mmap index")
+        self.index.add(news_id, self.embedding_function([text])[0], timestamp=published_ts)
+
+    def query(self, text: str, top_k: int, since_ts: Optional[int] = None) -> List[Tuple[str, float]]:
+        logger.debug("Executing mmap index query")
+        # Pick up vectors appended by the writer process since this index was opened
+        self.index.refresh()
+        results = self.index.search(self.embedding_function([text])[0], top_k=top_k, min_timestamp=since_ts)
+        # Report cosine distance so scores compare with the Chroma backend
+        return [(news_id, 1.0 - similarity) for news_id, similarity in results]
+
+    def backfill_timestamps(self, get_timestamps: Callable[[List[str]], Dict[str, int]]) -> int:
+        if self.index.read_only:
+            return 0
+        self.index.refresh()
+        return self.index.backfill_timestamps(get_timestamps)
+
+    def delete(self, news_ids: List[str]) -> None:
+        self.index.refresh()
+        self.index.remove(news_ids)
+
+    def warm_up(self) -> None:
+        self.index.refresh()
+        count = self.index.warm_up()
+        logger.debug(f"Warmed up mmap index with {count} vectors")
+
+
+class PgVectorNewsIndex:
+    """News vector index stored in PostgreSQL with pgvector (see PgVectorIndex).
+
+    Lets several agent processes share one index; db_path is not used.
+    """
+
+    TABLE_NAME = "news_embeddings"
+
+    def __init__(self, db_path: str):
+        from .embeddings import OpenAIEmbeddingFunction
+        from .pgvector_index import PgVectorIndex
+
+        logger.debug("Creating OpenAI embedding function with model: text-embedding-3-small")
+        self.embedding_function = OpenAIEmbeddingFunction(model_name="text-embedding-3-small")
+        self.index = PgVectorIndex(self.TABLE_NAME)
+
+    def add(self, news_id: str, text: str, published_ts: int) -> None:
+        logger.debug("Adding vector to pgvector index")
+        self.index.add(news_id, self.embedding_function([text])[0], timestamp=published_ts)
+
+    def query(self, text: str, top_k: int, since_ts: Optional[int] = None) -> List[Tuple[str, float]]:
+        logger.debug("Executing pgvector index query")
+        results = self.index.search(self.embedding_function([text])[0], top_k=top_k, min_timestamp=since_ts)
+        # Report cosine distance so scores compare with the Chroma backend
+        return [(news_id, 1.0 - similarity) for news_id, similarity in results]
+
+    def backfill_timestamps(self, get_timestamps: Callable[[List[str]], Dict[str, int]]) -> int:
+        # Rows have had a timestamp since the table was introduced
+        return 0
+
+    def delete(self, news_ids: List[str]) -> None:
+        self.index.remove(news_ids)
+
+    def warm_up(self) -> None:
+        logger.debug(f"Warmed up pgvector index with {self.index.count} embeddings")
+
+
+VECTOR_BACKENDS = {
+    "chroma": ChromaNewsIndex,
+    "mmap": MmapNewsIndex,
+    "pgvector": PgVectorNewsIndex,
+}
+
+
+class NewsVectorDB:
+    def __init__(self, persist_directory: str = "news_vector_db", backend: Optional[str] = None):
+        """Initialize the news vector database.
+        
+        Args:
+            persist_directory: Directory to persist the database
+            backend: Index backend, "chroma", "mmap" or "pgvector". Defaults to the
+                     NEWS_VECTOR_BACKEND environment variable, then "chroma".
+        """
+        backend = backend or os.getenv("NEWS_VECTOR_BACKEND", "chroma")
+        if backend not in VECTOR_BACKENDS:
+            raise ValueError(f"Unknown news vector backend '{backend}', expected one of {list(VECTOR_BACKENDS)}")
+        logger.info(f"Initializing NewsVectorDB with backend: {backend}")
+        # Get the directory where this file is located
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        # Create full path to database directory
+        db_path = os.path.join(current_dir, persist_directory)
+        logger.debug(f"Vector database path: {db_path}")
+        
+        self.backend = backend
+        self.index = VECTOR_BACKENDS[backend](db_path)
         logger.info("NewsVectorDB initialization complete")
 
-    def add_news_item(self, news_item: Dict[str, Any]) -> str:
+    def add_news_item(self, news_item: Dict[str, Any], news_id: Optional[str] = None) -> str:
         """Add a news item to the vector database.
         
         Args:
             news_item: Dictionary containing news item data with keys:
                       title, summary, content, link, source, published
+            news_id: ID the item was stored under in NewsDB; a new one is generated if omitted
         
         Returns:
             str: The ID of the added news item
         
         """
         # Generate unique ID
-        news_id = str(uuid.uuid4())
+        news_id = news_id or str(uuid.uuid4())
         logger.info(f"Adding news item to vector database: {news_item.get('title', 'No title')}")
         logger.debug(f"Generated news_id: {news_id}")
         
         try:
-            # Add to collection
-            logger.debug("Adding document to ChromaDB collection")
-            self.collection.add(
-                documents=[news_item["content"]],
-                ids=[news_id]
-            )
+            published_ts = parse_published_timestamp(news_item.get("published")) or int(datetime.now(timezone.utc).timestamp())
+            self.index.add(news_id, news_item["content"], published_ts)
             logger.info(f"Successfully added news to vector database: {news_item['title']}")
             print(f"Successfully added news: {news_item['title']}")
             return news_id
@@ -113,31 +297,77 @@ class NewsVectorDB:
             print(f"Error adding news item: {str(e)}")
             raise
 
-    def search_news(self, query: str, top_k: int = 3) -> List[str]:
+    def search_news(self, query: str, top_k: int = 3, since_ts: Optional[int] = None) -> List[str]:
         """Search for news items similar to the query.
         
         Args:
             query: Search query string
             top_k: Number of results to return
+            since_ts: Optional epoch seconds; older news items are excluded
             
         Returns:
             List of news IDs that match the query
         """
-        logger.info(f"Searching vector database with query: '{query}', top_k: {top_k}")
-        try:
-            logger.debug("Executing ChromaDB query")
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=top_k
-            )
+        return [news_id for news_id, _ in self.search_news_with_scores(query, top_k=top_k, since_ts=since_ts)]
+
+    def search_news_with_scores(self, query: str, top_k: int = 3, since_ts: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Search for news items similar to the query, keeping the vector distances.
+        
+        Args:
+            query: Search query string
+            top_k: Number of results to return
+            since_ts: Optional epoch seconds; older news items are excluded
             
-            # Return just the IDs
-            news_ids = results['ids'][0]
-            logger.info(f"Vector search completed, found {len(news_ids)} results")
-            logger.debug(f"Found news IDs: {news_ids}")
-            return news_ids
+        Returns:
+            List of (news_id, distance) pairs, closest first
+        """
+        logger.info(f"Searching vector database with query: '{query}', top_k: {top_k}, since_ts: {since_ts}")
+        try:
+            results = self.index.query(query, top_k, since_ts=since_ts)
+            logger.info(f"Vector search completed, found {len(results)} results")
+            logger.debug(f"Found news IDs: {[news_id for news_id, _ in results]}")
+            return results
         except Exception as e:
             logger.error(f"Error searching news in vector database: {str(e)}", exc_info=True)
             print(f"Error searching news: {str(e)}")
             raise
 
+    def backfill_timestamps(self, get_timestamps: Callable[[List[str]], Dict[str, int]]) -> None:
+        """Record the published time of vectors stored before it was tracked.
+
+        Time-windowed searches compare it to since_ts; without it an old item
+        would be kept or dropped depending on the backend.
+
+        Args:
+            get_timestamps: Returns the published timestamps of some news_ids, e.g. NewsDB.get_published_timestamps
+        """
+        try:
+            count = self.index.backfill_timestamps(get_timestamps)
+            if count:
+                logger.info(f"Backfilled published timestamps of {count} vectors")
+        except Exception as e:
+            logger.error(f"Error backfilling published timestamps in vector database: {str(e)}", exc_info=True)
+
+    def delete_news_items(self, news_ids: List[str]) -> None:
+        """Delete the vectors of news items, such as items removed by the retention job.
+
+        Args:
+            news_ids: IDs of the news items; ids without a vector are ignored
+        """
+        if not news_ids:
+            return
+        logger.info(f"Deleting {len(news_ids)} news items from the vector database")
+        try:
+            self.index.delete(news_ids)
+        except Exception as e:
+            logger.error(f"Error deleting news items from vector database: {str(e)}", exc_info=True)
+            raise
+
+    def warm_up(self) -> None:
+        """Load the index so the first search does not pay for it."""
+        logger.info(f"Warming up {self.backend} news index")
+        self.index.warm_up()
+
+    def warm_up_embeddings(self) -> None:
+        """Embed a short text, which creates the embeddings client and opens its connection."""
+        self.index.embedding_function(["warmup"])
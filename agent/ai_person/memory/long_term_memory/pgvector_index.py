@@ -0,0 +1,154 @@
+from typing import List, Optional, Set, Tuple
+import threading
+from common.postgres_storage import connect
+from common.logging_setup import setup_logging
+
+# Setup logging for the pgvector index
+def setup_pgvector_index_logging():
+    """Setup logging for the pgvector index module."""
+    return setup_logging("ai_person.memory.pgvector_index", "pgvector_index")
+
+# Initialize logger
+logger = setup_pgvector_index_logging()
+
+# Tables already created by this process
+_created_tables: Set[str] = set()
+_created_tables_lock = threading.Lock()
+
+
+def _vector_literal(vector: List[float]) -> str:
+    # pgvector's text input format, so no client-side adapter is needed
+    return "[" + ",".join(repr(float(value)) for value in vector) + "]"
+
+
+class PgVectorIndex:
+    """Cosine-similarity index stored in PostgreSQL with the pgvector extension.
+
+    Has the add_many/search/count/refresh interface of MmapVectorIndex, so it
+    can replace it when several processes share state through PostgreSQL.
+    Rows are keyed by (namespace, item_id); one table can hold a separate index
+    per namespace, such as one per agent. The table and its HNSW index are
+    created on the first add, once the embedding dimension is known.
+    """
+
+    def __init__(self, table: str, namespace: str = "", dsn: Optional[str] = None):
+        """Open the index.
+
+        Args:
+            table: Table holding the vectors
+            namespace: Partition of the table this index reads and writes
+            dsn: PostgreSQL connection string; defaults to DATABASE_URL
+        """
+        self.table = table
+        self.namespace = namespace
+        self.dsn = dsn
+
+    def _table_exists(self, cursor) -> bool:
+        if self.table in _created_tables:
+            return True
+        cursor.execute("SELECT to_regclass(?) IS NOT NULL", (self.table,))
+        exists = bool(cursor.fetchone()[0])
+        if exists:
+            with _created_tables_lock:
+                _created_tables.add(self.table)
+        return exists
+
+    def _create_table(self, cursor, dim: int) -> None:
+        # Only remembered once the creating transaction commits, by _table_exists
+        if self._table_exists(cursor):
+            return
+        logger.info(f"Creating pgvector table {self.table} with dimension {dim}")
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                namespace TEXT NOT NULL,
+                item_id TEXT NOT NULL,
+                embedding vector({dim}) NOT NULL,
+                ts BIGINT NOT NULL DEFAULT 0,
+                PRIMARY KEY (namespace, item_id)
+            )
+        ''')
+        cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS idx_{self.table}_embedding
+            ON {self.table} USING hnsw (embedding vector_cosine_ops)
+        ''')
+
+    @property
+    def count(self) -> int:
+        with connect(self.dsn) as conn:
+            cursor = conn.cursor()
+            if not self._table_exists(cursor):
+                return 0
+            cursor.execute(f"SELECT COUNT(*) FROM {self.table} WHERE namespace = ?", (self.namespace,))
+            return cursor.fetchone()[0]
+
+    def refresh(self) -> None:
+        """Nothing to reload; every search reads the table."""
+
+    def add(self, item_id: str, vector: List[float], timestamp: Optional[int] = None) -> None:
+        """Add one vector to the index."""
+        self.add_many([item_id], [vector], None if timestamp is None else [timestamp])
+
+    def add_many(self, item_ids: List[str], vectors: List[List[float]], timestamps: Optional[List[int]] = None) -> None:
+        """Add several vectors, optionally with a timestamp (epoch seconds) each; existing ids are replaced."""
+        if not item_ids:
+            return
+        timestamps = timestamps or [0] * len(item_ids)
+        with connect(self.dsn) as conn:
+            cursor = conn.cursor()
+            self._create_table(cursor, len(vectors[0]))
+            cursor.executemany(f'''
+                INSERT INTO {self.table} (namespace, item_id, embedding, ts)
+                VALUES (?, ?, ?::vector, ?)
+                ON CONFLICT (namespace, item_id) DO UPDATE SET embedding = excluded.embedding, ts = excluded.ts
+            ''', [
+                (self.namespace, item_id, _vector_literal(vector), timestamp or 0)
+                for item_id, vector, timestamp in zip(item_ids, vectors, timestamps)
+            ])
+        logger.debug(f"Added {len(item_ids)} vectors to {self.table}")
+
+    def remove(self, item_ids: List[str]) -> int:
+        """Delete the vectors of some ids.
+
+        Returns:
+            int: Number of vectors removed
+        """
+        if not item_ids:
+            return 0
+        with connect(self.dsn) as conn:
+            cursor = conn.cursor()
+            if not self._table_exists(cursor):
+                return 0
+            placeholders = ", ".join("?" for _ in item_ids)
+            cursor.execute(
+                f"DELETE FROM {self.table} WHERE namespace = ? AND item_id IN ({placeholders})",
+                (self.namespace, *item_ids)
+            )
+            removed = cursor.rowcount
+        logger.debug(f"Removed {removed} vectors from {self.table}")
+        return removed
+
+    def search(self, vector: List[float], top_k: int = 3, min_timestamp: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Return the top_k (id, cosine similarity) pairs, most similar first.
+
+        Args:
+            vector: Query embedding
+            top_k: Number of results to return
+            min_timestamp: Optional epoch seconds; rows with an older timestamp are skipped
+        """
+        if top_k <= 0:
+            return []
+        sql = f"SELECT item_id, embedding <=> ?::vector AS distance FROM {self.table} WHERE namespace = ?"
+        params = [_vector_literal(vector), self.namespace]
+        if min_timestamp is not None:
+            # Rows with unknown time (0) are kept, as in MmapVectorIndex
+            sql += " AND (ts >= ? OR ts = 0)"
+            params.append(min_timestamp)
+        sql += " ORDER BY distance LIMIT ?"
+        params.append(top_k)
+        with connect(self.dsn) as conn:
+            cursor = conn.cursor()
+            if not self._table_exists(cursor):
+                return []
+            cursor.execute(sql, params)
+            return [(item_id, 1.0 - float(distance)) for item_id, distance in cursor.fetchall()]
@@ -0,0 +1,105 @@
+from typing import Iterable, Iterator, List, Optional
+
+
+class ReadState:
+    """The set of news keys an agent has processed, stored compactly.
+
+    News keys start at 1 and are assigned in increasing order as items are
+    stored, and an agent mostly processes new items, so the set is a
+    high-water mark (every key up to it is in the set) plus a bitmap of the
+    keys above it. Adding keys moves the mark up over the bitmap's leading
+    run of set bits, so an agent that has seen everything costs a few bytes
+    whatever its history.
+    """
+
+    __slots__ = ('watermark', 'base', 'bits')
+
+    def __init__(self, watermark: int = 0, base: int = 0, bits: int = 0):
+        """Create a read state.
+
+        Args:
+            watermark: Every key up to and including it is in the set
+            base: Key of bit 0 of bits
+            bits: Bitmap of the keys above the watermark
+        """
+        self.watermark = watermark
+        self.base = base
+        self.bits = bits
+
+    @classmethod
+    def from_row(cls, watermark: Optional[int], base: Optional[int], bitmap: Optional[bytes]) -> "ReadState":
+        bits = int.from_bytes(bytes(bitmap), "little") if bitmap else 0
+        return cls(watermark or 0, base or 0, bits)
+
+    def to_row(self) -> tuple:
+        """The (watermark, base, bitmap) column values."""
+        bitmap = self.bits.to_bytes((self.bits.bit_length() + 7) // 8, "little") if self.bits else None
+        return self.watermark, self.base, bitmap
+
+    def __contains__(self, key: int) -> bool:
+        if key <= self.watermark:
+            return True
+        offset = key - self.base
+        return offset >= 0 and (self.bits >> offset) & 1 == 1
+
+    def __len__(self) -> int:
+        return self.watermark + bin(self.bits).count("1")
+
+    def add(self, keys: Iterable[int]) -> bool:
+        """Add keys to the set.
+
+        Returns:
+            bool: True if any key was not in the set before
+        """
+        changed = False
+        for key in sorted(set(keys)):
+            if key in self:
+                continue
+            if not self.bits:
+                self.base = key
+            elif key < self.base:
+                self.bits <<= self.base - key
+                self.base = key
+            self.bits |= 1 << (key - self.base)
+            changed = True
+        if changed:
+            self._compact()
+        return changed
+
+    def _compact(self) -> None:
+        # Bits at or below the watermark carry no information
+        if self.bits and self.base <= self.watermark:
+            covered = self.watermark - self.base + 1
+            self.bits >>= covered
+            self.base += covered
+        if not self.bits:
+            self.base = self.watermark + 1
+            return
+        # Drop leading zero bits
+        zeros = (self.bits & -self.bits).bit_length() - 1
+        self.bits >>= zeros
+        self.base += zeros
+        if self.base == self.watermark + 1:
+            # Raise the watermark over the run of set bits right above it
+            ones = (~self.bits & (self.bits + 1)).bit_length() - 1
+            self.watermark += ones
+            self.bits >>= ones
+            self.base += ones
+            if self.bits:
+                zeros = (self.bits & -self.bits).bit_length() - 1
+                self.bits >>= zeros
+                self.base += zeros
+            else:
+                self.base = self.watermark + 1
+
+    def keys_above_watermark(self) -> Iterator[int]:
+        bits, key = self.bits, self.base
+        while bits:
+            if bits & 1:
+                yield key
+            bits >>= 1
+            key += 1
+
+    def filter(self, keys: Iterable[int]) -> List[int]:
+        """The keys that are in the set."""
+        return [key for key in keys if key in self]
@@ -0,0 +1,114 @@
+from typing import Callable, List, Optional
+import logging
+import struct
+import zlib
+
+logger = logging.getLogger("ai_person.memory.news_db")
+
+ZLIB = "zlib"
+ZSTD = "zstd"
+NONE = "none"
+
+# First byte of a compressed value names its codec, so values written with
+# different settings can be read back side by side
+_ZLIB_HEADER = b"z"
+_ZSTD_HEADER = b"s"
+# Followed by the 4-byte id of the dictionary the value was compressed with
+_ZSTD_DICT_HEADER = b"d"
+
+
+def _import_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+class TextCompressor:
+    """Compresses text columns with zlib, or zstd when zstandard is installed.
+
+    zstd can use a dictionary trained on earlier articles, which helps most
+    with short texts that share boilerplate.
+    """
+
+    def __init__(self, codec: str = ZLIB, level: Optional[int] = None,
+                 dictionary: Optional[bytes] = None, dictionary_id: Optional[int] = None):
+        """Create a compressor.
+
+        Args:
+            codec: ZLIB, ZSTD or NONE; ZSTD falls back to ZLIB without zstandard
+            level: Compression level; defaults to 6 for zlib and 3 for zstd
+            dictionary: Trained zstd dictionary used for new values
+            dictionary_id: Id stored with values compressed with the dictionary
+        """
+        if codec not in (ZLIB, ZSTD, NONE):
+            raise ValueError(f"Unknown compression codec '{codec}', expected '{ZLIB}', '{ZSTD}' or '{NONE}'")
+        self._zstandard = _import_zstandard() if codec == ZSTD else None
+        if codec == ZSTD and self._zstandard is None:
+            logger.warning("zstandard is not installed, compressing news content with zlib")
+            codec = ZLIB
+        self.codec = codec
+        self.level = level if level is not None else (3 if codec == ZSTD else 6)
+        self.dictionary_id = None
+        self._dictionary = None
+        if codec == ZSTD and dictionary is not None:
+            self.dictionary_id = dictionary_id
+            self._dictionary = self._zstandard.ZstdCompressionDict(dictionary)
+            self._dictionary.precompute_compress(level=self.level)
+
+    @property
+    def enabled(self) -> bool:
+        return self.codec != NONE
+
+    def compress(self, text: str) -> bytes:
+        data = text.encode("utf-8")
+        if self.codec == ZLIB:
+            return _ZLIB_HEADER + zlib.compress(data, self.level)
+        if self._dictionary is not None:
+            compressor = self._zstandard.ZstdCompressor(level=self.level, dict_data=self._dictionary)
+            return _ZSTD_DICT_HEADER + struct.pack(">I", self.dictionary_id) + compressor.compress(data)
+        if self.codec == ZSTD:
+            return _ZSTD_HEADER + self._zstandard.ZstdCompressor(level=self.level).compress(data)
+        raise ValueError("Compression is disabled")
+
+
+def decompress_text(value: bytes, get_dictionary: Callable[[int], Optional[bytes]]) -> str:
+    """Decode a value written by TextCompressor.compress.
+
+    Args:
+        value: The stored bytes
+        get_dictionary: Returns the zstd dictionary with the given id
+
+    Returns:
+        str: The original text
+    """
+    value = bytes(value)
+    header, payload = value[:1], value[1:]
+    if header == _ZLIB_HEADER:
+        return zlib.decompress(payload).decode("utf-8")
+    zstandard = _import_zstandard()
+    if zstandard is None:
+        raise RuntimeError("Reading zstd-compressed news content requires zstandard: pip install zstandard")
+    if header == _ZSTD_HEADER:
+        return zstandard.ZstdDecompressor().decompress(payload).decode("utf-8")
+    if header == _ZSTD_DICT_HEADER:
+        dictionary_id = struct.unpack(">I", payload[:4])[0]
+        dictionary = get_dictionary(dictionary_id)
+        if dictionary is None:
+            raise ValueError(f"Missing compression dictionary {dictionary_id}")
+        decompressor = zstandard.ZstdDecompressor(dict_data=zstandard.ZstdCompressionDict(dictionary))
+        return decompressor.decompress(payload[4:]).decode("utf-8")
+    raise ValueError(f"Unknown compression header {header!r}")
+
+
+def train_dictionary(samples: List[str], size: int) -> bytes:
+    """Train a zstd dictionary on sample texts.
+
+    Raises:
+        RuntimeError: If zstandard is not installed
+    """
+    zstandard = _import_zstandard()
+    if zstandard is None:
+        raise RuntimeError("Training a compression dictionary requires zstandard: pip install zstandard")
+    return zstandard.train_dictionary(size, [sample.encode("utf-8") for sample in samples]).as_bytes()
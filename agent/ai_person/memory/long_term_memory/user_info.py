@@ -1,5 +1,6 @@
-from typing import Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 from .user_info_db import UserInfoDB
+from ...state_cache import agent_state_cache, MISSING
 import os
 import json
 
@@ -13,15 +14,42 @@ class UserInfo:
                 self.default_template = json.load(f)
         except Exception:
             self.default_template = {}
+        self._cache_namespace = f"user_info:{self.db.db_path}"
+
+    def _get_stored_record(self, agent_id: str) -> Tuple[Optional[Dict], int]:
+        """Return (stored user info or None, version), via the state cache."""
+        record = agent_state_cache.lookup(self._cache_namespace, agent_id)
+        if record is MISSING:
+            generation = agent_state_cache.generation(self._cache_namespace, agent_id)
+            record = self.db.get_user_info_record(agent_id)
+            if record is None:
+                # Read error; don't cache it
+                return None, 0
+            agent_state_cache.set(self._cache_namespace, agent_id, record, generation=generation)
+        return record
+
+    def _get_stored_user_info(self, agent_id: str) -> Optional[Dict]:
+        """Return the stored user info (None if the agent has none), via the state cache."""
+        return self._get_stored_record(agent_id)[0]
+
+    def _set_stored_user_info(self, agent_id: str, user_info: Dict) -> bool:
+        """Write user info to the DB and drop the cached copy, whose version is now stale."""
+        saved = self.db.set_user_info(agent_id, user_info)
+        agent_state_cache.invalidate(self._cache_namespace, agent_id)
+        return saved
 
     def get_user_info(self, agent_id: str) -> Dict:
         """Get all user information for a given agent_id as a dictionary"""
-        user_info = self.db.get_user_info(agent_id)
+        user_info = self._get_stored_user_info(agent_id)
         if user_info is None:
             # Return a copy of the default template
             return dict(self.default_template)
         return user_info
 
+    def get_user_info_version(self, agent_id: str) -> int:
+        """Version of the stored user info (0 if none), for update_user_info_fields' expected_version."""
+        return self._get_stored_record(agent_id)[1]
+
     def update_user_info(self, agent_id: str, field: str, value) -> bool:
         """Update a specific field of user information for a given agent_id
         Args:
@@ -31,9 +59,28 @@ class UserInfo:
         Returns:
             bool: True if update was successful, False otherwise
         """
-        user_info = self.db.get_user_info(agent_id) or dict(self.default_template)
-        user_info[field] = value
-        return self.db.set_user_info(agent_id, user_info)
+        return self.update_user_info_fields(agent_id, {field: value})
+
+    def update_user_info_fields(self, agent_id: str, fields: Dict[str, Any], expected_version: Optional[int] = None) -> bool:
+        """Update several fields of user information in one database round trip.
+
+        Args:
+            agent_id: The agent identifier
+            fields: Field names and their new values
+            expected_version: Version read before deciding on the update; the
+                update is skipped if the user info changed since then
+        Returns:
+            bool: True if the update was applied, False on a version conflict or error
+        """
+        if not fields:
+            return True
+        result = self.db.update_user_info_fields(agent_id, fields, defaults=self.default_template,
+                                                 expected_version=expected_version)
+        if result is None:
+            agent_state_cache.invalidate(self._cache_namespace, agent_id)
+            return False
+        agent_state_cache.set(self._cache_namespace, agent_id, result)
+        return True
 
     def get_user_info_text(self, agent_id: str) -> str:
         """Get user information for a given agent_id in a formatted text string"""
@@ -42,5 +89,5 @@ class UserInfo:
 
     def initialize_user_info(self, agent_id: str) -> None:
         """Initialize user info for a new agent_id using the default template if not present."""
-        if self.db.get_user_info(agent_id) is None:
-            self.db.set_user_info(agent_id, dict(self.default_template))
\ No newline at end of file
+        if self._get_stored_user_info(agent_id) is None:
+            self._set_stored_user_info(agent_id, dict(self.default_template))
\ No newline at end of file
@@ -1,33 +1,13 @@
-import sqlite3
 import os
 import json
-from typing import Dict, Optional
-from datetime import datetime
-import logging
+from typing import Any, Dict, Optional, Tuple
+from common.storage import connect, get_dialect
+from common.logging_setup import setup_logging
 
 # Setup logging for user info database
 def setup_user_info_db_logging():
     """Setup logging for the user info database module."""
-    log_dir = "logs"
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-
-    log_file = os.path.join(log_dir, f"user_info_db_{datetime.now().strftime('%Y%m%d')}.log")
-    logger = logging.getLogger("ai_person.memory.user_info_db")
-    logger.setLevel(logging.DEBUG)
-    for handler in logger.handlers[:]:
-        logger.removeHandler(handler)
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setLevel(logging.DEBUG)
-    file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(file_formatter)
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_formatter = logging.Formatter('%(levelname)s - %(message)s')
-    console_handler.setFormatter(console_formatter)
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    return logger
+    return setup_logging("ai_person.memory.user_info_db", "user_info_db")
 
 logger = setup_user_info_db_logging()
 
@@ -38,6 +18,7 @@ class UserInfoDB:
         current_dir = os.path.dirname(os.path.abspath(__file__))
         self.db_path = os.path.join(current_dir, db_path)
         logger.debug(f"SQLite database path: {self.db_path}")
+        self.dialect = get_dialect()
         self._create_tables()
         logger.info("UserInfoDB initialization complete")
 
@@ -45,15 +26,20 @@ class UserInfoDB:
         """Create the user_info table if it doesn't exist."""
         logger.debug("Creating user_info table if it doesn't exist")
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with connect(self.db_path) as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
+                cursor.execute(f'''
                     CREATE TABLE IF NOT EXISTS user_info (
                         agent_id TEXT PRIMARY KEY,
                         user_info TEXT,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                        updated_at {self.dialect.timestamp_column},
+                        version INTEGER NOT NULL DEFAULT 0
                     )
                 ''')
+                # Bumped on every write, for optimistic concurrency checks
+                if 'version' not in self.dialect.column_names(cursor, 'user_info'):
+                    logger.info("Adding column version to table user_info")
+                    cursor.execute("ALTER TABLE user_info ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
                 conn.commit()
                 logger.debug("user_info table created/verified successfully")
         except Exception as e:
@@ -64,7 +50,7 @@ class UserInfoDB:
         """Retrieve user info for a given agent_id as a dict."""
         logger.debug(f"Retrieving user info for agent_id: {agent_id}")
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT user_info FROM user_info WHERE agent_id = ?
@@ -85,23 +71,89 @@ class UserInfoDB:
             logger.error(f"Error retrieving user info: {str(e)}", exc_info=True)
             return None
 
+    def get_user_info_record(self, agent_id: str) -> Optional[Tuple[Optional[Dict], int]]:
+        """Retrieve (user info, version) for a given agent_id; (None, 0) if the agent has none, None on error."""
+        logger.debug(f"Retrieving user info record for agent_id: {agent_id}")
+        try:
+            with connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT user_info, version FROM user_info WHERE agent_id = ?
+                ''', (agent_id,))
+                row = cursor.fetchone()
+            if not row:
+                return None, 0
+            return (json.loads(row[0]) if row[0] else None), row[1]
+        except Exception as e:
+            logger.error(f"Error retrieving user info record: {str(e)}", exc_info=True)
+            return None
+
     def set_user_info(self, agent_id: str, user_info: Dict) -> bool:
         """Set or update user info for a given agent_id as a JSON string."""
         logger.info(f"Setting user info for agent_id: {agent_id}")
         try:
             user_info_json = json.dumps(user_info)
-            with sqlite3.connect(self.db_path) as conn:
+            with connect(self.db_path) as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO user_info (agent_id, user_info, updated_at)
-                    VALUES (?, ?, CURRENT_TIMESTAMP)
+                cursor.execute(f'''
+                    INSERT INTO user_info (agent_id, user_info, updated_at, version)
+                    VALUES (?, ?, {self.dialect.current_timestamp}, 1)
                     ON CONFLICT(agent_id) DO UPDATE SET
                         user_info=excluded.user_info,
-                        updated_at=CURRENT_TIMESTAMP
+                        updated_at=excluded.updated_at,
+                        version=user_info.version + 1
                 ''', (agent_id, user_info_json))
                 conn.commit()
                 logger.info(f"User info set/updated for agent_id: {agent_id}")
                 return True
         except Exception as e:
             logger.error(f"Error setting user info: {str(e)}", exc_info=True)
-            return False 
\ No newline at end of file
+            return False 
+
+    def update_user_info_fields(self, agent_id: str, fields: Dict[str, Any], defaults: Optional[Dict] = None,
+                                expected_version: Optional[int] = None) -> Optional[Tuple[Dict, int]]:
+        """Set several top-level fields of an agent's user info in one statement.
+
+        The fields are merged into the stored JSON by the database, so
+        concurrent updates of other fields are never lost.
+
+        Args:
+            agent_id: The agent identifier
+            fields: Field names and their new values
+            defaults: User info to start from if the agent has none stored yet
+            expected_version: Only apply the update if the stored version still
+                equals this one (0 when nothing is stored yet)
+
+        Returns:
+            Optional[Tuple[Dict, int]]: The merged user info and its new version,
+            or None on a version conflict or an error
+        """
+        logger.info(f"Updating {len(fields)} user info fields for agent_id: {agent_id}")
+        merged_expression, merge_params = self.dialect.json_set_fields("user_info.user_info", fields)
+        sql = f'''
+            INSERT INTO user_info (agent_id, user_info, updated_at, version)
+            VALUES (?, ?, {self.dialect.current_timestamp}, 1)
+            ON CONFLICT(agent_id) DO UPDATE SET
+                user_info={merged_expression},
+                updated_at=excluded.updated_at,
+                version=user_info.version + 1
+        '''
+        params = [agent_id, json.dumps({**(defaults or {}), **fields}), *merge_params]
+        if expected_version is not None:
+            sql += " WHERE user_info.version = ?"
+            params.append(expected_version)
+        sql += " RETURNING user_info, version"
+        try:
+            with connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(sql, params)
+                row = cursor.fetchone()
+                if row is None or (expected_version is not None and row[1] != expected_version + 1):
+                    # A fresh insert returns version 1 even when another version was expected
+                    conn.rollback()
+                    logger.warning(f"User info for agent_id {agent_id} changed since version {expected_version}, update skipped")
+                    return None
+            return json.loads(row[0]), row[1]
+        except Exception as e:
+            logger.error(f"Error updating user info fields: {str(e)}", exc_info=True)
+            return None
@@ -1,7 +1,23 @@
 from .long_term_memory import LongTermMemory
 from .short_term_memory import ShortTermMemory
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Set, Tuple
 from datetime import datetime
+import os
+from common.logging_setup import setup_logging
+from ..state_cache import agent_state_cache
+from ..prompt_budget import (
+    TRUNCATION_MARKER, apply_budget, count_tokens, compact_mapping, get_section_budget, is_truncated,
+    keep_newest_lines, merge_truncated_update, prompt_metrics
+)
+from .short_term_memory.dialogue_record import DialogueRecord, HUMAN, render_dialogue
+
+# Setup logging for memory
+def setup_memory_logging():
+    """Setup logging for the memory module."""
+    return setup_logging("ai_person.memory", "memory")
+
+# Initialize logger
+logger = setup_memory_logging()
 
 class Memory:
 
@@ -14,17 +30,66 @@ class Memory:
         return self.short_term_memory.get_current_conversation(agent_id)
     
     def get_current_conversation_prompt(self, agent_id: str) -> str:
-        conversation_text = self.short_term_memory.get_current_conversation(agent_id)
-        return f"""
+        """Conversation section of the prompt, keeping the newest turns that fit the conversation budget."""
+        lines = render_dialogue(self.short_term_memory.get_current_turns(agent_id))
+        conversation_text = "\n".join(keep_newest_lines(lines, get_section_budget("conversation")))
+        prompt_metrics.record("conversation", count_tokens("\n".join(lines)), count_tokens(conversation_text))
+        summary = self.short_term_memory.get_conversation_summary(agent_id)
+        summary_text = f"""
+        Summary of the earlier part of the conversation:
+        {apply_budget("conversation_summary", summary)}
+        """ if summary else ""
+        return f"""{summary_text}
         The following is the current converstation going on with timestamp, the person who said, and the dialouge.
         {conversation_text}
         """
     
-    def add_dialogue_to_current_converstaion(self, agent_id: str, dialogue: str) -> str:
+    def get_recalled_conversation_prompt(self, agent_id: str, top_k: Optional[int] = None) -> str:
+        """Past dialogue lines relevant to the latest human message, or an empty string if there are none."""
+        last_human = self.short_term_memory.get_latest_turn(agent_id, HUMAN)
+        if last_human is None or not last_human.text:
+            return ""
+        query = last_human.text
+        if top_k is None:
+            top_k = int(os.getenv("CONVERSATION_RECALL_TOP_K", "3"))
+        current_lines = set(render_dialogue(self.short_term_memory.get_current_turns(agent_id)))
+        recalled = self.long_term_memory.recall_dialogues(agent_id, query, top_k=top_k, exclude_dialogues=current_lines)
+        if not recalled:
+            return ""
+        recalled_text = "\n".join(keep_newest_lines(
+            [conversation['dialogue'] for conversation in recalled],
+            get_section_budget("recalled_conversation")
+        ))
+        return f"""
+        The following are earlier lines from your past conversations with the human that may be relevant now.
+        {recalled_text}
+        """
+
+    def add_dialogue(self, agent_id: str, role: str, text: str, source: Optional[str] = None) -> DialogueRecord:
+        """Record a dialogue turn in the current conversation and the long term history.
+
+        Args:
+            agent_id: The agent's unique identifier
+            role: HUMAN or AGENT
+            text: What was said
+            source: SOURCE_SYSTEM for text the application wrote on the speaker's
+                behalf; defaults from role
+
+        Returns:
+            DialogueRecord: The stored record
+        """
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        record = self.short_term_memory.add_to_conversation_buffer(
+            agent_id, DialogueRecord(role, text, timestamp=timestamp, source=source)
+        )
+        self.long_term_memory.save_dialogue(agent_id, record.render())
+        return record
+
+    def add_dialogue_to_current_converstaion(self, agent_id: str, dialogue: str) -> DialogueRecord:
+        """Record a dialogue line such as "Human: hello"; a "[System]" marker after the role sets the source."""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        dialogue_with_timestamp = f"[{timestamp}] {dialogue}"
-        self.short_term_memory.add_to_conversation_buffer(agent_id, dialogue_with_timestamp)
-        self.long_term_memory.save_dialogue(agent_id, dialogue_with_timestamp)
+        record = DialogueRecord.from_line(f"[{timestamp}] {dialogue}")
+        return self.add_dialogue(agent_id, record.role, record.text, source=record.source)
         
 
     def save_news_item(self, agent_id: str, news_item: Dict[str, Any]) -> Optional[str]:
@@ -33,38 +98,106 @@ class Memory:
     def get_news_item(self, agent_id: str, news_id: str) -> Optional[Dict[str, Any]]:
         return self.long_term_memory.get_news_item(agent_id, news_id)
     
-    def search_relevant_news(self, agent_id: str, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
-        return self.long_term_memory.search_relevant_news(agent_id, query, top_k=top_k)
+    def get_news_items(self, agent_id: str, news_ids: List[str], fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Retrieve several news items in one query, optionally only some columns."""
+        return self.long_term_memory.get_news_items(agent_id, news_ids, fields=fields)
+    
+    def search_relevant_news(self, agent_id: str, query: str, top_k: int = 3, since_days: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self.long_term_memory.search_relevant_news(agent_id, query, top_k=top_k, since_days=since_days)
     
     def check_link_exists(self, agent_id: str, link: str) -> Optional[str]:
         """Check if a news link exists in long term memory. Returns news_id if found, else None."""
         return self.long_term_memory.check_link_exists(agent_id, link=link)
     
+    def check_links_exist(self, agent_id: str, links: List[str]) -> Dict[str, str]:
+        """Check many news links at once. Returns a mapping of existing links to their news_id."""
+        return self.long_term_memory.check_links_exist(agent_id, links)
+
+    def get_processed_news_ids(self, agent_id: str, news_ids: List[str]) -> Set[str]:
+        """Return which of the given news_ids the agent has already processed."""
+        return self.long_term_memory.get_processed_news_ids(agent_id, news_ids)
+
+    def mark_news_processed(self, agent_id: str, news_ids: List[str]) -> bool:
+        return self.long_term_memory.mark_news_processed(agent_id, news_ids)
+
+    def find_near_duplicate_news(self, agent_id: str, news_item: Dict[str, Any]) -> Optional[str]:
+        """Return the news_id of a stored item covering the same story, else None."""
+        return self.long_term_memory.find_near_duplicate_news(agent_id, news_item)
+
+    def save_alternate_links(self, agent_id: str, news_id: str, alternates: List[Dict[str, Any]]) -> bool:
+        return self.long_term_memory.save_alternate_links(agent_id, news_id, alternates)
+
+    def get_alternate_links(self, agent_id: str, news_id: str) -> List[Dict[str, Any]]:
+        return self.long_term_memory.get_alternate_links(agent_id, news_id)
+    
     def update_user_info(self, agent_id: str, field, value):
         return self.long_term_memory.update_user_information(agent_id, field=field, value=value)
+
+    def update_user_info_fields(self, agent_id: str, fields: Dict[str, Any], expected_version: Optional[int] = None) -> bool:
+        """Apply several user info changes in one write; skipped if the user info changed since expected_version."""
+        return self.long_term_memory.update_user_information_fields(agent_id, fields, expected_version=expected_version)
+
+    def get_user_info_version(self, agent_id: str) -> int:
+        return self.long_term_memory.get_user_information_version(agent_id)
     
+    def get_user_details_view(self, agent_id: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Return (stored user info, user info as shown in the prompt, long values truncated)."""
+        user_info = self.long_term_memory.user_info.get_user_info(agent_id)
+        return user_info, compact_mapping(user_info, get_section_budget("user_details"))
+
+    def update_user_details_from_prompt(self, agent_id: str, fields: Dict[str, Any], expected_version: Optional[int] = None) -> bool:
+        """Apply the LLM's user details changes, made from the user details section of the prompt.
+
+        A value the prompt showed truncated is never replaced by the LLM's
+        value, since that was written without seeing the full text; the new
+        text is appended to the stored value instead (see merge_truncated_update).
+        """
+        stored, shown = self.get_user_details_view(agent_id)
+        merged_fields = {}
+        for key, value in fields.items():
+            if not is_truncated(shown.get(key)):
+                merged_fields[key] = value
+            elif isinstance(stored.get(key), str) and isinstance(value, str):
+                merged = merge_truncated_update(stored[key], shown[key], value)
+                if merged is not None:
+                    merged_fields[key] = merged
+            else:
+                logger.warning(f"Skipped update of truncated user detail '{key}' for agent_id '{agent_id}'")
+        return self.update_user_info_fields(agent_id, merged_fields, expected_version=expected_version)
+
     def get_information_about_the_human_prompt(self, agent_id: str) -> str:
-        user_info_text = self.long_term_memory.get_user_information_text(agent_id)
+        """User details section of the prompt, with long values shortened to fit the user details budget."""
+        user_info, shown = self.get_user_details_view(agent_id)
+        user_info_text = str(shown)
+        prompt_metrics.record("user_details", count_tokens(str(user_info)), count_tokens(user_info_text))
+        truncated_keys = [key for key, value in shown.items() if is_truncated(value)]
+        truncated_text = f"""
+        The values of {", ".join(truncated_keys)} are too long to show in full and end with "{TRUNCATION_MARKER.strip()}".
+        To update one of them, give only the text to add to it; it is appended to the full value.
+        """ if truncated_keys else ""
         return f"""
         The following are the details that you know about the human based on past interactions. 
         {user_info_text}
-        """
+        {truncated_text}"""
 
     def initialize_memory(self, agent_id: str) -> None:
         """Initialize memory for a new agent_id."""
         self.short_term_memory.initialize_short_term_memory(agent_id)
         self.long_term_memory.user_info.initialize_user_info(agent_id)
 
+    def invalidate_cached_state(self, agent_id: str) -> None:
+        """Drop the agent's cached conversation, personality and user info so the next read hits the DB."""
+        agent_state_cache.invalidate_agent(agent_id)
+
+    def get_state_cache_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters of the process-wide agent state cache."""
+        return agent_state_cache.stats()
+
+    def get_last_human_turn(self, agent_id: str) -> Optional[DialogueRecord]:
+        """Returns the most recent human record from the current conversation, or None."""
+        return self.short_term_memory.get_latest_turn(agent_id, HUMAN)
+
     def get_last_human_dialogue(self, agent_id: str) -> Optional[str]:
-        """Returns the most recent dialogue line that starts with 'Human:' from the current conversation."""
-        conversation_text = self.get_current_conversation(agent_id)
-        lines = conversation_text.strip().split('\n')
-        for line in reversed(lines):
-            # Check if the line contains 'Human:' after the timestamp
-            if 'Human:' in line:
-                # Optionally, you can check for the pattern after the timestamp
-                # e.g., [timestamp] Human: ...
-                after_bracket = line.split(']', 1)[-1] if ']' in line else line
-                if after_bracket.strip().startswith('Human:'):
-                    return line.strip()
-        return None
+        """Returns the most recent human dialogue line from the current conversation."""
+        record = self.get_last_human_turn(agent_id)
+        return record.render().strip() if record else None
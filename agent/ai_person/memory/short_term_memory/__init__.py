@@ -1,3 +1,4 @@
 from .short_term_memory import ShortTermMemory
+from .dialogue_record import DialogueRecord, HUMAN, AGENT, SOURCE_HUMAN, SOURCE_AGENT, SOURCE_SYSTEM
 
-__all__ = ['ShortTermMemory']
\ No newline at end of file
+__all__ = ['ShortTermMemory', 'DialogueRecord', 'HUMAN', 'AGENT', 'SOURCE_HUMAN', 'SOURCE_AGENT', 'SOURCE_SYSTEM']
@@ -0,0 +1,142 @@
+from typing import Callable, Dict, List, Optional
+import os
+import queue
+import threading
+from common.logging_setup import setup_logging
+from .short_term_memory_db import ShortTermMemoryDB
+from .dialogue_record import DialogueRecord, render_dialogue
+from ...state_cache import agent_state_cache
+
+# Setup logging for the conversation summarizer
+def setup_summarizer_logging():
+    """Setup logging for the conversation summarizer module."""
+    return setup_logging("ai_person.memory.conversation_summarizer", "conversation_summarizer")
+
+# Initialize logger
+logger = setup_summarizer_logging()
+
+
+def summary_cache_namespace(db_path: str) -> str:
+    return f"conversation_summary:{db_path}"
+
+
+def _default_llm(prompt: str) -> Optional[str]:
+    # Imported on use so the memory package does not pull in every LLM SDK
+    from ...llm_service import get_response_from_llm
+    return get_response_from_llm(prompt=prompt)
+
+
+class ConversationSummarizer:
+    """Folds turns that fell out of the short-term window into a running per-agent summary.
+
+    Evicted turns are persisted in the evicted_turns table by ShortTermMemoryDB,
+    so nothing is lost if the process stops before they are summarized. submit()
+    only queues the agent_id; a single daemon thread does the LLM call, off the
+    request path, once enough turns have accumulated.
+    """
+
+    def __init__(self, db: ShortTermMemoryDB, batch_turns: int = 4, max_words: int = 150,
+                 llm: Optional[Callable[[str], Optional[str]]] = None):
+        """Create the summarizer.
+
+        Args:
+            db: Short-term memory database holding evicted turns and summaries
+            batch_turns: Evicted turns to accumulate before calling the LLM
+            max_words: Target length of the summary
+            llm: Callable taking a prompt and returning the response text
+        """
+        self.db = db
+        self.batch_turns = batch_turns
+        self.max_words = max_words
+        self.llm = llm or _default_llm
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._queued: set = set()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+
+    def submit(self, agent_id: str) -> None:
+        """Schedule the agent's evicted turns for summarization; returns immediately."""
+        with self._lock:
+            if agent_id in self._queued:
+                return
+            self._queued.add(agent_id)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="conversation-summarizer", daemon=True)
+                self._worker.start()
+        self._queue.put(agent_id)
+
+    def _run(self) -> None:
+        while True:
+            agent_id = self._queue.get()
+            with self._lock:
+                self._queued.discard(agent_id)
+            try:
+                self.summarize(agent_id)
+            except Exception as e:
+                logger.error(f"Error summarizing conversation for agent_id {agent_id}: {str(e)}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    def summarize(self, agent_id: str, force: bool = False) -> Optional[str]:
+        """Fold the agent's evicted turns into its summary.
+
+        Args:
+            agent_id: The agent's unique identifier
+            force: Summarize even if fewer than batch_turns turns are waiting
+
+        Returns:
+            Optional[str]: The new summary, or None if nothing was summarized
+        """
+        turns = self.db.get_evicted_turns(agent_id)
+        if not turns or (len(turns) < self.batch_turns and not force):
+            return None
+        previous = self.db.get_summary(agent_id)
+        previous_summary = previous[0] if previous else ""
+        logger.info(f"Summarizing {len(turns)} evicted turns for agent_id {agent_id}")
+        summary = self.llm(self._build_prompt(previous_summary, turns))
+        if not summary or not isinstance(summary, str):
+            logger.error(f"Invalid summary from LLM for agent_id {agent_id}: {summary}")
+            return None
+        summary = summary.strip()
+        self.db.save_summary(agent_id, summary, turns[-1].seq)
+        agent_state_cache.set(summary_cache_namespace(self.db.db_path), agent_id, summary)
+        logger.debug(f"Updated conversation summary for agent_id {agent_id}: {summary}")
+        return summary
+
+    def _build_prompt(self, previous_summary: str, turns: List[DialogueRecord]) -> str:
+        turns_text = "\n".join(render_dialogue(turns))
+        return f"""
+        You maintain a running summary of a conversation between a human and you, an AI assistant.
+        Lines starting with "You:" are yours, lines starting with "Human:" are the human's.
+
+        Current summary:
+        {previous_summary or "(empty)"}
+
+        Older conversation lines to fold into the summary:
+        {turns_text}
+
+        Write the updated summary in at most {self.max_words} words.
+        Keep what the human asked for, their preferences, the news items already discussed, and any open requests.
+        Drop greetings and small talk.
+        The response should only be the summary text. Include nothing else.
+        """
+
+    def wait_until_idle(self) -> None:
+        """Block until every submitted agent has been processed."""
+        self._queue.join()
+
+
+_summarizers: Dict[str, ConversationSummarizer] = {}
+_summarizers_lock = threading.Lock()
+
+
+def get_conversation_summarizer(db: ShortTermMemoryDB) -> ConversationSummarizer:
+    """Return the process-wide summarizer for a database, so each Memory instance shares one worker."""
+    with _summarizers_lock:
+        if db.db_path not in _summarizers:
+            _summarizers[db.db_path] = ConversationSummarizer(
+                db,
+                batch_turns=int(os.getenv("CONVERSATION_SUMMARY_BATCH_TURNS", "4")),
+                max_words=int(os.getenv("CONVERSATION_SUMMARY_MAX_WORDS", "150"))
+            )
+        return _summarizers[db.db_path]
@@ -0,0 +1,160 @@
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Who said a line
+HUMAN = "Human"
+AGENT = "You"
+
+# Where a line came from: typed by the human, written by the agent, or
+# injected by the application (rendered with a "[System]" marker)
+SOURCE_HUMAN = "human"
+SOURCE_AGENT = "agent"
+SOURCE_SYSTEM = "system"
+
+SYSTEM_MARKER = "[System]"
+
+# Dialogue lines look like "[2024-01-01 12:00:00] Human: hello"
+_DIALOGUE_LINE = re.compile(r"^\[(?P<timestamp>[^\]]*)\] (?:(?P<role>Human|You): )?(?P<text>.*)$", re.DOTALL)
+
+
+def default_source(role: str) -> str:
+    """The source of a line from role when it carries no system marker."""
+    if role == HUMAN:
+        return SOURCE_HUMAN
+    if role == AGENT:
+        return SOURCE_AGENT
+    return ""
+
+
+def split_source(role: str, text: str) -> Tuple[str, str]:
+    """Split a leading "[System]" marker off text.
+
+    Returns:
+        Tuple[str, str]: (source, text without the marker)
+    """
+    if text.startswith(SYSTEM_MARKER):
+        return SOURCE_SYSTEM, text[len(SYSTEM_MARKER):].lstrip()
+    return default_source(role), text
+
+
+def parse_dialogue_line(line: str) -> Tuple[str, str, str]:
+    """Split a dialogue line into (timestamp, role, text). Unknown parts are empty strings."""
+    match = _DIALOGUE_LINE.match(line)
+    if not match:
+        return '', '', line
+    return match.group('timestamp'), match.group('role') or '', match.group('text')
+
+
+def format_dialogue_line(timestamp: str, role: str, text: str) -> str:
+    """Inverse of parse_dialogue_line."""
+    if not timestamp and not role:
+        return text
+    return f"[{timestamp}] {role}: {text}" if role else f"[{timestamp}] {text}"
+
+
+class DialogueRecord:
+    """One turn of a conversation.
+
+    Records are never modified after creation, so copying one (as the state
+    cache does on every read) returns the record itself. The text is only
+    rendered into a "[timestamp] Role: text" line when a prompt is built.
+    """
+
+    __slots__ = ('seq', 'role', 'source', 'timestamp', 'text')
+
+    def __init__(self, role: str, text: str, timestamp: str = '', source: Optional[str] = None, seq: int = 0):
+        """Create a record.
+
+        Args:
+            role: HUMAN, AGENT, or '' for lines without a speaker
+            text: What was said, without the system marker
+            timestamp: 'YYYY-MM-DD HH:MM:SS' local time
+            source: SOURCE_HUMAN, SOURCE_AGENT or SOURCE_SYSTEM; defaults from role
+            seq: Position in the agent's conversation, assigned when stored
+        """
+        self.seq = seq
+        self.role = role
+        self.source = default_source(role) if source is None else source
+        self.timestamp = timestamp
+        self.text = text
+
+    @classmethod
+    def from_line(cls, line: str) -> "DialogueRecord":
+        """Parse a rendered dialogue line, including its system marker."""
+        timestamp, role, text = parse_dialogue_line(line)
+        source, text = split_source(role, text)
+        return cls(role, text, timestamp=timestamp, source=source)
+
+    @property
+    def is_system(self) -> bool:
+        """True if the application, not the speaker, wrote the line."""
+        return self.source == SOURCE_SYSTEM
+
+    def with_seq(self, seq: int) -> "DialogueRecord":
+        return DialogueRecord(self.role, self.text, timestamp=self.timestamp, source=self.source, seq=seq)
+
+    def render(self) -> str:
+        """The record as a prompt line, e.g. "[2024-01-01 12:00:00] Human: [System] hello"."""
+        text = f"{SYSTEM_MARKER} {self.text}" if self.is_system else self.text
+        return format_dialogue_line(self.timestamp, self.role, text)
+
+    def __copy__(self) -> "DialogueRecord":
+        return self
+
+    def __deepcopy__(self, memo: Dict) -> "DialogueRecord":
+        return self
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, DialogueRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"DialogueRecord(seq={self.seq}, role={self.role!r}, source={self.source!r}, timestamp={self.timestamp!r}, text={self.text!r})"
+
+
+def render_dialogue(records: Iterable[DialogueRecord]) -> List[str]:
+    """Render records as prompt lines."""
+    return [record.render() for record in records]
+
+
+class DialogueWindow:
+    """The newest maxlen records of a conversation, with the latest record of each role.
+
+    Kept in the state cache so the latest human turn is a dict lookup instead
+    of a scan of the conversation.
+    """
+
+    __slots__ = ('records', 'maxlen', '_latest')
+
+    def __init__(self, records: List[DialogueRecord], maxlen: int):
+        self.records = list(records[-maxlen:]) if maxlen > 0 else []
+        self.maxlen = maxlen
+        self._latest: Dict[str, DialogueRecord] = {}
+        for record in self.records:
+            self._latest[record.role] = record
+
+    def append(self, record: DialogueRecord) -> None:
+        """Add the newest record, dropping the oldest ones beyond maxlen."""
+        self.records.append(record)
+        self._latest[record.role] = record
+        overflow = len(self.records) - self.maxlen
+        if overflow > 0:
+            for old in self.records[:overflow]:
+                # Trimmed records are the oldest, so one can only be the latest
+                # of its role if no newer record of that role is left
+                if self._latest.get(old.role) is old:
+                    del self._latest[old.role]
+            del self.records[:overflow]
+
+    def latest(self, role: str) -> Optional[DialogueRecord]:
+        """The newest record said by role, or None."""
+        return self._latest.get(role)
+
+    def __deepcopy__(self, memo: Dict) -> "DialogueWindow":
+        # Records are immutable; only the containers need copying
+        window = DialogueWindow.__new__(DialogueWindow)
+        window.records = list(self.records)
+        window.maxlen = self.maxlen
+        window._latest = dict(self._latest)
+        return window
@@ -1,51 +1,87 @@
-from collections import deque
-from typing import Optional
+from typing import List, Optional
+import os
 from .short_term_memory_db import ShortTermMemoryDB
+from .dialogue_record import DialogueRecord, DialogueWindow, render_dialogue
+from .conversation_summarizer import get_conversation_summarizer, summary_cache_namespace
+from ...state_cache import agent_state_cache, MISSING
 
 class ShortTermMemory:
-    def __init__(self, maxlen: int = 20, db_path: Optional[str] = None):
+    def __init__(self, maxlen: Optional[int] = None, db_path: Optional[str] = None, summarize: Optional[bool] = None):
         """
         Initialize the short term memory with agent_id-based segmentation using SQLite.
         Args:
-            maxlen: Maximum length of the conversation buffer (default 20).
+            maxlen: Maximum length of the conversation buffer (default SHORT_TERM_MEMORY_MAXLEN, then 20).
             db_path: Optional path to the SQLite DB file.
+            summarize: Fold turns that drop out of the buffer into a running summary
+                       (default CONVERSATION_SUMMARY_ENABLED, then true).
         """
+        if maxlen is None:
+            maxlen = int(os.getenv("SHORT_TERM_MEMORY_MAXLEN", "20"))
+        if summarize is None:
+            summarize = os.getenv("CONVERSATION_SUMMARY_ENABLED", "true").lower() == "true"
         self.maxlen = maxlen
         self.db = ShortTermMemoryDB(db_path)
+        self._cache_namespace = f"short_term_memory:{self.db.db_path}"
+        self._summary_cache_namespace = summary_cache_namespace(self.db.db_path)
+        self.summarizer = get_conversation_summarizer(self.db) if summarize else None
 
-    def _load_conversation_buffer(self, agent_id: str) -> deque:
-        """Load the conversation buffer for the given agent_id from the DB."""
-        buffer = self.db.get_buffer(agent_id)
-        return deque(buffer, maxlen=self.maxlen)
-
-    def _save_conversation_buffer(self, agent_id: str, buffer: deque) -> None:
-        """Save the conversation buffer for the given agent_id to the DB."""
-        self.db.set_buffer(agent_id, list(buffer))
-
-    def add_to_conversation_buffer(self, agent_id: str, dialogue_with_timestamp: str) -> None:
+    def add_to_conversation_buffer(self, agent_id: str, record: DialogueRecord) -> DialogueRecord:
         """
-        Add a dialogue to the conversation buffer for the given agent_id and persist it.
+        Add a dialogue record to the conversation buffer for the given agent_id and persist it.
         If the buffer is full, the oldest dialogue will be automatically removed.
         Args:
             agent_id: The agent's unique identifier.
-            dialogue_with_timestamp: The dialogue to add to the buffer.
+            record: The dialogue record to add to the buffer.
+        Returns:
+            The stored record, with its seq.
         """
-        buffer = self._load_conversation_buffer(agent_id)
-        buffer.append(dialogue_with_timestamp)
-        self._save_conversation_buffer(agent_id, buffer)
+        stored, evicted = self.db.append_turn(agent_id, record, self.maxlen, keep_evicted=self.summarizer is not None)
+        if evicted and self.summarizer is not None:
+            self.summarizer.submit(agent_id)
+        # Dropped rather than appended to: a cache miss loading the window
+        # at the same time may or may not have read the new turn
+        agent_state_cache.invalidate(self._cache_namespace, agent_id)
+        return stored
 
     def get_current_conversation(self, agent_id: str) -> str:
         """
         Returns the current conversation for the given agent_id as a single string,
         with each dialogue on a new line.
-        Always loads the latest state from the DB to ensure consistency.
+        Served from the process-wide state cache, which every write in this
+        process invalidates, and loaded from the DB on a miss.
         Args:
             agent_id: The agent's unique identifier.
         """
-        buffer = self._load_conversation_buffer(agent_id)
-        return "\n".join(buffer)
+        return "\n".join(render_dialogue(self.get_current_turns(agent_id)))
+
+    def _get_window(self, agent_id: str) -> DialogueWindow:
+        window = agent_state_cache.lookup(self._cache_namespace, agent_id)
+        if window is MISSING:
+            generation = agent_state_cache.generation(self._cache_namespace, agent_id)
+            window = DialogueWindow(self.db.get_turns(agent_id, self.maxlen), self.maxlen)
+            agent_state_cache.set(self._cache_namespace, agent_id, window, generation=generation)
+        return window
+
+    def get_current_turns(self, agent_id: str) -> List[DialogueRecord]:
+        """Returns the current conversation for the given agent_id as dialogue records, oldest first."""
+        return self._get_window(agent_id).records
+
+    def get_latest_turn(self, agent_id: str, role: str) -> Optional[DialogueRecord]:
+        """Returns the newest record said by role in the current conversation, or None."""
+        return self._get_window(agent_id).latest(role)
+
+    def get_conversation_summary(self, agent_id: str) -> str:
+        """Returns the running summary of the turns that dropped out of the buffer, or an empty string."""
+        summary = agent_state_cache.lookup(self._summary_cache_namespace, agent_id)
+        if summary is MISSING:
+            generation = agent_state_cache.generation(self._summary_cache_namespace, agent_id)
+            stored = self.db.get_summary(agent_id)
+            summary = stored[0] if stored else ""
+            agent_state_cache.set(self._summary_cache_namespace, agent_id, summary, generation=generation)
+        return summary
 
     def initialize_short_term_memory(self, agent_id: str) -> None:
-        """Initialize the short term memory buffer for a new agent_id (empty buffer)."""
-        if not self.db.get_buffer(agent_id):
-            self.db.set_buffer(agent_id, [])
\ No newline at end of file
+        """Initialize the short term memory buffer for a new agent_id.
+
+        Turns are stored one row each, so an empty buffer needs no row.
+        """
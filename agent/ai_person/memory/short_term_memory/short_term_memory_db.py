@@ -1,7 +1,19 @@
-import sqlite3
 import json
 import os
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from common.storage import connect, get_dialect
+from .dialogue_record import (
+    DialogueRecord, render_dialogue, HUMAN, AGENT,
+    SOURCE_AGENT, SOURCE_HUMAN, SOURCE_SYSTEM, SYSTEM_MARKER,
+)
+
+_TURN_COLUMNS = "seq, role, source, timestamp, text"
+
+
+def _record(row) -> DialogueRecord:
+    seq, role, source, timestamp, text = row
+    return DialogueRecord(role, text, timestamp=timestamp, source=source, seq=seq)
+
 
 class ShortTermMemoryDB:
     def __init__(self, db_path: Optional[str] = None):
@@ -9,42 +21,211 @@ class ShortTermMemoryDB:
             current_dir = os.path.dirname(os.path.abspath(__file__))
             db_path = os.path.join(current_dir, "short_term_memory.db")
         self.db_path = db_path
+        self.dialect = get_dialect()
         self._init_db()
 
     def _init_db(self):
-        with sqlite3.connect(self.db_path) as conn:
+        with connect(self.db_path) as conn:
             cursor = conn.cursor()
+            # One row per dialogue turn so an append is a single-row insert
+            # instead of rewriting the agent's whole JSON buffer
             cursor.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS conversation_turns (
+                    agent_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    role TEXT NOT NULL,
+                    source TEXT NOT NULL DEFAULT '',
+                    timestamp TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    PRIMARY KEY (agent_id, seq)
+                ){self.dialect.table_suffix}
                 """
-                CREATE TABLE IF NOT EXISTS conversation_buffers (
+            )
+            # Turns trimmed from the window, kept until the summarizer folds them
+            # into the running summary
+            cursor.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS evicted_turns (
+                    agent_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    role TEXT NOT NULL,
+                    source TEXT NOT NULL DEFAULT '',
+                    timestamp TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    PRIMARY KEY (agent_id, seq)
+                ){self.dialect.table_suffix}
+                """
+            )
+            cursor.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS conversation_summaries (
                     agent_id TEXT PRIMARY KEY,
-                    buffer_json TEXT
+                    summary TEXT NOT NULL,
+                    through_seq INTEGER NOT NULL,
+                    updated_at {self.dialect.timestamp_column}
                 )
                 """
             )
+            for table in ('conversation_turns', 'evicted_turns'):
+                self._ensure_source_column(cursor, table)
+            self._migrate_conversation_buffers(cursor, self.dialect)
             conn.commit()
 
-    def get_buffer(self, agent_id: str) -> List[str]:
-        with sqlite3.connect(self.db_path) as conn:
+    def _ensure_source_column(self, cursor, table: str) -> None:
+        """Add the source column to a table created before it existed, moving "[System]" markers out of the text."""
+        if 'source' in self.dialect.column_names(cursor, table):
+            return
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN source TEXT NOT NULL DEFAULT ''")
+        cursor.execute(
+            f"""
+            UPDATE {table} SET source = ?, text = TRIM(SUBSTR(text, ?))
+            WHERE SUBSTR(text, 1, ?) = ?
+            """,
+            (SOURCE_SYSTEM, len(SYSTEM_MARKER) + 1, len(SYSTEM_MARKER), SYSTEM_MARKER)
+        )
+        cursor.execute(
+            f"""
+            UPDATE {table} SET source = CASE role WHEN ? THEN ? WHEN ? THEN ? ELSE '' END
+            WHERE source = ''
+            """,
+            (HUMAN, SOURCE_HUMAN, AGENT, SOURCE_AGENT)
+        )
+
+    @staticmethod
+    def _migrate_conversation_buffers(cursor, dialect):
+        """Move buffers from the old one-JSON-row-per-agent table into conversation_turns."""
+        if not dialect.table_exists(cursor, 'conversation_buffers'):
+            return
+        cursor.execute("SELECT agent_id, buffer_json FROM conversation_buffers")
+        for agent_id, buffer_json in cursor.fetchall():
+            try:
+                buffer = json.loads(buffer_json) if buffer_json else []
+            except json.JSONDecodeError:
+                buffer = []
+            records = [DialogueRecord.from_line(line) for line in buffer]
+            cursor.executemany(
+                "INSERT INTO conversation_turns (agent_id, seq, role, source, timestamp, text) VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT DO NOTHING",
+                [
+                    (agent_id, seq, record.role, record.source, record.timestamp, record.text)
+                    for seq, record in enumerate(records, 1)
+                ]
+            )
+        cursor.execute("DROP TABLE conversation_buffers")
+
+    def append_turn(self, agent_id: str, record: DialogueRecord, maxlen: int,
+                    keep_evicted: bool = False) -> Tuple[DialogueRecord, List[DialogueRecord]]:
+        """Append one dialogue record and trim the agent's turns to the newest maxlen.
+
+        Args:
+            agent_id: The agent's unique identifier
+            record: Dialogue record to append; its seq is ignored
+            maxlen: Number of turns kept in the window
+            keep_evicted: Move trimmed turns to evicted_turns instead of deleting them
+
+        Returns:
+            Tuple[DialogueRecord, List[DialogueRecord]]: The stored record with its
+            seq, and the turns that were trimmed, oldest first
+        """
+        with connect(self.db_path) as conn:
             cursor = conn.cursor()
+            # Two processes appending for the same agent must not pick the same seq
+            self.dialect.lock(cursor, f"conversation_turns:{agent_id}")
             cursor.execute(
-                "SELECT buffer_json FROM conversation_buffers WHERE agent_id = ?",
+                """
+                INSERT INTO conversation_turns (agent_id, seq, role, source, timestamp, text)
+                SELECT ?, COALESCE(MAX(seq), 0) + 1, ?, ?, ?, ?
+                FROM conversation_turns WHERE agent_id = ?
+                RETURNING seq
+                """,
+                (agent_id, record.role, record.source, record.timestamp, record.text, agent_id)
+            )
+            seq = cursor.fetchone()[0]
+            cutoff = seq - maxlen
+            evicted = []
+            if cutoff > 0:
+                cursor.execute(
+                    f"""
+                    SELECT {_TURN_COLUMNS} FROM conversation_turns
+                    WHERE agent_id = ? AND seq <= ? ORDER BY seq
+                    """,
+                    (agent_id, cutoff)
+                )
+                evicted = [_record(row) for row in cursor.fetchall()]
+                if evicted:
+                    if keep_evicted:
+                        cursor.execute(
+                            f"""
+                            INSERT INTO evicted_turns (agent_id, {_TURN_COLUMNS})
+                            SELECT agent_id, {_TURN_COLUMNS} FROM conversation_turns
+                            WHERE agent_id = ? AND seq <= ?
+                            ON CONFLICT DO NOTHING
+                            """,
+                            (agent_id, cutoff)
+                        )
+                    cursor.execute(
+                        "DELETE FROM conversation_turns WHERE agent_id = ? AND seq <= ?",
+                        (agent_id, cutoff)
+                    )
+            conn.commit()
+            return record.with_seq(seq), evicted
+
+    def get_turns(self, agent_id: str, limit: int) -> List[DialogueRecord]:
+        """Return the newest `limit` turns for the agent, oldest first."""
+        with connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                SELECT {_TURN_COLUMNS} FROM conversation_turns
+                WHERE agent_id = ? ORDER BY seq DESC LIMIT ?
+                """,
+                (agent_id, limit)
+            )
+            rows = cursor.fetchall()
+        return [_record(row) for row in reversed(rows)]
+
+    def get_buffer(self, agent_id: str, limit: int) -> List[str]:
+        """Return the newest `limit` turns for the agent as dialogue lines, oldest first."""
+        return render_dialogue(self.get_turns(agent_id, limit))
+
+    def get_evicted_turns(self, agent_id: str) -> List[DialogueRecord]:
+        """Return the turns waiting to be folded into the agent's summary, oldest first."""
+        with connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT {_TURN_COLUMNS} FROM evicted_turns WHERE agent_id = ? ORDER BY seq",
+                (agent_id,)
+            )
+            return [_record(row) for row in cursor.fetchall()]
+
+    def get_summary(self, agent_id: str) -> Optional[Tuple[str, int]]:
+        """Return (summary, through_seq) for the agent, or None if nothing was summarized yet."""
+        with connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT summary, through_seq FROM conversation_summaries WHERE agent_id = ?",
                 (agent_id,)
             )
             row = cursor.fetchone()
-            if row and row[0]:
-                try:
-                    return json.loads(row[0])
-                except json.JSONDecodeError:
-                    return []
-            return []
-
-    def set_buffer(self, agent_id: str, buffer: List[str]):
-        buffer_json = json.dumps(buffer)
-        with sqlite3.connect(self.db_path) as conn:
+            return (row[0], row[1]) if row else None
+
+    def save_summary(self, agent_id: str, summary: str, through_seq: int) -> None:
+        """Store the agent's summary and drop the evicted turns it now covers, in one transaction."""
+        with connect(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute(
-                "REPLACE INTO conversation_buffers (agent_id, buffer_json) VALUES (?, ?)",
-                (agent_id, buffer_json)
+                f"""
+                INSERT INTO conversation_summaries (agent_id, summary, through_seq, updated_at)
+                VALUES (?, ?, ?, {self.dialect.current_timestamp})
+                ON CONFLICT(agent_id) DO UPDATE SET
+                    summary=excluded.summary,
+                    through_seq=excluded.through_seq,
+                    updated_at=excluded.updated_at
+                """,
+                (agent_id, summary, through_seq)
+            )
+            cursor.execute(
+                "DELETE FROM evicted_turns WHERE agent_id = ? AND seq <= ?",
+                (agent_id, through_seq)
             )
-            conn.commit() 
\ No newline at end of file
+            conn.commit()
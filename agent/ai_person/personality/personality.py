@@ -1,9 +1,11 @@
 import json
 import os
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from pathlib import Path
-import sqlite3
+from common.storage import connect, get_dialect
+from ..state_cache import agent_state_cache, MISSING
+from ..prompt_budget import TRUNCATION_MARKER, apply_budget, is_truncated, merge_truncated_update
 
 # Configure logging
 logging.basicConfig(
@@ -20,67 +22,125 @@ class Personality:
         if db_path is None:
             db_path = str(Path(os.path.dirname(__file__)) / "personality.db")
         self._db_path = db_path
+        self._dialect = get_dialect()
+        self._cache_namespace = f"personality:{db_path}"
         self._ensure_db()
 
     def _ensure_db(self) -> None:
         """Ensure the SQLite database and table exist."""
         try:
-            with sqlite3.connect(self._db_path) as conn:
+            with connect(self._db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS personalities (
                         agent_id TEXT PRIMARY KEY,
-                        personality_data TEXT NOT NULL
+                        personality_data TEXT NOT NULL,
+                        version INTEGER NOT NULL DEFAULT 0
                     )
                 ''')
+                # Bumped on every write, for optimistic concurrency checks
+                if 'version' not in self._dialect.column_names(cursor, 'personalities'):
+                    logger.info("Adding column version to table personalities")
+                    cursor.execute("ALTER TABLE personalities ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
                 conn.commit()
         except Exception as e:
             logger.error(f"Error ensuring database: {e}", exc_info=True)
             raise
 
-    def _load_personality_data(self, agent_id: str) -> Dict[str, Any]:
-        """Load personality data for a given agent_id from the database."""
+    def _load_personality_record(self, agent_id: str) -> Tuple[Dict[str, Any], int]:
+        """Load (personality data, version) for a given agent_id, from the state cache or the database."""
+        cached = agent_state_cache.lookup(self._cache_namespace, agent_id)
+        if cached is not MISSING:
+            return cached
+        generation = agent_state_cache.generation(self._cache_namespace, agent_id)
         try:
-            with sqlite3.connect(self._db_path) as conn:
+            with connect(self._db_path) as conn:
                 cursor = conn.cursor()
-                cursor.execute("SELECT personality_data FROM personalities WHERE agent_id = ?", (agent_id,))
+                cursor.execute("SELECT personality_data, version FROM personalities WHERE agent_id = ?", (agent_id,))
                 row = cursor.fetchone()
                 if row is None:
                     logger.warning(f"No personality found for agent_id '{agent_id}', creating empty data")
                     data = {"conversational_behavior": ""}
                     self._save_personality_data(agent_id, data)
-                    return data
+                    return data, 1
                 loaded_data = json.loads(row[0])
                 if not isinstance(loaded_data, dict):
                     raise ValueError("Loaded personality data is not a dictionary")
                 logger.info(f"Successfully loaded personality data for agent_id '{agent_id}'")
-                return loaded_data
+                agent_state_cache.set(self._cache_namespace, agent_id, (loaded_data, row[1]), generation=generation)
+                return loaded_data, row[1]
         except json.JSONDecodeError as e:
             logger.error(f"Invalid JSON format in personality data for agent_id '{agent_id}': {e}")
-            return {"conversational_behavior": ""}
+            return {"conversational_behavior": ""}, 0
         except Exception as e:
             logger.error(f"Error loading personality data for agent_id '{agent_id}': {e}", exc_info=True)
-            return {"conversational_behavior": ""}
+            return {"conversational_behavior": ""}, 0
+
+    def _load_personality_data(self, agent_id: str) -> Dict[str, Any]:
+        """Load personality data for a given agent_id, from the state cache or the database."""
+        return self._load_personality_record(agent_id)[0]
 
     def _save_personality_data(self, agent_id: str, personality_data: Dict[str, Any]) -> None:
         """Save personality data for a given agent_id to the database."""
         if not isinstance(personality_data, dict):
             raise ValueError("Personality data must be a dictionary")
         try:
-            with sqlite3.connect(self._db_path) as conn:
+            with connect(self._db_path) as conn:
                 cursor = conn.cursor()
                 json_data = json.dumps(personality_data, ensure_ascii=False)
                 cursor.execute('''
-                    INSERT INTO personalities (agent_id, personality_data)
-                    VALUES (?, ?)
-                    ON CONFLICT(agent_id) DO UPDATE SET personality_data=excluded.personality_data
+                    INSERT INTO personalities (agent_id, personality_data, version)
+                    VALUES (?, ?, 1)
+                    ON CONFLICT(agent_id) DO UPDATE SET
+                        personality_data=excluded.personality_data,
+                        version=personalities.version + 1
+                    RETURNING version
                 ''', (agent_id, json_data))
+                version = cursor.fetchone()[0]
                 conn.commit()
+            agent_state_cache.set(self._cache_namespace, agent_id, (personality_data, version))
             logger.info(f"Successfully saved personality data for agent_id '{agent_id}'")
         except Exception as e:
+            agent_state_cache.invalidate(self._cache_namespace, agent_id)
             logger.error(f"Error saving personality data for agent_id '{agent_id}': {e}", exc_info=True)
             raise
 
+    def _update_personality_fields(self, agent_id: str, fields: Dict[str, Any], expected_version: Optional[int] = None) -> bool:
+        """Set top-level fields of the personality data in one statement, merged by the database.
+
+        Returns False, leaving the data unchanged, if expected_version is given
+        and the stored version differs.
+        """
+        merged_expression, merge_params = self._dialect.json_set_fields("personalities.personality_data", fields)
+        sql = f'''
+            INSERT INTO personalities (agent_id, personality_data, version)
+            VALUES (?, ?, 1)
+            ON CONFLICT(agent_id) DO UPDATE SET
+                personality_data={merged_expression},
+                version=personalities.version + 1
+        '''
+        params = [agent_id, json.dumps({"conversational_behavior": "", **fields}, ensure_ascii=False), *merge_params]
+        if expected_version is not None:
+            sql += " WHERE personalities.version = ?"
+            params.append(expected_version)
+        sql += " RETURNING personality_data, version"
+        try:
+            with connect(self._db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(sql, params)
+                row = cursor.fetchone()
+                if row is None or (expected_version is not None and row[1] != expected_version + 1):
+                    conn.rollback()
+                    agent_state_cache.invalidate(self._cache_namespace, agent_id)
+                    logger.warning(f"Personality of agent_id '{agent_id}' changed since version {expected_version}, update skipped")
+                    return False
+            agent_state_cache.set(self._cache_namespace, agent_id, (json.loads(row[0]), row[1]))
+            return True
+        except Exception as e:
+            agent_state_cache.invalidate(self._cache_namespace, agent_id)
+            logger.error(f"Error updating personality fields for agent_id '{agent_id}': {e}", exc_info=True)
+            return False
+
     def get_personality_data(self, agent_id: str) -> Dict[str, Any]:
         """Get the complete personality data for a given agent_id."""
         return self._load_personality_data(agent_id).copy()  # Return a copy to prevent external modification
@@ -93,18 +153,56 @@ class Personality:
             behavior = str(behavior)
         return behavior
 
-    def update_conversational_behavior(self, agent_id: str, new_behavior: str) -> None:
-        """Update the conversational behavior text for a given agent_id."""
+    def get_personality_version(self, agent_id: str) -> int:
+        """Version of the stored personality data, for update_conversational_behavior's expected_version."""
+        return self._load_personality_record(agent_id)[1]
+
+    def update_conversational_behavior(self, agent_id: str, new_behavior: str, expected_version: Optional[int] = None) -> bool:
+        """Update the conversational behavior text for a given agent_id.
+
+        Args:
+            agent_id: The agent identifier
+            new_behavior: The full new conversational behavior text
+            expected_version: Version read before the new text was written; the
+                update is skipped if the personality changed since then
+
+        Returns:
+            bool: True if the update was applied
+        """
         if not isinstance(new_behavior, str):
             raise ValueError("New behavior must be a string")
         logger.info(f"Updating conversational behavior for agent_id '{agent_id}'")
-        data = self._load_personality_data(agent_id)
-        data["conversational_behavior"] = new_behavior
-        self._save_personality_data(agent_id, data)
+        return self._update_personality_fields(agent_id, {"conversational_behavior": new_behavior}, expected_version)
 
-    def get_personality_prompt_text(self, agent_id: str) -> str:
-        """Generate the complete personality prompt text for a given agent_id."""
+    def update_conversational_behavior_from_prompt(self, agent_id: str, new_behavior: str, expected_version: Optional[int] = None) -> bool:
+        """Apply the LLM's new conversational behavior, written from the personality prompt.
+
+        If the prompt showed the behavior truncated, the LLM's text cannot
+        replace it and is appended to the stored behavior instead (see
+        merge_truncated_update).
+
+        Returns:
+            bool: True if the update was applied
+        """
         behavior = self.get_conversational_behavior(agent_id)
+        shown = apply_budget("personality", behavior)
+        if is_truncated(shown):
+            new_behavior = merge_truncated_update(behavior, shown, new_behavior)
+            if new_behavior is None:
+                return True
+        return self.update_conversational_behavior(agent_id, new_behavior, expected_version)
+
+    def get_personality_prompt_text(self, agent_id: str) -> str:
+        """Generate the complete personality prompt text for a given agent_id.
+
+        The conversational behavior is rewritten by the LLM over time, so it is
+        truncated to the personality token budget.
+        """
+        behavior = apply_budget("personality", self.get_conversational_behavior(agent_id))
+        if is_truncated(behavior):
+            behavior += f"""
+        (The conversational behavior is too long to show in full and ends with "{TRUNCATION_MARKER.strip()}".
+        To update it, give only the text to add to it; it is appended to the full text.)"""
         final_text = f"""
         You are a funny person.
         You like to make jokes every now and then.
@@ -0,0 +1,209 @@
+from typing import Any, Dict, List, Optional
+import json
+import os
+import threading
+from common.logging_setup import setup_logging
+
+# Setup logging for prompt budgets
+def setup_prompt_budget_logging():
+    """Setup logging for the prompt budget module."""
+    return setup_logging("ai_person.prompt_budget", "prompt_budget")
+
+# Initialize logger
+logger = setup_prompt_budget_logging()
+
+TRUNCATION_MARKER = " ...[truncated]"
+# Rough characters per token when no tokenizer is installed
+CHARS_PER_TOKEN = 4
+
+# Default token budget per prompt section; 0 means unlimited
+DEFAULT_SECTION_BUDGETS = {
+    "conversation": 2000,
+    "conversation_summary": 300,
+    "recalled_conversation": 400,
+    "user_details": 800,
+    "personality": 400,
+    "news": 6000,
+}
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """Return a tiktoken encoding for the configured provider, or None without tiktoken.
+
+    Anthropic does not ship an offline tokenizer, so tiktoken's o200k_base is
+    used as a close estimate for every provider.
+    """
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            logger.info("tiktoken not available, estimating prompt tokens from characters")
+            _encoding = None
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Count the tokens of a text with the tokenizer, or estimate them from its length."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut a text down to at most max_tokens tokens, marking the cut."""
+    if max_tokens <= 0 or count_tokens(text) <= max_tokens:
+        return text
+    keep = max(max_tokens - count_tokens(TRUNCATION_MARKER), 0)
+    encoding = _get_encoding()
+    if encoding is not None:
+        head = encoding.decode(encoding.encode(text, disallowed_special=())[:keep])
+    else:
+        head = text[:keep * CHARS_PER_TOKEN]
+    return head + TRUNCATION_MARKER
+
+
+def is_truncated(text: Any) -> bool:
+    """Whether a text was cut by truncate_to_tokens."""
+    return isinstance(text, str) and text.endswith(TRUNCATION_MARKER)
+
+
+def merge_truncated_update(stored: str, shown: str, new_value: str) -> Optional[str]:
+    """Value to store when the LLM updates a text it was only shown truncated.
+
+    The LLM never saw the end of the text, so its new value cannot replace
+    the stored one; it is treated as an addition instead. If it repeats the
+    shown part, that part is dropped, and the rest is appended to the stored
+    text.
+
+    Returns:
+        Optional[str]: The merged text, or None if the new value adds nothing
+    """
+    head = shown[:-len(TRUNCATION_MARKER)] if is_truncated(shown) else shown
+    addition = new_value.strip()
+    if head and addition.startswith(head.strip()):
+        addition = addition[len(head.strip()):]
+    addition = addition.replace(TRUNCATION_MARKER.strip(), "").strip()
+    if not addition or addition in stored:
+        return None
+    return f"{stored.rstrip()}\n{addition}"
+
+
+def keep_newest_lines(lines: List[str], max_tokens: int) -> List[str]:
+    """Keep the newest lines (the end of the list) that fit in max_tokens.
+
+    The newest line is always kept, truncated if it alone is over budget.
+    """
+    if max_tokens <= 0 or not lines:
+        return lines
+    kept: List[str] = []
+    used = 0
+    for line in reversed(lines):
+        tokens = count_tokens(line) + 1  # newline
+        if used + tokens > max_tokens:
+            if not kept:
+                kept.append(truncate_to_tokens(line, max_tokens))
+            break
+        kept.append(line)
+        used += tokens
+    kept.reverse()
+    return kept
+
+
+def compact_mapping(values: Dict[str, Any], max_tokens: int) -> Dict[str, Any]:
+    """Shrink the values of a mapping until its text form fits in max_tokens.
+
+    Keys are always kept, since the LLM is told to update existing keys; the
+    longest values are truncated first. Truncated values end with
+    TRUNCATION_MARKER (see is_truncated).
+    """
+    if max_tokens <= 0 or count_tokens(str(values)) <= max_tokens:
+        return values
+    compacted = {key: value if isinstance(value, str) else json.dumps(value, ensure_ascii=False) for key, value in values.items()}
+    value_budget = max_tokens // max(len(compacted), 1)
+    # Short values keep their full text; the budget they leave unused goes to the long ones
+    sizes = {key: count_tokens(value) for key, value in compacted.items()}
+    short = {key for key, size in sizes.items() if size <= value_budget}
+    long_keys = [key for key in compacted if key not in short]
+    if long_keys:
+        spare = max_tokens - sum(sizes[key] for key in short) - count_tokens(str({key: "" for key in compacted}))
+        per_long_value = max(spare // len(long_keys), 1)
+        for key in long_keys:
+            compacted[key] = truncate_to_tokens(compacted[key], per_long_value)
+    return compacted
+
+
+def fit_news_items(news_items: List[Dict[str, Any]], max_tokens: int) -> str:
+    """Serialize ranked news items to JSON within max_tokens.
+
+    Article content is truncated first, evenly across items, then the lowest
+    ranked items (the end of the list) are dropped.
+    """
+    news_json = json.dumps(news_items)
+    if max_tokens <= 0 or count_tokens(news_json) <= max_tokens:
+        return news_json
+    items = [dict(item) for item in news_items]
+    per_item = max_tokens // len(items)
+    for item in items:
+        if isinstance(item.get("content"), str):
+            others = count_tokens(json.dumps({key: value for key, value in item.items() if key != "content"}))
+            item["content"] = truncate_to_tokens(item["content"], max(per_item - others, 64))
+    news_json = json.dumps(items)
+    while len(items) > 1 and count_tokens(news_json) > max_tokens:
+        items.pop()
+        news_json = json.dumps(items)
+    return news_json
+
+
+class PromptMetrics:
+    """Per-section prompt size counters, thread-safe and process-wide."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sections: Dict[str, Dict[str, int]] = {}
+
+    def record(self, section: str, tokens_before: int, tokens_after: int) -> None:
+        with self._lock:
+            stats = self._sections.setdefault(section, {"count": 0, "total_tokens": 0, "max_tokens": 0, "truncated": 0})
+            stats["count"] += 1
+            stats["total_tokens"] += tokens_after
+            stats["max_tokens"] = max(stats["max_tokens"], tokens_after)
+            if tokens_after < tokens_before:
+                stats["truncated"] += 1
+        if tokens_after < tokens_before:
+            logger.info(f"Prompt section '{section}' compacted from {tokens_before} to {tokens_after} tokens")
+        else:
+            logger.debug(f"Prompt section '{section}' is {tokens_after} tokens")
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                section: dict(stats, avg_tokens=stats["total_tokens"] / stats["count"] if stats["count"] else 0.0)
+                for section, stats in self._sections.items()
+            }
+
+
+prompt_metrics = PromptMetrics()
+
+
+def get_section_budget(section: str) -> int:
+    """Token budget of a section, from PROMPT_BUDGET_<SECTION> or the default (0 means unlimited)."""
+    return int(os.getenv(f"PROMPT_BUDGET_{section.upper()}", str(DEFAULT_SECTION_BUDGETS.get(section, 0))))
+
+
+def apply_budget(section: str, text: str, max_tokens: Optional[int] = None) -> str:
+    """Truncate a free-text section to its budget and record its size."""
+    if max_tokens is None:
+        max_tokens = get_section_budget(section)
+    tokens_before = count_tokens(text)
+    fitted = truncate_to_tokens(text, max_tokens)
+    prompt_metrics.record(section, tokens_before, tokens_before if fitted is text else count_tokens(fitted))
+    return fitted
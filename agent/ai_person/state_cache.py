@@ -0,0 +1,145 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import copy
+import os
+import threading
+
+# Returned by lookup() on a miss, so that None can be a cached value
+MISSING = object()
+
+
+class AgentStateCache:
+    """Bounded, thread-safe LRU cache for hot per-agent state.
+
+    Entries are keyed by (namespace, agent_id). Stores write through: they
+    update SQLite first and then put the new value here, so readers in this
+    process never see stale data. Values are deep-copied on the way in and
+    out so callers can mutate what they get back.
+
+    A value loaded from the database on a miss is stored with the
+    generation() taken before the load; if the entry was written or
+    invalidated meanwhile, the load may predate that write and is dropped.
+
+    The cache is per process; another process writing the same databases is
+    not seen until the entry is evicted or invalidated.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        """Create the cache.
+
+        Args:
+            maxsize: Maximum number of entries kept; 0 disables caching
+        """
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[str, Hashable], Any]" = OrderedDict()
+        self._lock = threading.RLock()
+        # Last change of each key, as a tick of a process-wide counter; keys
+        # without one last changed at or before _generation_floor
+        self._generations: Dict[Tuple[str, Hashable], int] = {}
+        self._generation_floor = 0
+        self._tick = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, namespace: str, agent_id: Hashable, default: Any = None) -> Any:
+        """Return a copy of the cached value, or default when absent."""
+        value = self.lookup(namespace, agent_id)
+        return default if value is MISSING else value
+
+    def lookup(self, namespace: str, agent_id: Hashable) -> Any:
+        """Like get, but returns the MISSING sentinel on a miss so None can be cached."""
+        key = (namespace, agent_id)
+        with self._lock:
+            value = self._entries.get(key, MISSING)
+            if value is MISSING:
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(value)
+
+    def generation(self, namespace: str, agent_id: Hashable) -> int:
+        """Token to pass to set() for a value about to be loaded from the database."""
+        with self._lock:
+            return self._generations.get((namespace, agent_id), self._generation_floor)
+
+    def _changed(self, key: Tuple[str, Hashable]) -> None:
+        self._tick += 1
+        self._generations[key] = self._tick
+        if len(self._generations) > 2 * max(self.maxsize, 1):
+            # Forget old ticks; loads that started before now are dropped
+            self._generations = {key: self._tick}
+            self._generation_floor = self._tick
+
+    def set(self, namespace: str, agent_id: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        """Store a copy of value, evicting the least recently used entry when full.
+
+        Args:
+            generation: For a value loaded from the database, generation() from
+                before the load; the value is dropped if the entry changed since
+        """
+        if self.maxsize <= 0:
+            return
+        key = (namespace, agent_id)
+        value = copy.deepcopy(value)
+        with self._lock:
+            if generation is not None and self._generations.get(key, self._generation_floor) != generation:
+                return
+            self._changed(key)
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def update(self, namespace: str, agent_id: Hashable, func: Callable[[Any], Any]) -> None:
+        """Replace a cached value with func(value), atomically; does nothing on a miss."""
+        key = (namespace, agent_id)
+        with self._lock:
+            if key in self._entries:
+                self._entries[key] = copy.deepcopy(func(copy.deepcopy(self._entries[key])))
+                self._changed(key)
+
+    def invalidate(self, namespace: str, agent_id: Hashable) -> None:
+        """Drop one entry."""
+        with self._lock:
+            self._entries.pop((namespace, agent_id), None)
+            self._changed((namespace, agent_id))
+
+    def invalidate_agent(self, agent_id: Hashable) -> None:
+        """Drop every entry belonging to an agent."""
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == agent_id]:
+                del self._entries[key]
+                self._changed(key)
+            for key in [key for key in self._generations if key[1] == agent_id]:
+                self._changed(key)
+            # The agent's keys without a tick of their own
+            self._tick += 1
+            self._generation_floor = self._tick
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tick += 1
+            self._generations = {}
+            self._generation_floor = self._tick
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+
+# Shared by every Memory, Personality and UserInfo instance in the process;
+# actions build their own instances, so a per-instance cache would miss.
+# Off by default with the postgres storage backend, where other agent
+# processes may write the same rows.
+_default_cache_size = "0" if os.getenv("STORAGE_BACKEND", "sqlite").lower() == "postgres" else "1024"
+agent_state_cache = AgentStateCache(maxsize=int(os.getenv("AGENT_STATE_CACHE_SIZE", _default_cache_size)))
@@ -0,0 +1,107 @@
+from typing import Callable, Dict
+import inspect
+
+
+def _takes_agent_id(method: Callable) -> bool:
+    return 'agent_id' in inspect.signature(method).parameters
+
+
+class PromptFragments:
+    """Prompt sections that do not depend on the agent, built once at startup.
+
+    Identity and purpose prompts whose getter takes an agent_id are per-agent;
+    for those the getter is kept and called by each TurnContext instead.
+    """
+
+    def __init__(self, identity, purpose, actions=None):
+        self.identity = identity
+        self.purpose = purpose
+        self.identity_is_per_agent = _takes_agent_id(identity.get_indentity_prompt)
+        self.purpose_is_per_agent = _takes_agent_id(purpose.get_purpose_prompt)
+        self.identity_prompt = None if self.identity_is_per_agent else identity.get_indentity_prompt()
+        self.purpose_prompt = None if self.purpose_is_per_agent else purpose.get_purpose_prompt()
+        self.actions_prompt = actions.get_all_available_actions_prompt() if actions is not None else ""
+
+    def get_identity_prompt(self, agent_id: str) -> str:
+        if self.identity_is_per_agent:
+            return self.identity.get_indentity_prompt(agent_id)
+        return self.identity_prompt
+
+    def get_purpose_prompt(self, agent_id: str) -> str:
+        if self.purpose_is_per_agent:
+            return self.purpose.get_purpose_prompt(agent_id)
+        return self.purpose_prompt
+
+
+class TurnContext:
+    """Prompt sections for one agent turn, each loaded on first use and then reused.
+
+    A turn is created by AiPerson.hear_text and handed to the chosen action, so
+    the action's prompt reuses the sections hear_text already built. Anything
+    that changes state a section depends on calls invalidate() for it.
+    """
+
+    SECTIONS = ('identity', 'purpose', 'personality', 'user_details', 'conversation', 'recalled_conversation', 'actions')
+
+    def __init__(self, agent_id: str, memory, personality, fragments: PromptFragments):
+        """Create the context for one turn.
+
+        Args:
+            agent_id: ID of the agent the turn belongs to
+            memory: Memory instance providing user details and the conversation
+            personality: Personality instance providing the personality prompt
+            fragments: Prompt fragments shared by all turns
+        """
+        self.agent_id = agent_id
+        self.memory = memory
+        self.personality = personality
+        self.fragments = fragments
+        self._sections: Dict[str, str] = {}
+        self._loaders: Dict[str, Callable[[], str]] = {
+            'identity': lambda: fragments.get_identity_prompt(agent_id),
+            'purpose': lambda: fragments.get_purpose_prompt(agent_id),
+            'personality': lambda: personality.get_personality_prompt_text(agent_id),
+            'user_details': lambda: memory.get_information_about_the_human_prompt(agent_id),
+            'conversation': lambda: memory.get_current_conversation_prompt(agent_id),
+            'recalled_conversation': lambda: memory.get_recalled_conversation_prompt(agent_id),
+            'actions': lambda: fragments.actions_prompt,
+        }
+
+    def section(self, name: str) -> str:
+        """Return the prompt text of a section, loading it on first use."""
+        if name not in self._sections:
+            self._sections[name] = self._loaders[name]()
+        return self._sections[name]
+
+    def invalidate(self, *names: str) -> None:
+        """Forget the given sections (all of them when called without names)."""
+        for name in names or self.SECTIONS:
+            self._sections.pop(name, None)
+
+    @property
+    def identity_prompt(self) -> str:
+        return self.section('identity')
+
+    @property
+    def purpose_prompt(self) -> str:
+        return self.section('purpose')
+
+    @property
+    def personality_prompt(self) -> str:
+        return self.section('personality')
+
+    @property
+    def user_details_prompt(self) -> str:
+        return self.section('user_details')
+
+    @property
+    def conversation_prompt(self) -> str:
+        return self.section('conversation')
+
+    @property
+    def recalled_conversation_prompt(self) -> str:
+        return self.section('recalled_conversation')
+
+    @property
+    def actions_prompt(self) -> str:
+        return self.section('actions')
@@ -0,0 +1,201 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import os
+import sqlite3
+import threading
+import time
+from common.logging_setup import setup_logging
+from common.maintenance import find_sqlite_files
+from common.storage import POSTGRES, connect, get_storage_backend
+from .llm_service import warm_up_client
+from .prompt_budget import count_tokens
+
+# Setup logging for warmup
+def setup_warmup_logging():
+    """Setup logging for the warmup module."""
+    return setup_logging("ai_person.warmup", "warmup")
+
+# Initialize logger
+logger = setup_warmup_logging()
+
+PENDING = "pending"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+PREFETCH_CHUNK_BYTES = 1024 * 1024
+
+
+def _prefetch_file(path: str, max_bytes: int) -> int:
+    """Read up to max_bytes of a file so its pages are in the OS page cache."""
+    read = 0
+    with open(path, "rb", buffering=0) as f:
+        while read < max_bytes:
+            chunk = f.read(min(PREFETCH_CHUNK_BYTES, max_bytes - read))
+            if not chunk:
+                break
+            read += len(chunk)
+    return read
+
+
+def warm_up_storage(prefetch_bytes: int) -> None:
+    """Check that every store opens and load the SQLite files into the OS page cache.
+
+    Connections are per thread (see common.storage), so request threads
+    still open their own; what carries over is the page cache, which every
+    thread and process shares. The check is made on a short-lived
+    connection, so a missing or unreadable store fails the warmup instead of
+    the first request.
+    """
+    if get_storage_backend() == POSTGRES:
+        with connect() as conn:
+            conn.execute("SELECT 1").fetchone()
+        return
+    for db_path in find_sqlite_files(os.path.dirname(os.path.abspath(__file__))):
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        finally:
+            conn.close()
+        if prefetch_bytes > 0:
+            _prefetch_file(db_path, prefetch_bytes)
+        logger.debug(f"Warmed up {db_path}")
+
+
+def warm_up_prompt_fragments(ai_person) -> None:
+    """Build the prompt sections shared by every agent and load the tokenizer."""
+    fragments = ai_person.prompt_fragments
+    for text in (fragments.identity_prompt, fragments.purpose_prompt, fragments.actions_prompt):
+        if text:
+            count_tokens(text)
+
+
+class Warmup:
+    """Runs the startup warmup steps and reports whether the worker is ready.
+
+    Storage, the news index and the prompt fragments must warm up for the
+    worker to be ready. If one of them fails, the failed steps are retried
+    with exponential backoff, from WARMUP_RETRY_SECONDS up to
+    WARMUP_RETRY_MAX_SECONDS, until they succeed, so a worker that started
+    before its stores were reachable still becomes ready. Provider
+    connections are opened when WARMUP_PROVIDER_CONNECTIONS is true; those
+    steps need the network, so their failures are logged without holding
+    readiness back.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.status = PENDING
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.attempts = 0
+        self.next_retry_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _steps(self, ai_person) -> List[Tuple[str, Callable[[], None], bool]]:
+        """(name, step, required) for each warmup step, in order."""
+        prefetch_bytes = int(os.getenv("WARMUP_PREFETCH_MB", "64")) * 1024 * 1024
+        news_vector_db = ai_person.memory.long_term_memory.news_vector_db
+        steps = [
+            ("storage", lambda: warm_up_storage(prefetch_bytes), True),
+            ("vector_index", news_vector_db.warm_up, True),
+            ("prompt_fragments", lambda: warm_up_prompt_fragments(ai_person), True),
+        ]
+        if os.getenv("WARMUP_PROVIDER_CONNECTIONS", "true").lower() == "true":
+            steps.append(("embeddings", news_vector_db.warm_up_embeddings, False))
+            steps.append(("llm", warm_up_client, False))
+        return steps
+
+    def _run_steps(self, steps: List[Tuple[str, Callable[[], None], bool]]) -> List[str]:
+        """Run some warmup steps, recording each result; returns the required steps that failed."""
+        failed_required = []
+        for name, step, required in steps:
+            started = time.perf_counter()
+            result: Dict[str, Any] = {"required": required}
+            try:
+                step()
+                result["ok"] = True
+            except Exception as e:
+                logger.error(f"Warmup step {name} failed: {str(e)}", exc_info=True)
+                result.update(ok=False, error=str(e))
+                if required:
+                    failed_required.append(name)
+            result["seconds"] = round(time.perf_counter() - started, 3)
+            logger.info(f"Warmup step {name} took {result['seconds']}s")
+            with self._lock:
+                self.steps[name] = result
+        return failed_required
+
+    def run(self, ai_person, max_attempts: Optional[int] = None) -> bool:
+        """Run every warmup step, retrying failed required steps.
+
+        Args:
+            ai_person: The AIPerson the routes serve
+            max_attempts: Attempts before giving up with status FAILED; from
+                WARMUP_MAX_ATTEMPTS by default, where 0 retries forever
+
+        Returns:
+            bool: True if the worker is ready
+        """
+        if max_attempts is None:
+            max_attempts = int(os.getenv("WARMUP_MAX_ATTEMPTS", "0"))
+        delay = float(os.getenv("WARMUP_RETRY_SECONDS", "5"))
+        max_delay = float(os.getenv("WARMUP_RETRY_MAX_SECONDS", "300"))
+        with self._lock:
+            self.status = WARMING
+            self.started_at = time.time()
+            self.finished_at = None
+            self.steps = {}
+            self.attempts = 0
+        logger.info("Warming up agent worker")
+        steps = self._steps(ai_person)
+        while True:
+            with self._lock:
+                self.attempts += 1
+                self.next_retry_at = None
+            failed_required = self._run_steps(steps)
+            with self._lock:
+                self.finished_at = time.time()
+                self.status = FAILED if failed_required else READY
+            if not failed_required or (max_attempts and self.attempts >= max_attempts):
+                break
+            with self._lock:
+                self.next_retry_at = time.time() + delay
+            logger.warning(f"Warmup steps {failed_required} failed on attempt {self.attempts}, retrying in {delay:.0f}s")
+            time.sleep(delay)
+            delay = min(delay * 2, max_delay)
+            steps = [step for step in steps if step[0] in failed_required]
+            with self._lock:
+                self.status = WARMING
+        logger.info(f"Warmup finished in {self.finished_at - self.started_at:.2f}s with status {self.status} after {self.attempts} attempt(s)")
+        return not failed_required
+
+    def start(self, ai_person) -> None:
+        """Run the warmup on a background thread, unless WARMUP_ENABLED is false."""
+        if os.getenv("WARMUP_ENABLED", "true").lower() != "true":
+            with self._lock:
+                self.status = READY
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self.run, args=(ai_person,), name="agent-warmup", daemon=True)
+        self._thread.start()
+
+    @property
+    def ready(self) -> bool:
+        return self.status == READY
+
+    def report(self) -> Dict[str, Any]:
+        """Readiness and per-step timings, as served by /readyz."""
+        with self._lock:
+            report = {"ready": self.status == READY, "status": self.status, "attempts": self.attempts, "steps": dict(self.steps)}
+            if self.next_retry_at is not None:
+                report["next_retry_in"] = round(max(self.next_retry_at - time.time(), 0.0), 1)
+            if self.started_at is not None:
+                report["seconds"] = round((self.finished_at or time.time()) - self.started_at, 3)
+            return report
+
+
+# Shared by the routes of this process
+warmup = Warmup()
@@ -1,6 +1,13 @@
+import os
+import sys
+
+# Make the shared common/ package at the repository root importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from flask import Flask
 from flask_cors import CORS
 from chat_routes import chat_bp
+from health_routes import health_bp
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -8,6 +15,7 @@ CORS(app)
 
 # Register blueprint
 app.register_blueprint(chat_bp)
+app.register_blueprint(health_bp)
 
 if __name__ == '__main__':
     app.run(host="0.0.0.0", port=8087, debug=True)
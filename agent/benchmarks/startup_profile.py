@@ -0,0 +1,89 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+AGENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_ROOT = os.path.dirname(AGENT_DIR)
+
+
+def run_import(module: str) -> Tuple[float, str]:
+    """Import a module in a fresh interpreter with -X importtime.
+
+    Returns:
+        Tuple[float, str]: Wall-clock seconds of the interpreter and its importtime report
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [AGENT_DIR, REPO_ROOT, env.get("PYTHONPATH")]))
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=AGENT_DIR, env=env, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"Importing {module} failed:\n" + "\n".join(errors[-20:]))
+    return elapsed, result.stderr
+
+
+def parse_importtime(report: str) -> List[Dict]:
+    """Parse -X importtime lines into {module, self_us, cumulative_us, depth} rows."""
+    rows = []
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append({
+            "module": name.strip(),
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+            # Nested imports are indented by two spaces per level
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+        })
+    return rows
+
+
+def top_level_packages(rows: List[Dict]) -> Dict[str, int]:
+    """Self time in microseconds summed per top-level package."""
+    totals: Dict[str, int] = {}
+    for row in rows:
+        package = row["module"].split(".")[0]
+        totals[package] = totals.get(package, 0) + row["self_us"]
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the cold-start import time of the agent.")
+    parser.add_argument("--module", default="chat_routes", help="Module to import (default: chat_routes, which builds the AiPerson)")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time; the report is from the fastest")
+    parser.add_argument("--top", type=int, default=20, help="Modules and packages to list")
+    parser.add_argument("--json", action="store_true", help="Print the parsed report as JSON")
+    args = parser.parse_args()
+
+    runs = [run_import(args.module) for _ in range(args.runs)]
+    wall_times = [elapsed for elapsed, _ in runs]
+    rows = parse_importtime(min(runs)[1])
+    packages = top_level_packages(rows)
+
+    if args.json:
+        print(json.dumps({"module": args.module, "wall_seconds": wall_times, "imports": rows}, indent=2))
+        return
+
+    print(f"Cold start of 'import {args.module}' over {args.runs} runs: "
+          f"median {statistics.median(wall_times) * 1000:.1f} ms, min {min(wall_times) * 1000:.1f} ms")
+    print(f"{len(rows)} modules imported, {sum(row['self_us'] for row in rows) / 1000:.1f} ms of import time\n")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for row in sorted(rows, key=lambda row: row["cumulative_us"], reverse=True)[:args.top]:
+        print(f"{row['cumulative_us'] / 1000:>14.1f} {row['self_us'] / 1000:>9.1f}  {row['module']}")
+    print(f"\n{'self ms':>14}  top-level package")
+    for package, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{self_us / 1000:>14.1f}  {package}")
+
+
+if __name__ == "__main__":
+    main()
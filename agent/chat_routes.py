@@ -1,11 +1,17 @@
 from flask import Blueprint, request, jsonify
+import hmac
+import os
 import requests
 from ai_person.ai_person import AiPerson
+from ai_person.maintenance import maintenance_runner
+from ai_person.warmup import warmup
 
 # Create blueprint
 chat_bp = Blueprint('curio_chat', __name__, url_prefix='/curio_chat')
 
 aiPerson = AiPerson()
+# Load indexes, caches and provider connections before /readyz reports ready
+warmup.start(aiPerson)
 
 @chat_bp.route('/send_user_message', methods=['POST'])
 def send_user_message():
@@ -44,3 +50,37 @@ def initialize_agent():
         return jsonify({"message": f"Agent {agent_id} initialized."}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+def _maintenance_authorized() -> bool:
+    """Whether the request carries the MAINTENANCE_TOKEN shared with the Curio application."""
+    token = os.getenv("MAINTENANCE_TOKEN")
+    return bool(token) and hmac.compare_digest(request.headers.get("X-Maintenance-Token", ""), token)
+
+@chat_bp.route('/run_maintenance', methods=['POST'])
+def run_maintenance_route():
+    """
+    Start the retention, archiving and compaction jobs on the agent's stores in the background.
+    Expects JSON: {"dry_run": true|false} (optional, defaults to false) and the
+    X-Maintenance-Token header. Poll /curio_chat/maintenance_status for the report.
+    """
+    try:
+        if not _maintenance_authorized():
+            return jsonify({"message": "Unauthorized access", "error": "Invalid or unconfigured maintenance token"}), 403
+        data = request.get_json(silent=True) or {}
+        started = maintenance_runner.start(
+            dry_run=bool(data.get("dry_run", False)),
+            news_vector_db=aiPerson.memory.long_term_memory.news_vector_db
+        )
+        return jsonify(maintenance_runner.status()), 202 if started else 409
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@chat_bp.route('/maintenance_status', methods=['GET'])
+def maintenance_status_route():
+    """
+    State of the latest maintenance run, with its report once it has finished.
+    Expects the X-Maintenance-Token header.
+    """
+    if not _maintenance_authorized():
+        return jsonify({"message": "Unauthorized access", "error": "Invalid or unconfigured maintenance token"}), 403
+    return jsonify(maintenance_runner.status()), 200
@@ -0,0 +1,22 @@
+from flask import Blueprint, jsonify
+from ai_person.warmup import warmup
+
+# Create blueprint
+health_bp = Blueprint('health', __name__)
+
+@health_bp.route('/healthz', methods=['GET'])
+def healthz():
+    """
+    Liveness check: the process is up and serving requests.
+    """
+    return jsonify({"status": "ok"}), 200
+
+@health_bp.route('/readyz', methods=['GET'])
+def readyz():
+    """
+    Readiness check for the load balancer: 200 once the startup warmup has
+    finished, 503 while it runs or while a failed required step waits to be
+    retried. The body lists each warmup step with its duration.
+    """
+    report = warmup.report()
+    return jsonify(report), 200 if report["ready"] else 503
@@ -0,0 +1,16 @@
+import os
+import sys
+
+# Make the shared common/ package at the repository root importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+from ai_person.maintenance import run_maintenance
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Archive old conversations, apply news retention and compact the agent's databases.")
+    parser.add_argument('--dry-run', action='store_true', help="Report what would be archived, deleted and reclaimed without changing anything")
+    args = parser.parse_args()
+    for entry in run_maintenance(dry_run=args.dry_run):
+        print(json.dumps(entry))
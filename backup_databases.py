@@ -0,0 +1,37 @@
+import argparse
+import os
+from datetime import datetime
+from common.backup import DEFAULT_BACKUP_PAGES, create_snapshot, restore_snapshot
+
+
+def print_stats(entries):
+    total_bytes = sum(entry.get("bytes", 0) for entry in entries)
+    total_seconds = sum(entry.get("seconds", 0) for entry in entries)
+    for entry in entries:
+        if "error" in entry:
+            print(f"FAILED  {entry['path']}: {entry['error']}")
+        else:
+            print(f"{entry['kind']:<13} {entry['path']:<70} {entry['bytes']:>12} bytes {entry['seconds']:>8.3f}s")
+    print(f"{len(entries)} stores, {total_bytes} bytes in {total_seconds:.3f}s")
+
+
+if __name__ == "__main__":
+    project_root = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Snapshot and restore the SQLite databases and vector indexes of the agent and CurioApplication.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    snapshot_parser = subparsers.add_parser("snapshot", help="Copy every store while the services keep running")
+    snapshot_parser.add_argument("--dest", default=os.path.join(project_root, "backups"), help="Directory that receives a timestamped snapshot directory")
+    snapshot_parser.add_argument("--pages", type=int, default=DEFAULT_BACKUP_PAGES, help="SQLite pages copied per backup step (-1 for one step)")
+
+    restore_parser = subparsers.add_parser("restore", help="Restore a snapshot; stop the services first")
+    restore_parser.add_argument("snapshot", help="Snapshot directory to restore")
+    restore_parser.add_argument("--only", nargs="+", help="Restore only these store paths, as listed in the manifest")
+
+    args = parser.parse_args()
+    if args.command == "snapshot":
+        snapshot_dir = os.path.join(args.dest, datetime.now().strftime("%Y%m%d_%H%M%S"))
+        print_stats(create_snapshot(project_root, snapshot_dir, pages=args.pages, exclude=(args.dest,)))
+        print(f"Snapshot written to {snapshot_dir}")
+    else:
+        print_stats(restore_snapshot(args.snapshot, project_root, only=args.only))
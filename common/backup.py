@@ -0,0 +1,310 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import os
+import shutil
+import sqlite3
+import time
+from .logging_setup import setup_logging
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Setup logging for backups
+def setup_backup_logging():
+    """Setup logging for the backup module."""
+    return setup_logging("common.backup", "backup")
+
+# Initialize logger
+logger = setup_backup_logging()
+
+SQLITE = "sqlite"
+VECTOR_INDEX = "vector_index"
+CHROMA = "chroma"
+
+MANIFEST_FILE = "manifest.json"
+INDEX_IDS_FILE = "ids.json"
+INDEX_VECTORS_FILE = "vectors.npy"
+CHROMA_DB_FILE = "chroma.sqlite3"
+# Lock file in a Chroma or mmap vector index directory; writers hold it
+# shared, backups exclusively
+WRITE_LOCK_FILE = "write.lock"
+
+SKIPPED_DIRS = {"__pycache__", ".git", "logs", "venv", ".venv", "node_modules"}
+
+DEFAULT_BACKUP_PAGES = int(os.getenv("SQLITE_BACKUP_PAGES", "1024"))
+DEFAULT_BACKUP_SLEEP_MS = int(os.getenv("SQLITE_BACKUP_SLEEP_MS", "5"))
+
+
+def find_data_stores(root_dir: str, exclude: Tuple[str, ...] = ()) -> List[Tuple[str, str]]:
+    """The SQLite files, mmap vector indexes and Chroma directories under root_dir.
+
+    Args:
+        root_dir: Directory to search
+        exclude: Absolute directories to leave out, such as the backup destination
+
+    Returns:
+        List[Tuple[str, str]]: (kind, path relative to root_dir) pairs
+    """
+    exclude = tuple(os.path.abspath(path) for path in exclude)
+    stores = []
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        dirnames[:] = sorted(
+            name for name in dirnames
+            if name not in SKIPPED_DIRS and os.path.abspath(os.path.join(dirpath, name)) not in exclude
+        )
+        relative_dir = os.path.relpath(dirpath, root_dir)
+        if INDEX_IDS_FILE in filenames and INDEX_VECTORS_FILE in filenames:
+            stores.append((VECTOR_INDEX, relative_dir))
+            continue
+        if CHROMA_DB_FILE in filenames:
+            stores.append((CHROMA, relative_dir))
+            dirnames[:] = []
+            continue
+        stores.extend(
+            (SQLITE, os.path.normpath(os.path.join(relative_dir, filename)))
+            for filename in sorted(filenames) if filename.endswith('.db')
+        )
+    return stores
+
+
+def _progress_logger(name: str):
+    def progress(status: int, remaining: int, total: int) -> None:
+        logger.debug(f"Backing up {name}: {total - remaining}/{total} pages")
+    return progress
+
+
+def copy_sqlite(source_path: str, dest_path: str, pages: int = DEFAULT_BACKUP_PAGES,
+                sleep_ms: int = DEFAULT_BACKUP_SLEEP_MS) -> Dict[str, Any]:
+    """Copy a live SQLite database with the online backup API.
+
+    The copy runs `pages` pages per step and sleeps between steps, so each
+    step holds the source's read lock only briefly; in WAL mode writers are
+    not blocked at all. A write from another connection restarts the copy,
+    so the result is always a consistent snapshot. The copy is written to a
+    temporary file, switched to rollback journaling and moved into place.
+
+    Args:
+        source_path: Database to copy
+        dest_path: File to write
+        pages: Pages copied per step; -1 copies everything in one step
+        sleep_ms: Pause between steps
+
+    Returns:
+        Dict[str, Any]: Size, page count and duration of the copy
+    """
+    started = time.monotonic()
+    os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+    temp_path = dest_path + ".tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    source = sqlite3.connect(source_path)
+    dest = sqlite3.connect(temp_path)
+    try:
+        source.backup(dest, pages=pages, progress=_progress_logger(os.path.basename(source_path)), sleep=sleep_ms / 1000)
+        dest.execute("PRAGMA journal_mode=DELETE")
+        page_count = dest.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        dest.close()
+        source.close()
+    os.replace(temp_path, dest_path)
+    return {"bytes": os.path.getsize(dest_path), "pages": page_count, "seconds": round(time.monotonic() - started, 3)}
+
+
+def restore_sqlite(snapshot_path: str, dest_path: str, pages: int = -1) -> Dict[str, Any]:
+    """Overwrite a database with a snapshot through the backup API.
+
+    Going through SQLite rather than replacing the file keeps any open
+    connection, and its WAL, consistent with the restored content.
+    """
+    started = time.monotonic()
+    os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+    source = sqlite3.connect(snapshot_path)
+    dest = sqlite3.connect(dest_path)
+    try:
+        source.backup(dest, pages=pages)
+        page_count = dest.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        dest.close()
+        source.close()
+    return {"bytes": os.path.getsize(snapshot_path), "pages": page_count, "seconds": round(time.monotonic() - started, 3)}
+
+
+def _copy_files(source_dir: str, dest_dir: str, names: List[str]) -> int:
+    """Copy files through temporary names; returns the bytes copied."""
+    os.makedirs(dest_dir, exist_ok=True)
+    size = 0
+    for name in names:
+        dest_path = os.path.join(dest_dir, name)
+        shutil.copyfile(os.path.join(source_dir, name), dest_path + ".tmp")
+        os.replace(dest_path + ".tmp", dest_path)
+        size += os.path.getsize(dest_path)
+    return size
+
+
+def copy_vector_index(source_dir: str, dest_dir: str) -> Dict[str, Any]:
+    """Copy an MmapVectorIndex directory, pausing its writer meanwhile.
+
+    remove() rewrites the row files, moving rows under new positions, so
+    reading ids.json before the files is not enough: the copy holds the
+    index's write lock exclusively (see index_write_lock), which waits for
+    a running add or remove to finish and holds new ones until the files
+    and ids.json have been copied. A stale HNSW graph is rebuilt when the
+    index is opened.
+    """
+    started = time.monotonic()
+    with index_write_lock(source_dir, exclusive=True):
+        locked = time.monotonic()
+        with open(os.path.join(source_dir, INDEX_IDS_FILE), "rb") as f:
+            ids_data = f.read()
+        names = sorted(
+            name for name in os.listdir(source_dir)
+            if name not in (INDEX_IDS_FILE, WRITE_LOCK_FILE) and not name.endswith(".tmp")
+            and os.path.isfile(os.path.join(source_dir, name))
+        )
+        size = _copy_files(source_dir, dest_dir, names)
+        paused = time.monotonic() - locked
+    ids_path = os.path.join(dest_dir, INDEX_IDS_FILE)
+    with open(ids_path + ".tmp", "wb") as f:
+        f.write(ids_data)
+    os.replace(ids_path + ".tmp", ids_path)
+    # A graph left over from before the restore would not match the rows
+    if "hnsw.bin" not in names and os.path.exists(os.path.join(dest_dir, "hnsw.bin")):
+        os.remove(os.path.join(dest_dir, "hnsw.bin"))
+    return {
+        "bytes": size + len(ids_data),
+        "rows": len(json.loads(ids_data)),
+        "seconds": round(time.monotonic() - started, 3),
+        "writes_paused_seconds": round(paused, 3),
+    }
+
+
+@contextmanager
+def index_write_lock(directory: str, exclusive: bool = False) -> Iterator[None]:
+    """Hold the write lock of a vector index directory, across processes.
+
+    Writers take it shared, so they never wait for each other;
+    copy_chroma and copy_vector_index take it exclusively, which waits for
+    running writes to finish and holds new ones until the copy is done.
+    Without fcntl (Windows) nothing is locked.
+    """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, WRITE_LOCK_FILE), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def copy_chroma(source_dir: str, dest_dir: str, pages: int = DEFAULT_BACKUP_PAGES) -> Dict[str, Any]:
+    """Copy a Chroma persistent directory.
+
+    ChromaNewsIndex writes under index_write_lock, so holding it exclusively
+    pauses index writes while chroma.sqlite3 (through the backup API) and
+    the segment files are copied, and the copy is one consistent state.
+    """
+    started = time.monotonic()
+    with index_write_lock(source_dir, exclusive=True):
+        locked = time.monotonic()
+        stats = copy_sqlite(os.path.join(source_dir, CHROMA_DB_FILE), os.path.join(dest_dir, CHROMA_DB_FILE), pages=pages)
+        size = stats["bytes"]
+        for dirpath, _, filenames in os.walk(source_dir):
+            relative_dir = os.path.relpath(dirpath, source_dir)
+            names = [
+                name for name in filenames
+                if not name.startswith(CHROMA_DB_FILE) and not name.endswith(".tmp") and name != WRITE_LOCK_FILE
+            ]
+            size += _copy_files(dirpath, os.path.join(dest_dir, relative_dir), names)
+    return {
+        "bytes": size,
+        "pages": stats["pages"],
+        "seconds": round(time.monotonic() - started, 3),
+        "writes_paused_seconds": round(time.monotonic() - locked, 3),
+    }
+
+
+def create_snapshot(root_dir: str, snapshot_dir: str, pages: int = DEFAULT_BACKUP_PAGES,
+                    exclude: Tuple[str, ...] = ()) -> List[Dict[str, Any]]:
+    """Snapshot every data store under root_dir into snapshot_dir.
+
+    Stores keep their paths relative to root_dir. A manifest.json with the
+    per-store stats is written last, so a snapshot without one is incomplete.
+
+    Args:
+        root_dir: Directory searched for stores
+        snapshot_dir: Directory to write
+        pages: SQLite pages copied per backup step
+        exclude: More directories to leave out, such as earlier snapshots
+
+    Returns:
+        List[Dict[str, Any]]: Stats per store; failed stores carry an "error"
+    """
+    logger.info(f"Creating snapshot of {root_dir} in {snapshot_dir}")
+    os.makedirs(snapshot_dir, exist_ok=True)
+    entries = []
+    for kind, path in find_data_stores(root_dir, exclude=(snapshot_dir,) + tuple(exclude)):
+        source, dest = os.path.join(root_dir, path), os.path.join(snapshot_dir, path)
+        try:
+            if kind == SQLITE:
+                stats = copy_sqlite(source, dest, pages=pages)
+            elif kind == VECTOR_INDEX:
+                stats = copy_vector_index(source, dest)
+            else:
+                stats = copy_chroma(source, dest, pages=pages)
+            logger.info(f"Backed up {path}: {stats['bytes']} bytes in {stats['seconds']}s")
+            entries.append({"kind": kind, "path": path, **stats})
+        except Exception as e:
+            logger.error(f"Error backing up {path}: {str(e)}", exc_info=True)
+            entries.append({"kind": kind, "path": path, "error": str(e)})
+    with open(os.path.join(snapshot_dir, MANIFEST_FILE), "w") as f:
+        json.dump({"created_at": datetime.now().isoformat(timespec="seconds"), "stores": entries}, f, indent=2)
+    return entries
+
+
+def restore_snapshot(snapshot_dir: str, root_dir: str, only: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Restore the stores of a snapshot created by create_snapshot.
+
+    Stop the services first: databases are restored through the backup API,
+    but processes that cached data or mapped index files keep the old state.
+
+    Args:
+        snapshot_dir: Snapshot directory holding a manifest.json
+        root_dir: Directory the stores are restored under
+        only: Restore only these relative store paths
+
+    Returns:
+        List[Dict[str, Any]]: Stats per restored store
+    """
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise ValueError(f"{snapshot_dir} has no {MANIFEST_FILE}; the snapshot is missing or incomplete")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    logger.info(f"Restoring snapshot from {manifest['created_at']} into {root_dir}")
+    entries = []
+    for store in manifest["stores"]:
+        kind, path = store["kind"], store["path"]
+        if "error" in store or (only and path not in only):
+            continue
+        source, dest = os.path.join(snapshot_dir, path), os.path.join(root_dir, path)
+        try:
+            if kind == SQLITE:
+                stats = restore_sqlite(source, dest)
+            elif kind == VECTOR_INDEX:
+                stats = copy_vector_index(source, dest)
+            else:
+                shutil.rmtree(dest, ignore_errors=True)
+                stats = copy_chroma(source, dest, pages=-1)
+            logger.info(f"Restored {path}: {stats['bytes']} bytes in {stats['seconds']}s")
+            entries.append({"kind": kind, "path": path, **stats})
+        except Exception as e:
+            logger.error(f"Error restoring {path}: {str(e)}", exc_info=True)
+            entries.append({"kind": kind, "path": path, "error": str(e)})
+    return entries
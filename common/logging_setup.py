@@ -0,0 +1,51 @@
+from datetime import datetime
+import logging
+import os
+
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+FILE_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+CONSOLE_FORMAT = '%(levelname)s - %(message)s'
+
+
+def setup_logging(logger_name: str, file_prefix: str, file_format: str = FILE_FORMAT,
+                  console_format: str = CONSOLE_FORMAT) -> logging.Logger:
+    """Configure a module logger to write DEBUG to a daily file and INFO to the console.
+
+    The log file is opened on the first record rather than here, so
+    importing a module that only sets up its logger touches no files.
+
+    Args:
+        logger_name: Name of the logger to configure
+        file_prefix: Log file name prefix, followed by the date
+        file_format: Format of the file records
+        console_format: Format of the console records
+
+    Returns:
+        logging.Logger: Configured logger instance
+    """
+    os.makedirs(LOG_DIR, exist_ok=True)
+    log_file = os.path.join(LOG_DIR, f"{file_prefix}_{datetime.now().strftime('%Y%m%d')}.log")
+
+    # Create logger
+    logger = logging.getLogger(logger_name)
+    logger.setLevel(logging.DEBUG)
+
+    # Remove any existing handlers
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+
+    # Create file handler
+    file_handler = logging.FileHandler(log_file, delay=True)
+    file_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(logging.Formatter(file_format))
+
+    # Create console handler
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.INFO)
+    console_handler.setFormatter(logging.Formatter(console_format))
+
+    # Add handlers to logger
+    logger.addHandler(file_handler)
+    logger.addHandler(console_handler)
+
+    return logger
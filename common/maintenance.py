@@ -0,0 +1,129 @@
+from typing import Any, Dict, Iterable, List, Optional
+from datetime import datetime, timedelta, timezone
+import gzip
+import json
+import os
+from .sqlite_storage import connect
+from .logging_setup import setup_logging
+
+# Setup logging for maintenance jobs
+def setup_maintenance_logging():
+    """Setup logging for the maintenance module."""
+    return setup_logging("common.maintenance", "maintenance")
+
+# Initialize logger
+logger = setup_maintenance_logging()
+
+# PRAGMA auto_vacuum values
+_AUTO_VACUUM_INCREMENTAL = 2
+
+
+def report_entry(store: str, action: str, rows: int = 0, bytes_reclaimed: int = 0, **details: Any) -> Dict[str, Any]:
+    """One line of a maintenance report."""
+    return {"store": store, "action": action, "rows": rows, "bytes_reclaimed": bytes_reclaimed, **details}
+
+
+def total_bytes_reclaimed(report: Iterable[Dict[str, Any]]) -> int:
+    return sum(entry.get("bytes_reclaimed", 0) for entry in report)
+
+
+def sqlite_file_size(db_path: str) -> int:
+    """Bytes used by a database file and its WAL."""
+    return sum(os.path.getsize(path) for path in (db_path, f"{db_path}-wal") if os.path.exists(path))
+
+
+def compact_sqlite(db_path: str, dry_run: bool = False, analyze: bool = True) -> Dict[str, Any]:
+    """Return free pages of a database file to the filesystem and refresh its statistics.
+
+    The first run switches the file to auto_vacuum=INCREMENTAL, which needs
+    one full VACUUM; later runs only release the free pages with
+    incremental_vacuum. ANALYZE is bounded by analysis_limit so it stays
+    cheap on large tables. The WAL is checkpointed and truncated.
+
+    Args:
+        db_path: Path to the SQLite database file
+        dry_run: Only report the bytes that free pages take up
+        analyze: Refresh the query planner statistics
+
+    Returns:
+        Dict[str, Any]: Report entry with the bytes reclaimed, or reclaimable on a dry run
+    """
+    store = os.path.basename(db_path)
+    conn = connect(db_path)
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    free_bytes = conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size
+    if dry_run:
+        return report_entry(store, "compact", bytes_reclaimed=free_bytes, dry_run=True)
+    if conn.in_transaction:
+        conn.commit()
+    size_before = sqlite_file_size(db_path)
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != _AUTO_VACUUM_INCREMENTAL:
+        logger.info(f"Switching {store} to incremental auto-vacuum with a full VACUUM")
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+    else:
+        conn.execute("PRAGMA incremental_vacuum").fetchall()
+    if analyze:
+        conn.execute("PRAGMA analysis_limit=1000")
+        conn.execute("ANALYZE")
+        conn.commit()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    reclaimed = max(size_before - sqlite_file_size(db_path), 0)
+    logger.info(f"Compacted {store}: {reclaimed} bytes reclaimed")
+    return report_entry(store, "compact", bytes_reclaimed=reclaimed)
+
+
+def find_sqlite_files(root_dir: str) -> List[str]:
+    """Paths of the .db files under root_dir."""
+    paths = []
+    for dirpath, _, filenames in os.walk(root_dir):
+        paths.extend(os.path.join(dirpath, filename) for filename in filenames if filename.endswith('.db'))
+    return sorted(paths)
+
+
+def append_archive(path: str, records: Iterable[Dict[str, Any]]) -> int:
+    """Append records as JSON lines to a gzip file, creating it if needed.
+
+    Every call adds a gzip member, which gzip readers concatenate. The file
+    is synced before returning, so callers can delete the archived rows.
+
+    Returns:
+        int: Number of records written
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    count = 0
+    with open(path, "ab") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="ab") as archive:
+            for record in records:
+                archive.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+                count += 1
+        raw.flush()
+        os.fsync(raw.fileno())
+    return count
+
+
+def read_archive(path: str) -> List[Dict[str, Any]]:
+    """Read back the records of an archive written by append_archive."""
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        return [json.loads(line) for line in archive if line.strip()]
+
+
+def cutoff_date(days: int, now: Optional[datetime] = None) -> str:
+    """'YYYY-MM-DD HH:MM:SS' UTC timestamp `days` days before now, as stored by CURRENT_TIMESTAMP."""
+    now = now or datetime.now(timezone.utc)
+    return (now - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def analyze_postgres(tables: Iterable[str]) -> Dict[str, Any]:
+    """Refresh planner statistics of PostgreSQL tables.
+
+    Space is reclaimed by autovacuum there; VACUUM cannot run inside the
+    transaction every store connection opens.
+    """
+    from .postgres_storage import connect as postgres_connect
+    tables = list(tables)
+    with postgres_connect() as conn:
+        for table in tables:
+            conn.execute(f"ANALYZE {table}")
+    logger.info(f"Analyzed {len(tables)} PostgreSQL tables")
+    return report_entry("postgres", "analyze", tables=tables)
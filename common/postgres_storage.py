@@ -0,0 +1,183 @@
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Sequence
+import os
+import threading
+from .logging_setup import setup_logging
+
+# Setup logging for PostgreSQL storage
+def setup_postgres_storage_logging():
+    """Setup logging for the PostgreSQL storage module."""
+    return setup_logging("common.postgres_storage", "postgres_storage")
+
+# Initialize logger
+logger = setup_postgres_storage_logging()
+
+
+@lru_cache(maxsize=1024)
+def translate_placeholders(sql: str) -> str:
+    """Rewrite sqlite3's qmark placeholders as psycopg's %s.
+
+    Question marks inside quoted literals are left alone and literal percent
+    signs are escaped, so the same SQL text runs on both backends.
+    """
+    out = []
+    quote = None
+    for char in sql:
+        if quote:
+            if char == quote:
+                quote = None
+            out.append('%%' if char == '%' else char)
+        elif char in ("'", '"'):
+            quote = char
+            out.append(char)
+        elif char == '?':
+            out.append('%s')
+        elif char == '%':
+            out.append('%%')
+        else:
+            out.append(char)
+    return ''.join(out)
+
+
+class PostgresCursor:
+    """sqlite3-style cursor over a psycopg cursor."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> "PostgresCursor":
+        self._cursor.execute(translate_placeholders(sql), tuple(params))
+        return self
+
+    def executemany(self, sql: str, seq_of_params: Iterable[Sequence[Any]]) -> "PostgresCursor":
+        self._cursor.executemany(translate_placeholders(sql), [tuple(params) for params in seq_of_params])
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size: int = 1):
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def lastrowid(self) -> None:
+        # PostgreSQL has no rowid; use RETURNING instead
+        return None
+
+
+class PostgresConnection:
+    """sqlite3-style connection over psycopg.
+
+    Used as a context manager it commits on success and rolls back on error,
+    like sqlite3.Connection, so the stores run unchanged on either backend.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self) -> PostgresCursor:
+        return PostgresCursor(self._conn.cursor())
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> PostgresCursor:
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql: str, seq_of_params: Iterable[Sequence[Any]]) -> PostgresCursor:
+        return self.cursor().executemany(sql, seq_of_params)
+
+    def commit(self) -> None:
+        self._conn.commit()
+
+    def rollback(self) -> None:
+        self._conn.rollback()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    @property
+    def closed(self) -> bool:
+        return bool(self._conn.closed)
+
+    @property
+    def in_transaction(self) -> bool:
+        from psycopg.pq import TransactionStatus
+        return self._conn.info.transaction_status != TransactionStatus.IDLE
+
+    def __enter__(self) -> "PostgresConnection":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        if exc_type is None:
+            self._conn.commit()
+        else:
+            self._conn.rollback()
+        return False
+
+
+class _ThreadConnections(threading.local):
+    def __init__(self):
+        self.pid = os.getpid()
+        self.connections: Dict[str, PostgresConnection] = {}
+
+
+_local = _ThreadConnections()
+
+
+def _open(dsn: str) -> PostgresConnection:
+    try:
+        import psycopg
+    except ImportError as e:
+        raise ImportError('STORAGE_BACKEND=postgres requires psycopg: pip install "psycopg[binary]"') from e
+    conn = psycopg.connect(dsn, autocommit=False, prepare_threshold=int(os.getenv("POSTGRES_PREPARE_THRESHOLD", "5")))
+    logger.debug(f"Opened PostgreSQL connection in thread {threading.current_thread().name}")
+    return PostgresConnection(conn)
+
+
+def connect(dsn: Optional[str] = None) -> PostgresConnection:
+    """Return this thread's connection to a PostgreSQL database, opening it on first use.
+
+    psycopg prepares a statement server-side once it has run
+    POSTGRES_PREPARE_THRESHOLD times on the connection, so keeping one
+    connection per thread also reuses query plans.
+
+    Args:
+        dsn: libpq connection string; defaults to the DATABASE_URL environment variable
+
+    Returns:
+        PostgresConnection: The thread's connection
+    """
+    dsn = dsn or os.getenv("DATABASE_URL")
+    if not dsn:
+        raise ValueError("DATABASE_URL environment variable is required for the postgres storage backend")
+    if _local.pid != os.getpid():
+        # Connections must not be shared with a forked child
+        _local.pid = os.getpid()
+        _local.connections = {}
+    conn = _local.connections.get(dsn)
+    if conn is None or conn.closed:
+        conn = _open(dsn)
+        _local.connections[dsn] = conn
+    return conn
+
+
+def close_thread_connections() -> None:
+    """Close this thread's PostgreSQL connections."""
+    for dsn in list(_local.connections):
+        conn = _local.connections.pop(dsn)
+        try:
+            conn.close()
+        except Exception as e:
+            logger.error(f"Error closing PostgreSQL connection: {str(e)}", exc_info=True)
@@ -0,0 +1,104 @@
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+import os
+import sqlite3
+import threading
+from .logging_setup import setup_logging
+
+# Setup logging for SQLite storage
+def setup_sqlite_storage_logging():
+    """Setup logging for the SQLite storage module."""
+    return setup_logging("common.sqlite_storage", "sqlite_storage")
+
+# Initialize logger
+logger = setup_sqlite_storage_logging()
+
+# Milliseconds a connection waits on a lock held by another writer before failing
+BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# Page cache per connection, in KiB
+CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+# Bytes of the database file read through mmap (0 disables it)
+MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Prepared statements kept per connection
+CACHED_STATEMENTS = int(os.getenv("SQLITE_CACHED_STATEMENTS", "256"))
+
+
+class _ThreadConnections(threading.local):
+    def __init__(self):
+        self.pid = os.getpid()
+        self.connections: Dict[str, sqlite3.Connection] = {}
+
+
+_local = _ThreadConnections()
+
+
+def _open(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000, cached_statements=CACHED_STATEMENTS)
+    # WAL lets readers run alongside the single writer and is kept by the file once set
+    journal_mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+    if journal_mode.lower() != "wal":
+        logger.warning(f"Could not enable WAL for {db_path}, journal mode is {journal_mode}")
+    # NORMAL only syncs at checkpoints in WAL mode; a power loss can drop the last commits but not corrupt the file
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    logger.debug(f"Opened SQLite connection to {db_path} in thread {threading.current_thread().name}")
+    return conn
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """Return this thread's connection to a database file, opening it on first use.
+
+    Connections are kept open for the life of the thread, so pragmas are set
+    once and sqlite3's statement cache is reused across calls. Use the result
+    as a context manager (`with connect(path) as conn:`) to commit or roll back
+    a transaction; do not close it.
+
+    Args:
+        db_path: Path to the SQLite database file
+
+    Returns:
+        sqlite3.Connection: The thread's configured connection
+    """
+    if _local.pid != os.getpid():
+        # Connections must not be shared with a forked child
+        _local.pid = os.getpid()
+        _local.connections = {}
+    conn = _local.connections.get(db_path)
+    if conn is None:
+        conn = _open(db_path)
+        _local.connections[db_path] = conn
+    return conn
+
+
+@contextmanager
+def transaction(db_path: str, immediate: bool = False) -> Iterator[sqlite3.Connection]:
+    """Run a block in one transaction on this thread's connection.
+
+    Args:
+        db_path: Path to the SQLite database file
+        immediate: Take the write lock at the start (BEGIN IMMEDIATE), for
+            read-modify-write blocks that would otherwise fail to upgrade their lock
+
+    Yields:
+        sqlite3.Connection: The thread's connection, committed on success and rolled back on error
+    """
+    conn = connect(db_path)
+    if immediate and not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    with conn:
+        yield conn
+
+
+def close_thread_connections(db_path: Optional[str] = None) -> None:
+    """Close this thread's connections, or only the one to db_path."""
+    paths = [db_path] if db_path is not None else list(_local.connections)
+    for path in paths:
+        conn = _local.connections.pop(path, None)
+        if conn is not None:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.error(f"Error closing SQLite connection to {path}: {str(e)}", exc_info=True)
@@ -0,0 +1,149 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import json
+import os
+
+SQLITE = "sqlite"
+POSTGRES = "postgres"
+
+
+def get_storage_backend() -> str:
+    """The configured storage backend, from STORAGE_BACKEND.
+
+    "sqlite" (the default) keeps one SQLite file per store next to the code.
+    "postgres" puts every store's tables in the PostgreSQL database at
+    DATABASE_URL, so several agent processes can share state. Stores write
+    their SQL with sqlite3's "?" placeholders and use the Dialect for the few
+    statements the two databases spell differently.
+    """
+    backend = os.getenv("STORAGE_BACKEND", SQLITE).lower()
+    if backend not in (SQLITE, POSTGRES):
+        raise ValueError(f"Unknown storage backend '{backend}', expected '{SQLITE}' or '{POSTGRES}'")
+    return backend
+
+
+class SQLiteDialect:
+    name = SQLITE
+    blob_type = "BLOB"
+    table_suffix = " WITHOUT ROWID"
+    current_timestamp = "CURRENT_TIMESTAMP"
+    timestamp_column = "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
+    # AUTOINCREMENT so keys of deleted rows are never handed out again
+    identity_column = "INTEGER PRIMARY KEY AUTOINCREMENT"
+
+    @staticmethod
+    def table_exists(cursor, table: str) -> bool:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+        return cursor.fetchone() is not None
+
+    @staticmethod
+    def column_names(cursor, table: str) -> List[str]:
+        cursor.execute(f"PRAGMA table_info({table})")
+        return [row[1] for row in cursor.fetchall()]
+
+    @staticmethod
+    def lock(cursor, key: str) -> None:
+        """Serialize writers on key until the transaction ends; SQLite already has a single writer."""
+
+    @staticmethod
+    def json_set_fields(column: str, fields: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        """SQL expression setting top-level keys of the JSON object in a text column.
+
+        Returns:
+            Tuple[str, List[Any]]: The expression and its parameters
+        """
+        expression = f"COALESCE({column}, '{{}}')"
+        params: List[Any] = []
+        # JSON paths cannot quote a key containing '"'; those are merged with json_patch
+        quoted_keys = {key: value for key, value in fields.items() if '"' in key}
+        path_args = []
+        for key, value in fields.items():
+            if key not in quoted_keys:
+                path_args.append("?, json(?)")
+                params.extend([f'$."{key}"', json.dumps(value)])
+        if path_args:
+            expression = f"json_set({expression}, {', '.join(path_args)})"
+        if quoted_keys:
+            expression = f"json_patch({expression}, ?)"
+            params.append(json.dumps(quoted_keys))
+        return expression, params
+
+
+class PostgresDialect:
+    name = POSTGRES
+    blob_type = "BYTEA"
+    table_suffix = ""
+    # Same 'YYYY-MM-DD HH:MM:SS' UTC text that SQLite's CURRENT_TIMESTAMP produces
+    current_timestamp = "to_char(now() AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI:SS')"
+    timestamp_column = f"TEXT DEFAULT ({current_timestamp})"
+    identity_column = "BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY"
+
+    @staticmethod
+    def table_exists(cursor, table: str) -> bool:
+        cursor.execute("SELECT to_regclass(?) IS NOT NULL", (table,))
+        return bool(cursor.fetchone()[0])
+
+    @staticmethod
+    def column_names(cursor, table: str) -> List[str]:
+        cursor.execute(
+            "SELECT column_name FROM information_schema.columns WHERE table_schema = current_schema() AND table_name = ?",
+            (table,)
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    @staticmethod
+    def lock(cursor, key: str) -> None:
+        """Serialize writers on key until the transaction ends."""
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext(?))", (key,))
+
+    @staticmethod
+    def json_set_fields(column: str, fields: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        """SQL expression setting top-level keys of the JSON object in a text column.
+
+        Returns:
+            Tuple[str, List[Any]]: The expression and its parameters
+        """
+        # jsonb || replaces the right-hand side's top-level keys, like dict.update
+        return f"(COALESCE({column}, '{{}}')::jsonb || ?::jsonb)::text", [json.dumps(fields)]
+
+
+def get_dialect():
+    """The Dialect of the configured storage backend."""
+    return PostgresDialect if get_storage_backend() == POSTGRES else SQLiteDialect
+
+
+def connect(db_path: Optional[str] = None):
+    """Return this thread's connection for a store.
+
+    Args:
+        db_path: The store's SQLite file; ignored by the postgres backend,
+            where every store shares the DATABASE_URL database
+
+    Returns:
+        A sqlite3.Connection or a PostgresConnection with the same interface
+    """
+    if get_storage_backend() == POSTGRES:
+        from .postgres_storage import connect as postgres_connect
+        return postgres_connect()
+    from .sqlite_storage import connect as sqlite_connect
+    return sqlite_connect(db_path)
+
+
+@contextmanager
+def transaction(db_path: Optional[str] = None, immediate: bool = False) -> Iterator:
+    """Run a block in one transaction on this thread's connection for a store.
+
+    Args:
+        db_path: The store's SQLite file; ignored by the postgres backend
+        immediate: On SQLite, take the write lock at the start (BEGIN IMMEDIATE)
+
+    Yields:
+        The connection, committed on success and rolled back on error
+    """
+    if get_storage_backend() == POSTGRES:
+        with connect(db_path) as conn:
+            yield conn
+        return
+    from .sqlite_storage import transaction as sqlite_transaction
+    with sqlite_transaction(db_path, immediate=immediate) as conn:
+        yield conn
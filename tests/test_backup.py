@@ -0,0 +1,51 @@
+import os
+import sys
+import threading
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AGENT_DIR = os.path.join(REPO_ROOT, "agent")
+sys.path[:0] = [REPO_ROOT, AGENT_DIR]
+
+from common.backup import copy_vector_index  # noqa: E402
+from ai_person.memory.long_term_memory.mmap_vector_index import MmapVectorIndex  # noqa: E402
+
+DIM = 32
+
+
+def vector_for(item_id: str) -> list:
+    return np.random.default_rng(int(item_id)).standard_normal(DIM).tolist()
+
+
+def test_copy_vector_index_while_removing_keeps_ids_on_their_vectors(tmp_path):
+    source = str(tmp_path / "index")
+    index = MmapVectorIndex(source, initial_capacity=16)
+    item_ids = [str(item) for item in range(400)]
+    index.add_many(item_ids, [vector_for(item_id) for item_id in item_ids])
+
+    done = threading.Event()
+
+    def remove_and_add():
+        # Removing from the front moves every remaining row on each call
+        next_id = len(item_ids)
+        while not done.is_set():
+            index.remove([index._ids[0], index._ids[1]])
+            new_ids = [str(next_id), str(next_id + 1)]
+            index.add_many(new_ids, [vector_for(item_id) for item_id in new_ids])
+            next_id += 2
+
+    writer = threading.Thread(target=remove_and_add)
+    writer.start()
+    try:
+        for attempt in range(20):
+            snapshot, restored = str(tmp_path / f"snapshot_{attempt}"), str(tmp_path / f"restored_{attempt}")
+            copy_vector_index(source, snapshot)
+            copy_vector_index(snapshot, restored)
+            copy = MmapVectorIndex(restored, read_only=True)
+            assert copy.count > 0
+            for item_id in copy._ids:
+                assert copy.search(vector_for(item_id), top_k=1)[0][0] == item_id
+    finally:
+        done.set()
+        writer.join()